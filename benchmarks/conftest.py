@@ -0,0 +1,29 @@
+"""Shared fixtures for the offline benchmarks."""
+
+from __future__ import annotations
+
+import pytest
+
+from mara.constants import API_ORDER
+from mara.indicator_registry import IndicatorRegistry, load_registry
+from market import FakeTushare, Market, MarketScale, load_market
+
+
+@pytest.fixture(scope="session")
+def scale() -> MarketScale:
+    return MarketScale.from_env()
+
+
+@pytest.fixture(scope="session")
+def market(scale: MarketScale) -> Market:
+    return load_market(scale)
+
+
+@pytest.fixture(scope="session")
+def fake_tushare(market: Market, scale: MarketScale) -> FakeTushare:
+    return FakeTushare(market, latency=scale.latency)
+
+
+@pytest.fixture(scope="session")
+def registry() -> IndicatorRegistry:
+    return load_registry(API_ORDER)
@@ -0,0 +1,231 @@
+"""Market data and an offline Tushare stand-in for the benchmarks."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from mara.constants import API_ORDER, BASIC_FIELDS, BULK_API_NAMES, META_FIELDS
+from mara.indicator_registry import IndicatorRegistry, load_registry
+from mara.tushare_client import TushareClient
+
+STATEMENT_APIS: tuple[str, ...] = ("income", "balancesheet", "cashflow", "fina_indicator")
+
+# value columns generated per API; the benchmarks query these indicators
+VALUE_COLUMNS: int = 12
+
+# share of rows that get a restated duplicate (update_flag 1, later f_ann_date)
+RESTATED_SHARE: float = 0.1
+
+# share of rows that also get an adjusted report (report_type 4)
+ADJUSTED_SHARE: float = 0.05
+
+INDUSTRIES: tuple[str, ...] = ("银行", "证券", "保险", "白酒", "半导体", "医药", "汽车", "电力")
+
+
+@dataclass(frozen=True)
+class MarketScale:
+    codes: int
+    periods: int
+    latency: float
+
+    @classmethod
+    def from_env(cls) -> MarketScale:
+        return cls(
+            codes=int(os.environ.get("MARA_BENCH_CODES", "5000")),
+            periods=int(os.environ.get("MARA_BENCH_PERIODS", "40")),
+            latency=float(os.environ.get("MARA_BENCH_LATENCY", "0")),
+        )
+
+
+@dataclass(frozen=True)
+class Market:
+    stock_basic: pd.DataFrame
+    frames: dict[str, pd.DataFrame]
+    indicators: dict[str, list[str]]
+
+
+def synthetic_market(scale: MarketScale, seed: int = 0) -> Market:
+    '''
+    Build stock_basic and the four statement APIs for scale.codes stocks over
+    the scale.periods latest quarter ends, with restated and adjusted duplicates
+    so deduplication has real work to do.
+    '''
+    rng: np.random.Generator = np.random.default_rng(seed)
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    codes: np.ndarray = np.array(
+        [f"{idx:06d}.{'SH' if idx % 2 else 'SZ'}" for idx in range(scale.codes)]
+    )
+    stock_basic: pd.DataFrame = pd.DataFrame(
+        {
+            "ts_code": codes,
+            "name": [f"股票{idx:04d}" for idx in range(scale.codes)],
+            "industry": [INDUSTRIES[idx % len(INDUSTRIES)] for idx in range(scale.codes)],
+            "market": "主板",
+            "area": "深圳",
+            "list_date": "20100101",
+        }
+    )[BASIC_FIELDS]
+
+    period_ends: pd.DatetimeIndex = pd.date_range(end="2024-12-31", periods=scale.periods, freq="QE")
+    frames: dict[str, pd.DataFrame] = {}
+    indicators: dict[str, list[str]] = {}
+    for api_name in STATEMENT_APIS:
+        spec_fields: list[str] = registry.api_specs[api_name].fields
+        value_columns: list[str] = [
+            col
+            for col in spec_fields
+            if col not in META_FIELDS
+            and col not in ("f_ann_date", "report_type", "comp_type", "update_flag", "end_type")
+        ][:VALUE_COLUMNS]
+        indicators[api_name] = value_columns
+        frames[api_name] = _statement_frame(rng, codes, period_ends, spec_fields, value_columns)
+    return Market(stock_basic=stock_basic, frames=frames, indicators=indicators)
+
+
+def recorded_market(store_dir: Path) -> Market:
+    '''
+    Load frames recorded by 'mara sync' (a StatementStore directory) plus an
+    optional stock_basic.parquet next to the API directories.
+    '''
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    frames: dict[str, pd.DataFrame] = {}
+    indicators: dict[str, list[str]] = {}
+    for api_name in STATEMENT_APIS:
+        partitions: list[Path] = sorted((store_dir / api_name).glob("period=*.parquet"))
+        if not partitions:
+            continue
+        frames[api_name] = pd.concat(
+            [pd.read_parquet(path) for path in partitions], ignore_index=True
+        )
+        indicators[api_name] = [
+            col
+            for col in registry.api_specs[api_name].fields
+            if col in frames[api_name].columns and col not in META_FIELDS
+        ][:VALUE_COLUMNS]
+    basic_path: Path = store_dir / "stock_basic.parquet"
+    if basic_path.exists():
+        stock_basic: pd.DataFrame = pd.read_parquet(basic_path)
+    else:
+        codes: list[str] = sorted(
+            set().union(*(frame["ts_code"].unique() for frame in frames.values()))
+        )
+        stock_basic = pd.DataFrame({"ts_code": codes, "name": codes})
+    return Market(stock_basic=stock_basic, frames=frames, indicators=indicators)
+
+
+def load_market(scale: MarketScale) -> Market:
+    store_dir: str | None = os.environ.get("MARA_BENCH_STORE")
+    if store_dir:
+        return recorded_market(Path(store_dir).expanduser())
+    return synthetic_market(scale)
+
+
+class FakeTushare:
+    '''
+    Offline stand-in for TushareClient serving a Market. Frames are indexed by
+    ts_code and report period up front so lookups cost what the network
+    replaces, not a scan; latency seconds are slept per call. start_date and
+    end_date filter ann_date, as the real statement endpoints do.
+    '''
+
+    def __init__(self, market: Market, latency: float = 0.0) -> None:
+        self._market: Market = market
+        self._latency: float = latency
+        self._by_code: dict[str, dict[str, pd.DataFrame]] = {}
+        self._by_period: dict[str, dict[str, pd.DataFrame]] = {}
+        for api_name, frame in market.frames.items():
+            self._by_code[api_name] = dict(iter(frame.groupby("ts_code", sort=False)))
+            self._by_period[api_name] = dict(iter(frame.groupby("end_date", sort=False)))
+        self._vip_apis: dict[str, str] = {vip: api for api, vip in BULK_API_NAMES.items()}
+        self._lock: threading.Lock = threading.Lock()
+        self.calls: int = 0
+
+    query_all = TushareClient.query_all
+
+    def stock_basic(self, fields: list[str]) -> pd.DataFrame:
+        return self.query("stock_basic", fields=",".join(fields))
+
+    def query(self, api_name: str, **params: Any) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+        if self._latency:
+            time.sleep(self._latency)
+        if api_name == "stock_basic":
+            data: pd.DataFrame = self._market.stock_basic
+        else:
+            base_api: str = self._vip_apis.get(api_name, api_name)
+            data = self._select(base_api, params)
+        if "limit" in params:
+            data = data.iloc[params["offset"] : params["offset"] + params["limit"]]
+        if "fields" in params:
+            fields: list[str] = str(params["fields"]).split(",")
+            data = data[[col for col in fields if col in data.columns]]
+        return data.reset_index(drop=True)
+
+    def _select(self, api_name: str, params: dict[str, Any]) -> pd.DataFrame:
+        empty: pd.DataFrame = self._market.frames[api_name].iloc[0:0]
+        if "ts_code" in params:
+            data: pd.DataFrame = self._by_code[api_name].get(params["ts_code"], empty)
+            if "start_date" in params:
+                data = data[
+                    (data["ann_date"] >= params["start_date"])
+                    & (data["ann_date"] <= params["end_date"])
+                ]
+            return data
+        if "period" in params:
+            return self._by_period[api_name].get(params["period"], empty)
+        return self._market.frames[api_name]
+
+
+def _statement_frame(
+    rng: np.random.Generator,
+    codes: np.ndarray,
+    period_ends: pd.DatetimeIndex,
+    spec_fields: list[str],
+    value_columns: list[str],
+) -> pd.DataFrame:
+    code_column: np.ndarray = np.repeat(codes, len(period_ends))
+    end_dates: pd.DatetimeIndex = pd.DatetimeIndex(np.tile(period_ends.to_numpy(), len(codes)))
+    rows: int = len(code_column)
+    ann_dates: pd.DatetimeIndex = end_dates + pd.to_timedelta(rng.integers(20, 120, rows), "D")
+    data: dict[str, Any] = {
+        "ts_code": code_column,
+        "ann_date": ann_dates.strftime("%Y%m%d"),
+        "end_date": end_dates.strftime("%Y%m%d"),
+    }
+    if "f_ann_date" in spec_fields:
+        data["f_ann_date"] = data["ann_date"]
+    if "report_type" in spec_fields:
+        data["report_type"] = "1"
+    if "update_flag" in spec_fields:
+        data["update_flag"] = "0"
+    for column in value_columns:
+        data[column] = rng.normal(1e8, 5e7, rows).round(2)
+    base: pd.DataFrame = pd.DataFrame(data)
+
+    restated: pd.DataFrame = base.sample(frac=RESTATED_SHARE, random_state=1)
+    restated_ann: pd.DatetimeIndex = pd.DatetimeIndex(
+        pd.to_datetime(restated["ann_date"], format="%Y%m%d")
+    ) + pd.to_timedelta(rng.integers(30, 365, len(restated)), "D")
+    restated = restated.assign(
+        **{column: restated[column] * 1.01 for column in value_columns},
+        ann_date=restated_ann.strftime("%Y%m%d"),
+    )
+    if "f_ann_date" in restated.columns:
+        restated = restated.assign(f_ann_date=restated["ann_date"])
+    if "update_flag" in restated.columns:
+        restated = restated.assign(update_flag="1")
+
+    frames: list[pd.DataFrame] = [base, restated]
+    if "report_type" in base.columns:
+        adjusted: pd.DataFrame = base.sample(frac=ADJUSTED_SHARE, random_state=2)
+        frames.append(adjusted.assign(report_type="4"))
+    return pd.concat(frames, ignore_index=True)
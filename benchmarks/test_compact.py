@@ -0,0 +1,24 @@
+"""Compact dtype benchmarks: conversion cost and memory saved."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from mara.compact import compact_frame, memory_bytes
+from market import STATEMENT_APIS, Market
+
+
+@pytest.mark.parametrize("float32", [False, True], ids=["exact", "float32"])
+@pytest.mark.parametrize("api_name", STATEMENT_APIS)
+def test_compact_frame(benchmark: Any, market: Market, api_name: str, float32: bool) -> None:
+    raw: pd.DataFrame = market.frames[api_name]
+
+    compact: pd.DataFrame = benchmark(compact_frame, raw, float32)
+
+    # reported next to the timings in --benchmark-json output
+    benchmark.extra_info["raw_mb"] = round(memory_bytes(raw) / 1024 / 1024, 1)
+    benchmark.extra_info["compact_mb"] = round(memory_bytes(compact) / 1024 / 1024, 1)
+    assert memory_bytes(compact) < memory_bytes(raw)
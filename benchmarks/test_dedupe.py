@@ -0,0 +1,65 @@
+"""Deduplication benchmarks: the packed-rank engine against the sort-based one."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from mara.data_fetcher import REPORT_TYPE_PRIORITY, _dedupe_by_official_fields
+from market import Market
+
+
+def sorted_dedupe(data: pd.DataFrame) -> pd.DataFrame:
+    '''
+    The previous engine: string-mapped rank columns, a stable five-key sort of
+    the key frame and groupby().tail(1). Kept as the reference output.
+    '''
+    keys: pd.DataFrame = pd.DataFrame(
+        {"ts_code": data["ts_code"], "_end_date": data["_end_date"]}, index=data.index
+    )
+    keys["_report_rank"] = (
+        data["report_type"].astype(str).map(REPORT_TYPE_PRIORITY).fillna(0).astype(int)
+        if "report_type" in data.columns
+        else 0
+    )
+    keys["_update_rank"] = (
+        data["update_flag"].astype(str).eq("1").astype(int) if "update_flag" in data.columns else 0
+    )
+    date_rank: pd.Series | None = None
+    for column in ("f_ann_date", "ann_date"):
+        if column not in data.columns:
+            continue
+        parsed: pd.Series = pd.to_datetime(data[column], format="%Y%m%d", errors="coerce")
+        date_rank = parsed if date_rank is None else date_rank.fillna(parsed)
+    keys["_date_rank"] = (data["_end_date"] if date_rank is None else date_rank).fillna(
+        data["_end_date"]
+    )
+    keys = keys.sort_values(
+        ["ts_code", "_end_date", "_report_rank", "_update_rank", "_date_rank"], kind="stable"
+    )
+    winners: pd.Index = keys.groupby(["ts_code", "_end_date"], sort=False).tail(1).index
+    return data.loc[winners]
+
+
+@pytest.fixture(scope="module", params=["income", "fina_indicator"])
+def statements(request: Any, market: Market) -> pd.DataFrame:
+    raw: pd.DataFrame = market.frames[request.param]
+    # shuffled so winners are not already in key order
+    shuffled: pd.DataFrame = raw.sample(frac=1.0, random_state=3)
+    return shuffled.assign(_end_date=pd.to_datetime(shuffled["end_date"], format="%Y%m%d"))
+
+
+@pytest.mark.benchmark(group="dedupe")
+def test_dedupe_packed_rank(benchmark: Any, statements: pd.DataFrame) -> None:
+    deduped: pd.DataFrame = benchmark(_dedupe_by_official_fields, statements)
+
+    pd.testing.assert_frame_equal(deduped, sorted_dedupe(statements))
+
+
+@pytest.mark.benchmark(group="dedupe")
+def test_dedupe_sorted_reference(benchmark: Any, statements: pd.DataFrame) -> None:
+    deduped: pd.DataFrame = benchmark(sorted_dedupe, statements)
+
+    assert len(deduped) < len(statements)
@@ -0,0 +1,110 @@
+"""DataFetcher benchmarks: network paths and post-fetch stages."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from mara.data_fetcher import DataFetcher, IndicatorResult, process_frame
+from mara.date_utils import DateRange
+from mara.indicator_registry import IndicatorRegistry
+from market import FakeTushare, Market
+
+DATE_RANGE: DateRange = DateRange(start=date(2015, 1, 1), end=date(2024, 12, 31))
+
+# per-stock requests are what the bulk path replaces; a slice keeps rounds short
+PER_STOCK_CODES: int = 300
+
+
+def _fetch(
+    fetcher: DataFetcher, indicators: list[str], ts_codes: list[str], **kwargs: Any
+) -> list[IndicatorResult]:
+    options: dict[str, Any] = {
+        "date_range": DATE_RANGE,
+        "season": 0,
+        "single": False,
+        "latest": False,
+        "aggregate": None,
+        **kwargs,
+    }
+    return fetcher.fetch_indicators(indicators=indicators, ts_codes=ts_codes, **options)
+
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_fetch_per_stock(
+    benchmark: Any,
+    market: Market,
+    fake_tushare: FakeTushare,
+    registry: IndicatorRegistry,
+    workers: int,
+) -> None:
+    ts_codes: list[str] = market.stock_basic["ts_code"].tolist()[:PER_STOCK_CODES]
+    fetcher: DataFetcher = DataFetcher(
+        fake_tushare, registry, workers=workers, bulk_threshold=0  # type: ignore[arg-type]
+    )
+
+    results: list[IndicatorResult] = benchmark(
+        _fetch, fetcher, market.indicators["income"], ts_codes
+    )
+
+    assert results and not results[0].empty
+
+
+def test_fetch_bulk_full_market(
+    benchmark: Any, market: Market, fake_tushare: FakeTushare, registry: IndicatorRegistry
+) -> None:
+    ts_codes: list[str] = market.stock_basic["ts_code"].tolist()
+    fetcher: DataFetcher = DataFetcher(fake_tushare, registry, workers=4, bulk_threshold=1)  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = benchmark(
+        _fetch, fetcher, market.indicators["fina_indicator"], ts_codes
+    )
+
+    assert results and not results[0].empty
+
+
+@pytest.mark.parametrize(
+    "stage",
+    [
+        {},
+        {"single": True},
+        {"season": 4},
+        {"latest": True},
+        {"aggregate": "mean", "season": 4},
+    ],
+    ids=["dedupe", "single", "season", "latest", "aggregate"],
+)
+def test_process_frame(
+    benchmark: Any, market: Market, stage: dict[str, Any]
+) -> None:
+    raw: pd.DataFrame = market.frames["income"]
+    indicators: list[str] = market.indicators["income"]
+    options: dict[str, Any] = {
+        "season": 0,
+        "single": False,
+        "latest": False,
+        "aggregate": None,
+        **stage,
+    }
+
+    def process(data: pd.DataFrame) -> pd.DataFrame:
+        return process_frame(
+            data,
+            "income",
+            indicators,
+            DATE_RANGE,
+            options["season"],
+            options["single"],
+            options["latest"],
+            options["aggregate"],
+        )
+
+    # stages assign columns on their input, so every round gets a fresh copy
+    processed: pd.DataFrame = benchmark.pedantic(
+        process, setup=lambda: ((raw.copy(),), {}), rounds=5
+    )
+
+    assert not processed.empty
@@ -0,0 +1,41 @@
+"""Output writer benchmarks."""
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from mara.data_processor import OutputTable
+from mara.output import write_tables
+from market import Market
+
+
+@pytest.fixture(scope="module")
+def table(market: Market) -> OutputTable:
+    raw: pd.DataFrame = market.frames["income"]
+    return OutputTable(frequency="quarterly", data=raw.drop_duplicates(["ts_code", "end_date"]))
+
+
+@pytest.mark.parametrize("output_format", ["csv", "jsonl"])
+def test_write_text(benchmark: Any, table: OutputTable, output_format: str) -> None:
+    def write() -> int:
+        buffer: io.StringIO = io.StringIO()
+        write_tables([table], output_format, None, ",", True, file=buffer)
+        return buffer.tell()
+
+    assert benchmark(write) > 0
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather", "arrow"])
+def test_write_columnar(
+    benchmark: Any, table: OutputTable, tmp_path: Path, output_format: str
+) -> None:
+    path: Path = tmp_path / f"out.{output_format}"
+
+    benchmark(write_tables, [table], output_format, str(path), ",", True)
+
+    assert path.stat().st_size > 0
@@ -0,0 +1,48 @@
+"""DataProcessor merge benchmarks."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import pytest
+
+from mara.data_fetcher import DataFetcher, IndicatorResult
+from mara.data_processor import DataProcessor, OutputTable
+from mara.date_utils import DateRange
+from mara.indicator_registry import IndicatorRegistry
+from market import FakeTushare, Market
+
+DATE_RANGE: DateRange = DateRange(start=date(2015, 1, 1), end=date(2024, 12, 31))
+
+
+@pytest.fixture(scope="module")
+def results(
+    market: Market, fake_tushare: FakeTushare, registry: IndicatorRegistry
+) -> list[IndicatorResult]:
+    fetcher: DataFetcher = DataFetcher(fake_tushare, registry, workers=4, bulk_threshold=1)  # type: ignore[arg-type]
+    indicators: list[str] = [
+        indicator
+        for api_name in ("income", "balancesheet", "fina_indicator")
+        for indicator in market.indicators[api_name][:4]
+    ]
+    return fetcher.fetch_indicators(
+        indicators=indicators,
+        ts_codes=market.stock_basic["ts_code"].tolist(),
+        date_range=DATE_RANGE,
+        season=0,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+
+@pytest.mark.parametrize("include_end_date", [True, False], ids=["quarterly", "by_code"])
+def test_build_output_tables(
+    benchmark: Any, market: Market, results: list[IndicatorResult], include_end_date: bool
+) -> None:
+    processor: DataProcessor = DataProcessor(market.stock_basic)
+
+    tables: list[OutputTable] = benchmark(processor.build_output_tables, results, include_end_date)
+
+    assert tables and not tables[0].data.empty
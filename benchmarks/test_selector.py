@@ -0,0 +1,24 @@
+"""Stock selection benchmarks."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from mara.stock_selector import StockIndex, StockSelection
+from market import Market
+
+KEYWORDS: list[str] = ["银行", "000001", "600000.SH", "股票12", "1234", "sz"]
+
+
+def test_build_stock_index(benchmark: Any, market: Market) -> None:
+    index: StockIndex = benchmark(StockIndex, market.stock_basic)
+
+    assert not index.basic_info.empty
+
+
+def test_select_keywords(benchmark: Any, market: Market) -> None:
+    index: StockIndex = StockIndex(market.stock_basic)
+
+    selection: StockSelection = benchmark(index.select, KEYWORDS)
+
+    assert selection.ts_codes
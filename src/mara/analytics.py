@@ -0,0 +1,164 @@
+"""Trailing, rolling and growth analytics over quarterly indicator values."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from mara.date_utils import DateRange
+
+# quarters between a value and its comparison base
+GROWTH_LAGS: dict[str, int] = {"yoy": 4, "qoq": 1}
+
+ROLLING_AGGREGATES: dict[str, Callable[..., np.ndarray]] = {
+    "mean": np.mean,
+    "median": np.median,
+    "sum": np.sum,
+    "min": np.min,
+    "max": np.max,
+}
+
+
+@dataclass(frozen=True)
+class Analytics:
+    '''
+    Per-stock quarterly transforms, applied in field order: trailing-twelve-
+    month sums, a rolling window, then growth. Each step reads the previous
+    step's values of earlier quarters, so their lookbacks add up.
+    '''
+
+    # trailing four quarters from cumulative (year-to-date) values
+    ttm: bool = False
+    # aggregate over this many consecutive quarters; 0 disables
+    window: int = 0
+    window_agg: str = "mean"
+    # "yoy" or "qoq" change in percent of the base's magnitude
+    growth: str | None = None
+
+    @property
+    def lookback_quarters(self) -> int:
+        return (
+            (4 if self.ttm else 0)
+            + max(self.window - 1, 0)
+            + GROWTH_LAGS.get(self.growth or "", 0)
+        )
+
+    @property
+    def all_quarters(self) -> bool:
+        # year-over-year growth alone only compares rows of the same season
+        return self.ttm or self.window > 1 or self.growth == "qoq"
+
+
+def parse_rolling(spec: str) -> tuple[int, str]:
+    '''Parse a --rolling value "N:AGG" (AGG defaults to mean) into (N, AGG).'''
+    size_text, _, agg = spec.partition(":")
+    agg = agg.strip() or "mean"
+    if not size_text.strip().isdigit() or int(size_text) < 1 or agg not in ROLLING_AGGREGATES:
+        choices: str = ", ".join(ROLLING_AGGREGATES)
+        raise ValueError(f"--rolling expects N:AGG with N >= 1 and AGG one of {choices}: {spec!r}")
+    return int(size_text), agg
+
+
+def lookback_range(
+    date_range: DateRange | None, analytics: Analytics | None, single: bool = False
+) -> DateRange | None:
+    '''
+    Widen date_range back far enough that the analytics of its first quarter
+    can be computed: to the first day of the quarter lookback_quarters before
+    the one containing date_range.start. Single-quarter values difference the
+    cumulative values within a year, so with single (and no TTM, which replaces
+    it) the start moves on to January 1 of that quarter's year.
+    '''
+    if date_range is None:
+        return None
+    lookback: int = analytics.lookback_quarters if analytics is not None else 0
+    year_start: bool = single and not (analytics is not None and analytics.ttm)
+    if not lookback and not year_start:
+        return date_range
+    quarter: int = date_range.start.year * 4 + (date_range.start.month - 1) // 3 - lookback
+    start: date = date(quarter // 4, 1 if year_start else quarter % 4 * 3 + 1, 1)
+    if start == date_range.start:
+        return date_range
+    return DateRange(start=start, end=date_range.end)
+
+
+def apply_analytics(
+    data: pd.DataFrame, indicators: list[str], analytics: Analytics, cumulative: bool
+) -> pd.DataFrame:
+    '''
+    Replace the indicator columns of data, deduplicated with a parsed `_end_date`
+    column, by their analytics. Earlier quarters are looked up by (ts_code,
+    quarter) rather than by row offset, so a missing quarter gives NaN instead
+    of a value computed against the wrong period; windows must be complete.
+    --ttm applies only to cumulative values and is skipped otherwise.
+    '''
+    if data.empty or not indicators:
+        return data
+    quarters: _QuarterIndex = _QuarterIndex(data)
+    values: np.ndarray = data[indicators].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    if analytics.ttm and cumulative:
+        # Q4 holds the annual value; other quarters add last year's annual
+        # value and drop last year's year-to-date value for the same quarter
+        within_year: np.ndarray = quarters.quarters % 4
+        prior_annual: np.ndarray = _take(values, quarters.lag(within_year + 1))
+        prior_same: np.ndarray = _take(values, quarters.lag(4))
+        values = np.where((within_year == 3)[:, None], values, values + prior_annual - prior_same)
+    if analytics.window > 1:
+        window: np.ndarray = np.stack(
+            [values, *(_take(values, quarters.lag(lag)) for lag in range(1, analytics.window))],
+            axis=-1,
+        )
+        values = ROLLING_AGGREGATES[analytics.window_agg](window, axis=-1)
+    if analytics.growth is not None:
+        base: np.ndarray = _take(values, quarters.lag(GROWTH_LAGS[analytics.growth]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = (values - base) / np.abs(base) * 100
+        values[~np.isfinite(values)] = np.nan
+
+    columns: dict[str, np.ndarray] = {}
+    for position, indicator in enumerate(indicators):
+        column: np.ndarray = values[:, position]
+        # keep --float32 columns narrow
+        if data[indicator].dtype == np.float32:
+            column = column.astype(np.float32)
+        columns[indicator] = column
+    return data.assign(**columns)
+
+
+class _QuarterIndex:
+    '''
+    Row positions of each row's earlier quarters for the same ts_code. Keys
+    (ts_code, quarter) are dense, so a flat table maps them to rows without
+    hashing.
+    '''
+
+    def __init__(self, data: pd.DataFrame) -> None:
+        end_dates: pd.Series = data["_end_date"]
+        self.quarters: np.ndarray = (
+            end_dates.dt.year.to_numpy(dtype=np.int64) * 4
+            + (end_dates.dt.month.to_numpy(dtype=np.int64) - 1) // 3
+        )
+        # rows whose end_date is not a quarter end neither look up nor are found
+        self._aligned: np.ndarray = end_dates.dt.is_quarter_end.to_numpy(dtype=bool)
+        self._first: int = int(self.quarters.min())
+        span: int = int(self.quarters.max()) - self._first + 1
+        code_ids, codes = pd.factorize(data["ts_code"])
+        self._keys: np.ndarray = code_ids.astype(np.int64) * span + (self.quarters - self._first)
+        self._rows: np.ndarray = np.full(len(codes) * span, -1, dtype=np.int64)
+        self._rows[self._keys[self._aligned]] = np.flatnonzero(self._aligned)
+
+    def lag(self, lags: int | np.ndarray) -> np.ndarray:
+        # -1 where the earlier quarter is missing
+        valid: np.ndarray = self._aligned & (self.quarters - lags >= self._first)
+        return np.where(valid, self._rows[np.where(valid, self._keys - lags, 0)], -1)
+
+
+def _take(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    taken: np.ndarray = values[rows]
+    taken[rows < 0] = np.nan
+    return taken
@@ -2,25 +2,44 @@
 
 from __future__ import annotations
 
+import cProfile
+import logging
+import sys
+import threading
+import time
 from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
+from typing import TextIO
 
+import pandas as pd
+
+from mara.analytics import Analytics, lookback_range, parse_rolling
+from mara.batch import BatchQuery, load_batch
+from mara.cache import QueryCache
 from mara.config import AppConfig, load_config
-from mara.constants import API_ORDER
+from mara.constants import API_ORDER, BASIC_FIELDS, META_FIELDS, TEXT_FORMATS
 from mara.data_fetcher import DataFetcher, IndicatorResult
 from mara.data_processor import DataProcessor, OutputTable
-from mara.date_utils import DateRange, to_date_range
-from mara.excel_exporter import ExcelExporter
+from mara.date_utils import DateRange, parse_cli_date, to_date_range
 from mara.indicator_registry import IndicatorRegistry, load_registry
-from mara.output import print_tables
-from mara.plotter import plot_indicators
+from mara.logger import get_logger
+from mara.output import write_tables, write_text_tables
 from mara.plugin_loader import load_plugins
-from mara.query_options import QueryOptions
-from mara.stock_selector import StockSelection, select_stocks
+from mara.profiler import Profiler, stage
+from mara.query_options import BatchOptions, QueryOptions, SyncOptions
+from mara.rate_limiter import RateLimiter
+from mara.stock_selector import StockIndex, StockSelection, load_stock_index
+from mara.store import StatementStore, SyncResult
 from mara.tushare_client import TushareClient
 
+LOGGER: logging.Logger = get_logger(__name__)
+
+# cProfile hooks the whole process, so --profile-trace runs (concurrent
+# queries in mara serve) take turns
+_TRACE_LOCK: threading.Lock = threading.Lock()
+
 
 @dataclass(frozen=True)
 class AppResult:
@@ -28,56 +47,466 @@ class AppResult:
     indicators: list[IndicatorResult]
 
 
-def run_app(options: QueryOptions, keywords: Iterable[str]) -> AppResult:
+class AppContext:
+    '''
+    State that does not depend on a single query: config, cache, rate limiter,
+    the indicator registry with plugins, and the stock index.
+
+    A one-shot run builds a context and drops it; `mara serve` keeps one warm
+    across requests, so the registry, plugins and stock list load once and all
+    requests share one rate limiter. The stock index is reloaded once it is
+    older than the stock_basic cache TTL.
+    '''
+
+    def __init__(
+        self,
+        config: AppConfig,
+        registry: IndicatorRegistry,
+        cache: QueryCache | None,
+    ) -> None:
+        self._config: AppConfig = config
+        self._registry: IndicatorRegistry = registry
+        self._cache: QueryCache | None = cache
+        self._rate_limiter: RateLimiter = RateLimiter(config.rate_limit)
+        ttl: dict[str, float | None] = config.cache.ttl
+        self._stock_index_ttl: float | None = ttl.get("stock_basic", ttl.get("default"))
+        self._stock_index: StockIndex | None = None
+        self._stock_index_loaded_at: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def load(cls, config_path: str, no_cache: bool = False) -> AppContext:
+        config: AppConfig = load_config(config_path)
+        cache: QueryCache | None = None
+        if not no_cache:
+            cache = QueryCache.from_config(config.cache)
+        registry: IndicatorRegistry = load_registry(API_ORDER)
+        plugin_dir: Path = Path.cwd() / "plugins"
+        load_plugins(plugin_dir, registry)
+        return cls(config, registry, cache)
+
+    @property
+    def config(self) -> AppConfig:
+        return self._config
+
+    @property
+    def registry(self) -> IndicatorRegistry:
+        return self._registry
+
+    def client(
+        self,
+        refresh: bool = False,
+        no_cache: bool = False,
+        profiler: Profiler | None = None,
+    ) -> TushareClient:
+        return TushareClient(
+            token=self._config.token,
+            rate_limiter=self._rate_limiter,
+            cache=None if no_cache else self._cache,
+            refresh=refresh,
+            profiler=profiler,
+        )
+
+    def stock_index(self, client: TushareClient) -> StockIndex:
+        with self._lock:
+            now: float = time.monotonic()
+            expired: bool = (
+                self._stock_index_ttl is not None
+                and now - self._stock_index_loaded_at > self._stock_index_ttl
+            )
+            if self._stock_index is None or expired:
+                self._stock_index = load_stock_index(client)
+                self._stock_index_loaded_at = now
+            return self._stock_index
+
+
+def run_app(
+    options: QueryOptions,
+    keywords: Iterable[str],
+    context: AppContext | None = None,
+    stdout: TextIO | None = None,
+    stderr: TextIO | None = None,
+) -> AppResult:
     _validate_options(options)
+    if not (options.profile or options.profile_json or options.profile_trace):
+        return _run_query(options, keywords, context, stdout, profiler=None)
+    if options.profile_trace:
+        with _TRACE_LOCK:
+            return _run_profiled(options, keywords, context, stdout, stderr)
+    return _run_profiled(options, keywords, context, stdout, stderr)
 
-    config: AppConfig = load_config(options.config_path)
-    client: TushareClient = TushareClient(token=config.token)
 
-    registry: IndicatorRegistry = load_registry(API_ORDER)
-    plugin_dir: Path = Path.cwd() / "plugins"
-    load_plugins(plugin_dir, registry)
+def _run_profiled(
+    options: QueryOptions,
+    keywords: Iterable[str],
+    context: AppContext | None,
+    stdout: TextIO | None,
+    stderr: TextIO | None,
+) -> AppResult:
+    profiler: Profiler = Profiler()
+    trace: cProfile.Profile | None = cProfile.Profile() if options.profile_trace else None
+    if trace is not None:
+        trace.enable()
+    try:
+        return _run_query(options, keywords, context, stdout, profiler)
+    finally:
+        if trace is not None and options.profile_trace:
+            trace.disable()
+            trace.dump_stats(Path(options.profile_trace).expanduser())
+        if options.profile:
+            profiler.print_summary(stderr)
+        if options.profile_json:
+            profiler.write_json(options.profile_json)
 
-    selection: StockSelection = select_stocks(client, keywords)
+
+def _run_query(
+    options: QueryOptions,
+    keywords: Iterable[str],
+    context: AppContext | None,
+    stdout: TextIO | None,
+    profiler: Profiler | None,
+) -> AppResult:
+    if context is None:
+        with stage(profiler, "load"):
+            context = AppContext.load(options.config_path, no_cache=options.no_cache)
+    client: TushareClient = context.client(
+        refresh=options.refresh, no_cache=options.no_cache, profiler=profiler
+    )
+
+    with stage(profiler, "select"):
+        selection: StockSelection = context.stock_index(client).select(keywords)
     if not selection.ts_codes:
         return AppResult(tables=[], indicators=[])
 
-    date_range: DateRange | None = None
-    if not options.latest:
-        date_range = to_date_range(
-            options.start_date, options.end_date, default_start=_default_start()
+    date_range: DateRange | None = _query_date_range(options)
+    data_fetcher: DataFetcher = _build_data_fetcher(
+        context,
+        client,
+        options.workers,
+        # a whole-market VIP query per chunk would refetch every stock each time
+        0 if options.stream else options.bulk_threshold,
+        options.from_store,
+        options.float32,
+        options.processes,
+        profiler,
+    )
+    try:
+        if options.stream:
+            include_end_date: bool = not options.latest and options.aggregate is None
+            _stream_tables(
+                data_fetcher, options, selection, date_range, include_end_date, stdout
+            )
+            return AppResult(tables=[], indicators=[])
+
+        results: list[IndicatorResult] = _fetch_indicators(
+            data_fetcher, options, selection.ts_codes, date_range
+        )
+    finally:
+        data_fetcher.close()
+    return _write_results(options, selection, results, stdout, profiler)
+
+
+def run_batch(options: BatchOptions) -> list[AppResult]:
+    '''
+    Run every query of a batch file against one context and one DataFetcher.
+
+    Stock selection, registry and plugins load once. Queries sharing a date
+    window (and --latest flag) are planned together: the union of their
+    indicators and stocks is fetched once per API, and each query then slices
+    its rows from that and writes its own outputs.
+    '''
+    queries: list[BatchQuery] = load_batch(
+        options.query_file, options.config_path, options.log_level
+    )
+    for query in queries:
+        _validate_options(query.options)
+
+    context: AppContext = AppContext.load(options.config_path, no_cache=options.no_cache)
+    client: TushareClient = context.client(refresh=options.refresh, no_cache=options.no_cache)
+    stock_index: StockIndex = context.stock_index(client)
+    data_fetcher: DataFetcher = _build_data_fetcher(
+        context,
+        client,
+        options.workers,
+        options.bulk_threshold,
+        options.from_store,
+        options.float32,
+        options.processes,
+    )
+
+    planned: list[tuple[BatchQuery, StockSelection, DateRange | None]] = [
+        (query, stock_index.select(query.keywords), _query_date_range(query.options))
+        for query in queries
+    ]
+    results: list[AppResult] = []
+    try:
+        _prefetch_batch(data_fetcher, planned)
+        for query, selection, date_range in planned:
+            LOGGER.info("Running batch query %s", query.name)
+            if not selection.ts_codes:
+                results.append(AppResult(tables=[], indicators=[]))
+                continue
+            fetched: list[IndicatorResult] = _fetch_indicators(
+                data_fetcher, query.options, selection.ts_codes, date_range
+            )
+            results.append(_write_results(query.options, selection, fetched, stdout=None))
+    finally:
+        data_fetcher.close()
+    return results
+
+
+def _prefetch_batch(
+    data_fetcher: DataFetcher,
+    planned: list[tuple[BatchQuery, StockSelection, DateRange | None]],
+) -> None:
+    groups: dict[tuple[DateRange | None, bool], list[tuple[QueryOptions, list[str]]]] = {}
+    for query, selection, date_range in planned:
+        if selection.ts_codes:
+            # --single and analytics read the widened range their fetch will ask for
+            key: tuple[DateRange | None, bool] = (
+                lookback_range(
+                    date_range, _query_analytics(query.options), query.options.single
+                ),
+                query.options.latest,
+            )
+            groups.setdefault(key, []).append((query.options, selection.ts_codes))
+
+    for (date_range, latest), members in groups.items():
+        indicators: dict[str, None] = {}
+        ts_codes: set[str] = set()
+        seasons: set[int] = set()
+        for member_options, member_codes in members:
+            indicators.update(dict.fromkeys(member_options.indicators))
+            ts_codes.update(member_codes)
+            # --single and most analytics need every quarter of the year
+            member_analytics: Analytics | None = _query_analytics(member_options)
+            all_quarters: bool = member_analytics is not None and member_analytics.all_quarters
+            seasons.add(0 if member_options.single or all_quarters else member_options.season)
+        data_fetcher.prefetch(
+            indicators=list(indicators),
+            ts_codes=sorted(ts_codes),
+            date_range=date_range,
+            season=seasons.pop() if len(seasons) == 1 else 0,
+            single=False,
+            latest=latest,
         )
 
-    data_fetcher: DataFetcher = DataFetcher(client=client, registry=registry)
-    results: list[IndicatorResult] = data_fetcher.fetch_indicators(
+
+def _build_data_fetcher(
+    context: AppContext,
+    client: TushareClient,
+    workers: int,
+    bulk_threshold: int | None,
+    from_store: bool,
+    float32: bool = False,
+    processes: int = 1,
+    profiler: Profiler | None = None,
+) -> DataFetcher:
+    config: AppConfig = context.config
+    return DataFetcher(
+        client=client,
+        registry=context.registry,
+        workers=workers,
+        bulk_threshold=config.bulk_threshold if bulk_threshold is None else bulk_threshold,
+        store=_open_store(config) if from_store else None,
+        prefetch_fields=(
+            dict(config.cache.fields)
+            if client.cache is not None and config.cache.widen_fields
+            else None
+        ),
+        float32=float32,
+        processes=processes,
+        profiler=profiler,
+    )
+
+
+def _query_analytics(options: QueryOptions) -> Analytics | None:
+    if not (options.ttm or options.yoy or options.qoq or options.rolling):
+        return None
+    window: int = 0
+    window_agg: str = "mean"
+    if options.rolling:
+        window, window_agg = parse_rolling(options.rolling)
+    return Analytics(
+        ttm=options.ttm,
+        window=window,
+        window_agg=window_agg,
+        growth="yoy" if options.yoy else "qoq" if options.qoq else None,
+    )
+
+
+def _query_date_range(options: QueryOptions) -> DateRange | None:
+    if options.latest:
+        return None
+    return to_date_range(options.start_date, options.end_date, default_start=_default_start())
+
+
+def _write_results(
+    options: QueryOptions,
+    selection: StockSelection,
+    results: list[IndicatorResult],
+    stdout: TextIO | None,
+    profiler: Profiler | None = None,
+) -> AppResult:
+    include_end_date: bool = not options.latest and options.aggregate is None
+    with stage(profiler, "merge"):
+        data_processor: DataProcessor = DataProcessor(selection.basic_info)
+        tables: list[OutputTable] = data_processor.build_output_tables(
+            results, include_end_date
+        )
+        if options.sort_by:
+            _sort_tables(tables, options.sort_by, options.sort_order)
+
+    with stage(profiler, "output"):
+        write_tables(
+            tables,
+            options.output_format,
+            options.output_path,
+            options.delimiter,
+            include_header=not options.no_header,
+            file=stdout,
+        )
+
+    if options.excel_path:
+        from mara.excel_exporter import ExcelExporter
+
+        with stage(profiler, "excel"):
+            excel_exporter: ExcelExporter = ExcelExporter(
+                selection.basic_info, engine=options.excel_engine
+            )
+            excel_exporter.export(options.excel_path, results)
+
+    if options.plot:
+        from mara.plotter import plot_indicators
+
+        plot_indicators(results)
+
+    return AppResult(tables=tables, indicators=results)
+
+
+def _fetch_indicators(
+    data_fetcher: DataFetcher,
+    options: QueryOptions,
+    ts_codes: list[str],
+    date_range: DateRange | None,
+) -> list[IndicatorResult]:
+    return data_fetcher.fetch_indicators(
         indicators=options.indicators,
-        ts_codes=selection.ts_codes,
+        ts_codes=ts_codes,
         date_range=date_range,
         season=options.season,
         single=options.single,
         latest=options.latest,
         aggregate=options.aggregate,
+        analytics=_query_analytics(options),
     )
 
-    include_end_date: bool = not options.latest and options.aggregate is None
+
+def _stream_tables(
+    data_fetcher: DataFetcher,
+    options: QueryOptions,
+    selection: StockSelection,
+    date_range: DateRange | None,
+    include_end_date: bool,
+    stdout: TextIO | None = None,
+) -> None:
+    '''
+    Fetch, process and print chunks of ts_codes one after another.
+
+    Every stage is row-local per ts_code, so chunked output matches the batch
+    output while memory stays bounded by the chunk size. Later chunks are
+    aligned to the columns of the first chunk printed for each frequency.
+    '''
+    if options.output_path is None:
+        stream: TextIO = stdout if stdout is not None else sys.stdout
+        _stream_chunks(data_fetcher, options, selection, date_range, include_end_date, stream)
+        return
+    with Path(options.output_path).expanduser().open("w", encoding="utf-8") as handle:
+        _stream_chunks(data_fetcher, options, selection, date_range, include_end_date, handle)
+
+
+def _stream_chunks(
+    data_fetcher: DataFetcher,
+    options: QueryOptions,
+    selection: StockSelection,
+    date_range: DateRange | None,
+    include_end_date: bool,
+    stream: TextIO,
+) -> None:
     data_processor: DataProcessor = DataProcessor(selection.basic_info)
-    tables: list[OutputTable] = data_processor.build_output_tables(
-        results, include_end_date
+    columns_by_frequency: dict[str, list[str]] = _stream_columns(
+        data_fetcher, options.indicators, selection.basic_info
     )
+    include_header: bool = not options.no_header
+    for start in range(0, len(selection.ts_codes), options.chunk_size):
+        chunk: list[str] = selection.ts_codes[start : start + options.chunk_size]
+        results: list[IndicatorResult] = _fetch_indicators(
+            data_fetcher, options, chunk, date_range
+        )
+        tables: list[OutputTable] = []
+        for table in data_processor.build_output_tables(results, include_end_date):
+            if table.data.empty:
+                continue
+            columns: list[str] = columns_by_frequency[table.frequency]
+            tables.append(
+                OutputTable(frequency=table.frequency, data=table.data.reindex(columns=columns))
+            )
+        if not tables:
+            continue
+        write_text_tables(
+            tables, options.output_format, options.delimiter, include_header, stream
+        )
+        stream.flush()
+        include_header = False
 
-    if options.sort_by:
-        _sort_tables(tables, options.sort_by, options.sort_order)
 
-    print_tables(tables, options.delimiter, include_header=not options.no_header)
+def _stream_columns(
+    data_fetcher: DataFetcher, indicators: list[str], basic_info: pd.DataFrame
+) -> dict[str, list[str]]:
+    '''
+    Output columns per table, fixed before the first chunk: an indicator
+    without rows in the early chunks still gets its column, left empty there.
+    '''
+    info_cols: list[str] = [col for col in BASIC_FIELDS if col in basic_info.columns]
+    if basic_info.empty:
+        info_cols = []
+    columns_by_frequency: dict[str, list[str]] = {}
+    for indicator in dict.fromkeys(indicators):
+        frequency: str = data_fetcher.frequency(indicator)
+        key_cols: list[str] = META_FIELDS if frequency == "quarterly" else ["ts_code"]
+        columns_by_frequency.setdefault(
+            frequency, list(dict.fromkeys(info_cols + key_cols))
+        ).append(indicator)
+    return columns_by_frequency
 
-    if options.excel_path:
-        excel_exporter: ExcelExporter = ExcelExporter(selection.basic_info)
-        excel_exporter.export(options.excel_path, results)
 
-    if options.plot:
-        plot_indicators(results)
+def run_sync(options: SyncOptions) -> list[SyncResult]:
+    start: date = parse_cli_date(options.start_date) if options.start_date else _default_start()
+    config: AppConfig = load_config(options.config_path)
+    # the store tracks its own freshness; never serve sync deltas from the cache
+    client: TushareClient = _build_client(config, cache=None, refresh=False)
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    store: StatementStore = _open_store(config)
 
-    return AppResult(tables=tables, indicators=results)
+    results: list[SyncResult] = []
+    for api_name in options.apis:
+        results.append(store.sync(client, registry, api_name, start, full=options.full))
+    return results
+
+
+def _build_client(
+    config: AppConfig, cache: QueryCache | None, refresh: bool
+) -> TushareClient:
+    return TushareClient(
+        token=config.token,
+        rate_limiter=RateLimiter(config.rate_limit),
+        cache=cache,
+        refresh=refresh,
+    )
+
+
+def _open_store(config: AppConfig) -> StatementStore:
+    return StatementStore(Path(config.store_dir).expanduser())
 
 
 def _default_start() -> date:
@@ -89,6 +518,27 @@ def _validate_options(options: QueryOptions) -> None:
         raise ValueError("--latest and --aggregate cannot be used together")
     if options.aggregate and options.season not in (0, 1, 2, 3, 4):
         raise ValueError("--aggregate requires a valid --season (0-4)")
+    if options.yoy and options.qoq:
+        raise ValueError("--yoy and --qoq cannot be used together")
+    if options.rolling is not None:
+        parse_rolling(options.rolling)
+    if options.workers < 1:
+        raise ValueError("--workers must be >= 1")
+    if options.processes < 1:
+        raise ValueError("--processes must be >= 1")
+    if options.bulk_threshold is not None and options.bulk_threshold < 0:
+        raise ValueError("--bulk-threshold must be >= 0")
+    if options.stream:
+        if options.sort_by or options.excel_path or options.plot:
+            raise ValueError("--stream cannot be combined with --sort-by, --excel or --plot")
+        if options.output_format not in TEXT_FORMATS:
+            raise ValueError(f"--stream supports --format {' or '.join(TEXT_FORMATS)}")
+        if options.chunk_size < 1:
+            raise ValueError("--chunk-size must be >= 1")
+    if options.output_format in ("parquet", "feather") and options.output_path is None:
+        raise ValueError(f"--format {options.output_format} requires --output")
+    if options.no_cache and options.refresh:
+        raise ValueError("--no-cache and --refresh cannot be used together")
 
 
 def _sort_tables(tables: list[OutputTable], sort_by: str, order: str) -> None:
@@ -0,0 +1,166 @@
+"""Batch query files for 'mara batch'."""
+
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from mara.constants import EXCEL_ENGINES, OUTPUT_FORMATS
+from mara.query_options import QueryOptions
+
+# QueryOptions fields a batch entry may set; fetch tuning (workers, cache,
+# store) is shared by the whole batch and comes from the command line
+QUERY_KEYS: tuple[str, ...] = (
+    "indicators",
+    "start_date",
+    "end_date",
+    "season",
+    "single",
+    "latest",
+    "aggregate",
+    "ttm",
+    "yoy",
+    "qoq",
+    "rolling",
+    "sort_by",
+    "sort_order",
+    "no_header",
+    "delimiter",
+    "excel_path",
+    "excel_engine",
+    "output_format",
+    "output_path",
+)
+
+
+# the CLI's argparse choices, which batch entries bypass
+KEY_CHOICES: dict[str, tuple[Any, ...]] = {
+    "season": (0, 1, 2, 3, 4),
+    "aggregate": ("mean", "median"),
+    "sort_order": ("asc", "desc"),
+    "excel_engine": EXCEL_ENGINES,
+    "output_format": OUTPUT_FORMATS,
+}
+
+# annotation text per QueryOptions field, e.g. "bool" or "str | None"
+_FIELD_TYPES: dict[str, str] = {
+    field.name: str(field.type) for field in dataclasses.fields(QueryOptions)
+}
+
+_TYPE_NAMES: dict[str, str] = {"bool": "true or false", "int": "an integer", "str": "a string"}
+
+
+@dataclass(frozen=True)
+class BatchQuery:
+    name: str
+    options: QueryOptions
+    keywords: list[str]
+
+
+def load_batch(path: str, config_path: str, log_level: int) -> list[BatchQuery]:
+    '''
+    Read a YAML batch file: an optional `defaults` mapping applied to every
+    entry and a `queries` list. Each entry takes `name`, `keywords` and the
+    QueryOptions fields in QUERY_KEYS; `indicators` and `keywords` may be lists
+    or comma-separated strings.
+    '''
+    batch_path: Path = Path(path).expanduser()
+    if not batch_path.exists():
+        raise FileNotFoundError(f"Batch file not found: {batch_path}")
+    raw_data: Any = yaml.safe_load(batch_path.read_text(encoding="utf-8"))
+    if isinstance(raw_data, list):
+        raw_data = {"queries": raw_data}
+    if not isinstance(raw_data, dict):
+        raise ValueError("Batch file must contain a YAML mapping or list")
+
+    defaults: Any = raw_data.get("defaults") or {}
+    raw_queries: Any = raw_data.get("queries")
+    if not isinstance(defaults, dict):
+        raise ValueError("Batch 'defaults' must be a mapping")
+    if not isinstance(raw_queries, list) or not raw_queries:
+        raise ValueError("Batch file must contain a non-empty 'queries' list")
+
+    base: QueryOptions = QueryOptions(
+        indicators=[],
+        start_date=None,
+        end_date=None,
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+        sort_by=None,
+        sort_order="asc",
+        no_header=False,
+        delimiter=",",
+        plot=False,
+        excel_path=None,
+        config_path=config_path,
+        log_level=log_level,
+        debug=False,
+    )
+    queries: list[BatchQuery] = []
+    for idx, raw_query in enumerate(raw_queries, start=1):
+        if not isinstance(raw_query, dict):
+            raise ValueError(f"Batch query {idx} must be a mapping")
+        queries.append(_parse_query({**defaults, **raw_query}, base, idx))
+    return queries
+
+
+def _parse_query(raw_query: dict[str, Any], base: QueryOptions, idx: int) -> BatchQuery:
+    name: str = str(raw_query.get("name") or f"query {idx}")
+    unknown: list[str] = sorted(
+        str(key) for key in raw_query if key not in QUERY_KEYS and key not in ("name", "keywords")
+    )
+    if unknown:
+        raise ValueError(f"Batch {name}: unsupported keys {', '.join(unknown)}")
+
+    values: dict[str, Any] = {key: raw_query[key] for key in QUERY_KEYS if key in raw_query}
+    for key in ("start_date", "end_date"):
+        # YAML reads unquoted 2020-01-01 as a date
+        if isinstance(values.get(key), date):
+            values[key] = values[key].isoformat()
+    for key, value in values.items():
+        if key != "indicators":
+            values[key] = _check_value(name, key, value)
+    values["indicators"] = _parse_list(raw_query.get("indicators"))
+    if not values["indicators"]:
+        raise ValueError(f"Batch {name}: 'indicators' cannot be empty")
+    keywords: list[str] = _parse_list(raw_query.get("keywords"))
+    return BatchQuery(name=name, options=dataclasses.replace(base, **values), keywords=keywords)
+
+
+def _parse_list(value: Any) -> list[str]:
+    if value is None:
+        return []
+    items: list[Any] = value if isinstance(value, list) else str(value).split(",")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def _check_value(name: str, key: str, value: Any) -> Any:
+    '''
+    Check a value against its QueryOptions field type and CLI choices. Integers
+    may be given as digit strings; nothing else is coerced, so "yes" is not a
+    bool and 1 is not a string.
+    '''
+    expected: str = _FIELD_TYPES[key]
+    base_type: str = expected.split("|")[0].strip()
+    if value is None and expected.endswith("| None"):
+        return None
+    if base_type == "int" and isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    # bool is an int subclass, so compare types exactly
+    if type(value).__name__ != base_type:
+        optional: str = " or null" if expected.endswith("| None") else ""
+        raise ValueError(
+            f"Batch {name}: '{key}' must be {_TYPE_NAMES[base_type]}{optional}, got {value!r}"
+        )
+    choices: tuple[Any, ...] | None = KEY_CHOICES.get(key)
+    if choices is not None and value not in choices:
+        allowed: str = ", ".join(str(choice) for choice in choices)
+        raise ValueError(f"Batch {name}: '{key}' must be one of {allowed}, got {value!r}")
+    return value
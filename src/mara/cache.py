@@ -0,0 +1,195 @@
+"""On-disk cache for Tushare query results."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mara.config import CacheConfig
+from mara.logger import get_logger
+
+DEFAULT_TTL_KEY: str = "default"
+
+CACHE_SUFFIX: str = ".parquet"
+
+# Parquet schema metadata listing the fields an entry was fetched with
+FIELDS_METADATA_KEY: bytes = b"mara.fields"
+
+LOGGER: logging.Logger = get_logger(__name__)
+
+
+class QueryCache:
+    '''
+    Parquet-backed cache keyed on api_name plus normalized query params.
+
+    The fields param is not part of the key: each entry records the fields it
+    was fetched with, and a lookup is served from it whenever the requested
+    fields are a subset, so one wide query answers later narrower ones for the
+    same stock or period. A query for fields the entry lacks is a miss and its
+    result replaces the entry.
+
+    Entry freshness is judged by the file mtime (write time) against the per-API
+    TTL; the file atime is bumped on every hit and drives LRU eviction once the
+    total size exceeds the configured cap.
+    '''
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl: Mapping[str, float | None],
+        max_bytes: int,
+    ) -> None:
+        self._directory: Path = directory
+        self._ttl: dict[str, float | None] = dict(ttl)
+        self._max_bytes: int = max_bytes
+        self._lock: threading.Lock = threading.Lock()
+        self._total_bytes: int | None = None
+
+    @classmethod
+    def from_config(cls, config: CacheConfig) -> QueryCache:
+        directory: Path = Path(config.directory).expanduser()
+        max_bytes: int = int(config.max_size_mb * 1024 * 1024)
+        return cls(directory=directory, ttl=config.ttl, max_bytes=max_bytes)
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def get(self, api_name: str, params: Mapping[str, Any]) -> pd.DataFrame | None:
+        ttl: float | None = self._ttl_for(api_name)
+        if ttl == 0:
+            return None
+        path: Path = self._entry_path(api_name, params)
+        try:
+            stat: os.stat_result = path.stat()
+        except FileNotFoundError:
+            return None
+
+        now: float = time.time()
+        if ttl is not None and now - stat.st_mtime > ttl:
+            return None
+
+        requested: list[str] | None = _requested_fields(params)
+        try:
+            if requested is not None:
+                schema: pa.Schema = pq.read_schema(path)
+                if not _held_fields(schema).issuperset(requested):
+                    return None
+                columns: list[str] = [col for col in requested if col in schema.names]
+                data: pd.DataFrame = pd.read_parquet(path, columns=columns)
+            else:
+                data = pd.read_parquet(path)
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Dropping unreadable cache entry %s: %s", path, exc)
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path, (now, stat.st_mtime))
+        return data
+
+    def put(self, api_name: str, params: Mapping[str, Any], data: pd.DataFrame) -> None:
+        if self._ttl_for(api_name) == 0:
+            return
+        path: Path = self._entry_path(api_name, params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            table: pa.Table = pa.Table.from_pandas(data, preserve_index=False)
+            requested: list[str] | None = _requested_fields(params)
+            if requested is not None:
+                table = table.replace_schema_metadata(
+                    {
+                        **(table.schema.metadata or {}),
+                        FIELDS_METADATA_KEY: ",".join(requested).encode("utf-8"),
+                    }
+                )
+            pq.write_table(table, tmp_path)
+        except (OSError, ValueError, TypeError, pa.ArrowException) as exc:
+            LOGGER.warning("Skipping cache write for %s: %s", api_name, exc)
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        size: int = tmp_path.stat().st_size
+        with self._lock:
+            total: int = self._scan_total_bytes()
+            if path.exists():
+                total -= path.stat().st_size
+            os.replace(tmp_path, path)
+            self._total_bytes = total + size
+            if self._total_bytes > self._max_bytes:
+                self._evict(keep=path)
+
+    def _ttl_for(self, api_name: str) -> float | None:
+        if api_name in self._ttl:
+            return self._ttl[api_name]
+        return self._ttl.get(DEFAULT_TTL_KEY)
+
+    def _entry_path(self, api_name: str, params: Mapping[str, Any]) -> Path:
+        return self._directory / api_name / f"{self._key(api_name, params)}{CACHE_SUFFIX}"
+
+    def _key(self, api_name: str, params: Mapping[str, Any]) -> str:
+        normalized: dict[str, str] = {
+            name: str(value)
+            for name, value in params.items()
+            if value is not None and name != "fields"
+        }
+        payload: str = json.dumps(
+            {"api": api_name, "params": normalized}, sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _scan_total_bytes(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(
+                path.stat().st_size for path in self._directory.glob(f"*/*{CACHE_SUFFIX}")
+            )
+        return self._total_bytes
+
+    def _evict(self, keep: Path) -> None:
+        entries: list[tuple[float, int, Path]] = []
+        for path in self._directory.glob(f"*/*{CACHE_SUFFIX}"):
+            if path == keep:
+                continue
+            try:
+                stat: os.stat_result = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort(key=lambda item: item[0])
+
+        total: int = self._total_bytes or 0
+        for _atime, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._total_bytes = total
+
+
+def _requested_fields(params: Mapping[str, Any]) -> list[str] | None:
+    value: Any = params.get("fields")
+    if not value:
+        return None
+    return list(dict.fromkeys(item.strip() for item in str(value).split(",") if item.strip()))
+
+
+def _held_fields(schema: pa.Schema) -> set[str]:
+    metadata: dict[bytes, bytes] = schema.metadata or {}
+    raw: bytes | None = metadata.get(FIELDS_METADATA_KEY)
+    if raw is None:
+        # fetched without a fields param: whatever columns the API returned
+        return set(schema.names)
+    return {item for item in raw.decode("utf-8").split(",") if item}
@@ -0,0 +1,83 @@
+"""Compact in-memory dtypes for fetched statement frames."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# repeated identifiers held as categoricals
+CATEGORY_COLUMNS: tuple[str, ...] = ("ts_code",)
+
+# YYYYMMDD string columns held as nullable int32
+DATE_COLUMNS: tuple[str, ...] = ("ann_date", "f_ann_date", "end_date")
+
+# small numeric code columns held as nullable int8
+CODE_COLUMNS: tuple[str, ...] = ("report_type", "comp_type", "update_flag", "end_type")
+
+
+def compact_frame(data: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    '''
+    Convert a fetched frame to compact dtypes: categorical ts_code, int32 dates
+    and int8 report codes. A text column is only converted when every value
+    reads back unchanged, so restore_frame returns the original text. float32
+    also narrows float64 value columns, which is lossy and not restored.
+    '''
+    converted: dict[str, pd.Series | pd.Categorical] = {}
+    for column in CATEGORY_COLUMNS:
+        if column in data.columns and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            converted[column] = pd.Categorical(data[column])
+    for columns, dtype in ((DATE_COLUMNS, "Int32"), (CODE_COLUMNS, "Int8")):
+        for column in columns:
+            if column in data.columns and _is_text(data[column]):
+                numbers: pd.Series | None = _text_to_int(data[column], dtype)
+                if numbers is not None:
+                    converted[column] = numbers
+    if float32:
+        for column in data.columns:
+            if data[column].dtype == np.float64:
+                converted[column] = data[column].astype(np.float32)
+    if not converted:
+        return data
+    return data.assign(**converted)
+
+
+def restore_frame(data: pd.DataFrame) -> pd.DataFrame:
+    '''Turn the columns compact_frame converted back into text columns.'''
+    restored: dict[str, pd.Series] = {}
+    for column in CATEGORY_COLUMNS:
+        if column in data.columns and isinstance(data[column].dtype, pd.CategoricalDtype):
+            restored[column] = data[column].astype(str)
+    for column in DATE_COLUMNS + CODE_COLUMNS:
+        if column in data.columns and pd.api.types.is_integer_dtype(data[column]):
+            restored[column] = data[column].astype(str)
+    if not restored:
+        return data
+    return data.assign(**restored)
+
+
+def memory_bytes(data: pd.DataFrame) -> int:
+    return int(data.memory_usage(deep=True).sum())
+
+
+def _is_text(values: pd.Series) -> bool:
+    return pd.api.types.is_string_dtype(values) or values.dtype == object
+
+
+def _text_to_int(values: pd.Series, dtype: str) -> pd.Series | None:
+    # a few hundred distinct values repeat over the rows; check and convert those
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return None
+    text: pd.Index = pd.Index(uniques, dtype=object)
+    if not all(isinstance(value, str) for value in text):
+        return None
+    numbers: pd.Series = pd.to_numeric(pd.Series(text), errors="coerce")
+    limits: np.iinfo = np.iinfo(dtype.lower())
+    if numbers.isna().any() or numbers.min() < limits.min or numbers.max() > limits.max:
+        return None
+    integers: np.ndarray = numbers.to_numpy(dtype=np.int64)
+    # "01" or "1.0" would not read back unchanged
+    if not (pd.Index(integers).astype(str) == text).all():
+        return None
+    result: pd.arrays.IntegerArray = pd.array(integers, dtype=dtype).take(codes, allow_fill=True)
+    return pd.Series(result, index=values.index, name=values.name)
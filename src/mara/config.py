@@ -2,16 +2,45 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 import yaml
 
+from mara.constants import (
+    DEFAULT_BULK_THRESHOLD,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_SIZE_MB,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_STORE_DIR,
+)
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    directory: str = DEFAULT_CACHE_DIR
+    max_size_mb: float = DEFAULT_CACHE_MAX_SIZE_MB
+    # seconds per API name; "default" covers the rest, None never expires
+    ttl: dict[str, float | None] = field(default_factory=lambda: dict(DEFAULT_CACHE_TTL))
+    # request a superset of fields so later runs for other indicators hit the cache
+    widen_fields: bool = True
+    # superset per API name; APIs not listed request every field of their ApiSpec
+    fields: dict[str, list[str]] = field(default_factory=dict)
+
 
 @dataclass(frozen=True)
 class AppConfig:
     token: str
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    store_dir: str = DEFAULT_STORE_DIR
+    # calls per minute per API name; "default" covers the rest, None is unlimited
+    rate_limit: dict[str, float | None] = field(
+        default_factory=lambda: dict(DEFAULT_RATE_LIMIT)
+    )
+    # default for --bulk-threshold; 0 keeps the *_vip endpoints off
+    bulk_threshold: int = DEFAULT_BULK_THRESHOLD
 
 
 def load_config(path: str) -> AppConfig:
@@ -28,4 +57,88 @@ def load_config(path: str) -> AppConfig:
     if not isinstance(token_value, str) or not token_value.strip():
         raise ValueError("Config file must contain a non-empty 'token'")
 
-    return AppConfig(token=token_value.strip())
+    cache_config: CacheConfig = _parse_cache_config(raw_data.get("cache"))
+    rate_limit: dict[str, float | None] = _parse_rate_limit(raw_data.get("rate_limit"))
+    store_dir: str = _parse_store_dir(raw_data.get("store"))
+
+    bulk_threshold: Any = raw_data.get("bulk_threshold", DEFAULT_BULK_THRESHOLD)
+    if not isinstance(bulk_threshold, int) or isinstance(bulk_threshold, bool) or bulk_threshold < 0:
+        raise ValueError("Config 'bulk_threshold' must be an integer >= 0")
+    return AppConfig(
+        token=token_value.strip(),
+        cache=cache_config,
+        store_dir=store_dir,
+        rate_limit=rate_limit,
+        bulk_threshold=bulk_threshold,
+    )
+
+
+def _parse_cache_config(raw_cache: Any) -> CacheConfig:
+    if raw_cache is None:
+        return CacheConfig()
+    if not isinstance(raw_cache, dict):
+        raise ValueError("Config 'cache' must be a YAML mapping")
+
+    directory: Any = raw_cache.get("dir", DEFAULT_CACHE_DIR)
+    if not isinstance(directory, str) or not directory.strip():
+        raise ValueError("Config 'cache.dir' must be a non-empty string")
+
+    max_size_mb: Any = raw_cache.get("max_size_mb", DEFAULT_CACHE_MAX_SIZE_MB)
+    if not isinstance(max_size_mb, (int, float)) or max_size_mb <= 0:
+        raise ValueError("Config 'cache.max_size_mb' must be a positive number")
+
+    ttl: dict[str, float | None] = dict(DEFAULT_CACHE_TTL)
+    raw_ttl: Any = raw_cache.get("ttl") or {}
+    if not isinstance(raw_ttl, dict):
+        raise ValueError("Config 'cache.ttl' must be a mapping of API name to seconds")
+    for api_name, seconds in raw_ttl.items():
+        if seconds is not None and (not isinstance(seconds, (int, float)) or seconds < 0):
+            raise ValueError(f"Config 'cache.ttl.{api_name}' must be >= 0 or null")
+        ttl[str(api_name)] = None if seconds is None else float(seconds)
+
+    widen_fields: Any = raw_cache.get("widen_fields", True)
+    if not isinstance(widen_fields, bool):
+        raise ValueError("Config 'cache.widen_fields' must be true or false")
+
+    fields: dict[str, list[str]] = {}
+    raw_fields: Any = raw_cache.get("fields") or {}
+    if not isinstance(raw_fields, dict):
+        raise ValueError("Config 'cache.fields' must be a mapping of API name to field list")
+    for api_name, field_list in raw_fields.items():
+        if not isinstance(field_list, list) or not all(
+            isinstance(item, str) for item in field_list
+        ):
+            raise ValueError(f"Config 'cache.fields.{api_name}' must be a list of field names")
+        fields[str(api_name)] = list(field_list)
+
+    return CacheConfig(
+        directory=directory.strip(),
+        max_size_mb=float(max_size_mb),
+        ttl=ttl,
+        widen_fields=widen_fields,
+        fields=fields,
+    )
+
+
+def _parse_rate_limit(raw_limit: Any) -> dict[str, float | None]:
+    rate_limit: dict[str, float | None] = dict(DEFAULT_RATE_LIMIT)
+    if raw_limit is None:
+        return rate_limit
+    if not isinstance(raw_limit, dict):
+        raise ValueError("Config 'rate_limit' must be a mapping of API name to calls per minute")
+    for api_name, calls in raw_limit.items():
+        if calls is not None and (not isinstance(calls, (int, float)) or calls <= 0):
+            raise ValueError(f"Config 'rate_limit.{api_name}' must be > 0 or null")
+        rate_limit[str(api_name)] = None if calls is None else float(calls)
+    return rate_limit
+
+
+def _parse_store_dir(raw_store: Any) -> str:
+    if raw_store is None:
+        return DEFAULT_STORE_DIR
+    if not isinstance(raw_store, dict):
+        raise ValueError("Config 'store' must be a YAML mapping")
+    directory: Any = raw_store.get("dir", DEFAULT_STORE_DIR)
+    if not isinstance(directory, str) or not directory.strip():
+        raise ValueError("Config 'store.dir' must be a non-empty string")
+    return directory.strip()
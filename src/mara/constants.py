@@ -6,10 +6,63 @@ API_ORDER: list[str] = ["fina_indicator", "income", "balancesheet", "cashflow"]
 
 SINGLE_QUARTER_APIS: set[str] = {"income", "cashflow"}
 
+# per-period endpoints returning every company at once (requires 5000 points)
+BULK_API_NAMES: dict[str, str] = {
+    "income": "income_vip",
+    "balancesheet": "balancesheet_vip",
+    "cashflow": "cashflow_vip",
+    "fina_indicator": "fina_indicator_vip",
+}
+
+# APIs whose start_date/end_date bound the report period rather than ann_date
+REPORT_PERIOD_RANGE_APIS: set[str] = {"fina_indicator"}
+
+# report periods an incremental sync of those APIs re-reads for late filings
+SYNC_OPEN_QUARTERS: int = 8
+
+# stock count from which per-period bulk queries replace per-stock ones; the
+# *_vip endpoints need 5000 Tushare points, so 0 (off) unless configured
+DEFAULT_BULK_THRESHOLD: int = 0
+
+BULK_PAGE_SIZE: int = 5000
+
+# ts_codes fetched, processed and printed together in --stream mode
+DEFAULT_STREAM_CHUNK_SIZE: int = 100
+
 BASIC_FIELDS: list[str] = ["ts_code", "name", "industry", "market", "area", "list_date"]
 
 META_FIELDS: list[str] = ["ts_code", "ann_date", "end_date"]
 
+DEFAULT_CACHE_DIR: str = "~/.cache/mara"
+
+DEFAULT_CACHE_MAX_SIZE_MB: float = 1024.0
+
+# seconds; "default" applies to APIs without their own entry
+DEFAULT_CACHE_TTL: dict[str, float | None] = {"default": 86400.0, "stock_basic": 86400.0}
+
+DEFAULT_STORE_DIR: str = "~/.local/share/mara/store"
+
+# calls per minute; matches the 2000-point Tushare tier
+DEFAULT_RATE_LIMIT: dict[str, float | None] = {"default": 200.0}
+
+TEXT_FORMATS: tuple[str, ...] = ("csv", "jsonl")
+
+COLUMNAR_FORMATS: tuple[str, ...] = ("parquet", "feather", "arrow")
+
+OUTPUT_FORMATS: tuple[str, ...] = TEXT_FORMATS + COLUMNAR_FORMATS
+
+EXCEL_ENGINES: tuple[str, ...] = ("xlsxwriter", "openpyxl")
+
+DEFAULT_SERVER_HOST: str = "127.0.0.1"
+
+DEFAULT_SERVER_PORT: int = 8765
+
+# http://host:port or unix:/path/to/socket of a running 'mara serve'
+SERVER_ENV_VAR: str = "MARA_SERVER"
+
+# shared secret sent as "Authorization: Bearer <token>" to 'mara serve'
+SERVER_TOKEN_ENV_VAR: str = "MARA_SERVER_TOKEN"
+
 # (field_name, cn_name)
 type ApiFieldSpec = tuple[str, str]
 
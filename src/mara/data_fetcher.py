@@ -2,19 +2,44 @@
 
 from __future__ import annotations
 
+import dataclasses
 import logging
 from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-from mara.constants import META_FIELDS, SINGLE_QUARTER_APIS
-from mara.date_utils import DateRange, filter_quarter_dates, to_yyyymmdd
+from mara.analytics import Analytics, apply_analytics, lookback_range
+from mara.compact import compact_frame, memory_bytes, restore_frame
+from mara.constants import (
+    BULK_API_NAMES,
+    DEFAULT_BULK_THRESHOLD,
+    META_FIELDS,
+    REPORT_PERIOD_RANGE_APIS,
+    SINGLE_QUARTER_APIS,
+)
+from mara.date_utils import (
+    QUARTER_END_MONTH_DAYS,
+    DateRange,
+    quarter_end_dates,
+    to_yyyymmdd,
+)
+from mara.expressions import (
+    Expression,
+    ExpressionEvaluator,
+    is_expression,
+    parse_expression,
+)
 from mara.indicator_registry import ApiSpec, IndicatorRegistry
 from mara.logger import get_logger
-from mara.tushare_client import TushareClient
+from mara.parallel import ShardPool, code_shards
+from mara.profiler import Profiler, stage
+from mara.store import StatementStore
+from mara.tushare_client import RateLimitError, TushareClient
 
 REPORT_TYPE_PRIORITY: dict[str, int] = {
     "4": 60,
@@ -31,22 +56,129 @@ REPORT_TYPE_PRIORITY: dict[str, int] = {
     "6": 10,
 }
 
+# frames smaller than this are processed in-process even with --processes
+PARALLEL_MIN_ROWS: int = 200_000
+
+NAT_DAYS: int = int(np.iinfo(np.int64).min)
+
 DEDUP_FIELD_CANDIDATES: list[str] = ["report_type", "update_flag", "f_ann_date"]
 
 LOGGER: logging.Logger = get_logger(__name__)
 
 
+@dataclass(frozen=True)
+class _PrefetchedFrame:
+    fields: frozenset[str]
+    ts_codes: frozenset[str]
+    data: pd.DataFrame
+
+
 @dataclass(frozen=True)
 class IndicatorResult:
+    '''
+    One indicator as a lazy view over a possibly shared frame.
+
+    Indicators fetched from the same API share one frame and differ only in
+    their column selection; `data` materializes the selection on access.
+    '''
+
     name: str
     frequency: str
-    data: pd.DataFrame
+    frame: pd.DataFrame
+    # None selects every column of frame
+    columns: tuple[str, ...] | None = None
+    # results with the same source share frame; custom indicators are their own source
+    source: str = ""
+
+    @property
+    def data(self) -> pd.DataFrame:
+        # frames hold compact dtypes; callers see the text columns as fetched
+        if self.columns is None:
+            return restore_frame(self.frame)
+        return restore_frame(self.frame[list(self.columns)])
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
 
 
 class DataFetcher:
-    def __init__(self, client: TushareClient, registry: IndicatorRegistry) -> None:
+    def __init__(
+        self,
+        client: TushareClient,
+        registry: IndicatorRegistry,
+        workers: int = 1,
+        bulk_threshold: int = DEFAULT_BULK_THRESHOLD,
+        store: StatementStore | None = None,
+        prefetch_fields: dict[str, list[str]] | None = None,
+        float32: bool = False,
+        processes: int = 1,
+        profiler: Profiler | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if processes < 1:
+            raise ValueError("processes must be >= 1")
         self._client: TushareClient = client
         self._registry: IndicatorRegistry = registry
+        self._workers: int = workers
+        # 0 disables the per-period VIP endpoints, as does the first failed bulk fetch
+        self._bulk_threshold: int = bulk_threshold
+        self._store: StatementStore | None = store
+        # None requests only the needed fields; otherwise every API is queried for
+        # its listed superset, or all ApiSpec fields when it is not listed
+        self._prefetch_fields: dict[str, list[str]] | None = prefetch_fields
+        self._prefetched: dict[tuple[str, DateRange | None, bool], _PrefetchedFrame] = {}
+        # narrow indicator values to float32 when compacting fetched frames
+        self._float32: bool = float32
+        # post-fetch stages of large frames run on ts_code shards in this pool
+        self._shard_pool: ShardPool | None = ShardPool(processes) if processes > 1 else None
+        self._profiler: Profiler | None = profiler
+
+    def prefetch(
+        self,
+        indicators: Iterable[str],
+        ts_codes: Iterable[str],
+        date_range: DateRange | None,
+        season: int,
+        single: bool,
+        latest: bool,
+    ) -> None:
+        '''
+        Fetch the raw rows for the union of several queries in one go.
+
+        Frames are held per (api, date_range, latest). A later fetch_indicators
+        call with the same date_range and latest flag, whose ts_codes and fields
+        are covered, slices the held frame by ts_code instead of querying again;
+        the rows it sees are exactly those its own fetch would have returned.
+        '''
+        ts_code_list: list[str] = list(ts_codes)
+        grouped: dict[str, list[str]] = {}
+        for indicator in indicators:
+            for name in self._input_names(indicator):
+                api_name: str | None = self._registry.get_api(name)
+                if api_name is not None:
+                    grouped.setdefault(api_name, []).append(name)
+
+        for api_name, api_indicators in grouped.items():
+            fields: list[str] = self._requested_fields(api_name, api_indicators)
+            frames: list[pd.DataFrame] = self._fetch_frames(
+                api_name,
+                self._plan_fields(api_name, fields),
+                ts_code_list,
+                date_range,
+                season,
+                single,
+                latest,
+            )
+            data: pd.DataFrame = (
+                compact_frame(pd.concat(frames, ignore_index=True), self._float32)
+                if frames
+                else pd.DataFrame()
+            )
+            self._prefetched[(api_name, date_range, latest)] = _PrefetchedFrame(
+                fields=frozenset(fields), ts_codes=frozenset(ts_code_list), data=data
+            )
 
     def fetch_indicators(
         self,
@@ -57,6 +189,7 @@ class DataFetcher:
         single: bool,
         latest: bool,
         aggregate: str | None,
+        analytics: Analytics | None = None,
     ) -> list[IndicatorResult]:
         '''
         Fetch financial indicators for multiple securities within a specified date range.
@@ -64,60 +197,188 @@ class DataFetcher:
         This method retrieves indicator data from Tushare APIs and custom indicators.
         It organizes requests by API endpoint to minimize network calls, handles custom
         indicators separately, and applies filtering/aggregation based on user parameters.
+        Inputs declared by custom indicators are fetched together with the requested
+        indicators of the same API, so a plugin costs no extra requests.
         '''
         indicator_list: list[str] = list(indicators)
         ts_code_list: list[str] = list(ts_codes)
         grouped: dict[str, list[str]] = {}
+        requested: set[str] = set()
+        plugin_inputs: dict[str, tuple[str, ...]] = {}
+        expressions: dict[str, Expression] = {}
         unsupported_single_apis: set[str] = set()
         results: list[IndicatorResult] = []
 
         for indicator in indicator_list:
             api_name: str | None = self._registry.get_api(indicator)
             if api_name is None:
+                inputs: tuple[str, ...] = self._registry.custom_inputs.get(indicator, ())
+                if inputs:
+                    plugin_inputs[indicator] = inputs
+                    continue
+                if indicator not in self._registry.custom_indicators and is_expression(
+                    indicator
+                ):
+                    expressions[indicator] = parse_expression(indicator)
+                    continue
                 custom_data: pd.DataFrame = self._run_custom_indicator(
                     indicator, ts_code_list
                 )
                 results.append(
-                    IndicatorResult(name=indicator, frequency="custom", data=custom_data)
+                    IndicatorResult(
+                        name=indicator, frequency="custom", frame=custom_data, source=indicator
+                    )
                 )
                 continue
             grouped.setdefault(api_name, []).append(indicator)
-            if single and api_name not in SINGLE_QUARTER_APIS:
-                unsupported_single_apis.add(api_name)
-
-        if single and unsupported_single_apis:
+            requested.add(indicator)
+
+        derived_inputs: dict[str, tuple[str, ...]] = {
+            **plugin_inputs,
+            **{text: expression.inputs for text, expression in expressions.items()},
+        }
+        for indicator, inputs in derived_inputs.items():
+            for input_name in inputs:
+                input_api: str | None = self._registry.get_api(input_name)
+                if input_api is None:
+                    kind: str = "Expression" if indicator in expressions else "Custom indicator"
+                    raise ValueError(f"{kind} {indicator}: unknown input indicator {input_name}")
+                api_inputs: list[str] = grouped.setdefault(input_api, [])
+                if input_name not in api_inputs:
+                    api_inputs.append(input_name)
+
+        cumulative_flags: list[str] = [
+            flag
+            for flag, enabled in (
+                ("--single", single),
+                ("--ttm", analytics is not None and analytics.ttm),
+            )
+            if enabled
+        ]
+        if cumulative_flags:
+            unsupported_single_apis = set(grouped) - SINGLE_QUARTER_APIS
+        if cumulative_flags and unsupported_single_apis:
             supported: str = ", ".join(sorted(SINGLE_QUARTER_APIS))
             ignored: str = ", ".join(sorted(unsupported_single_apis))
             LOGGER.warning(
-                "--single only applies to APIs [%s]; ignored for indicators from APIs [%s]",
+                "%s only applies to APIs [%s]; ignored for indicators from APIs [%s]",
+                "/".join(cumulative_flags),
                 supported,
                 ignored,
             )
 
+        # TTM defines the input values, like --single; windows and growth apply to
+        # the results of expressions and plugins, computed from per-period inputs
+        derived_analytics: Analytics | None = None
+        if analytics is not None and derived_inputs and (analytics.window > 1 or analytics.growth):
+            derived_analytics = dataclasses.replace(analytics, ttm=False)
+        input_analytics: Analytics | None = (
+            Analytics(ttm=True) if analytics is not None and analytics.ttm else None
+        )
+
+        api_frames: dict[str, pd.DataFrame] = {}
+        input_frames: dict[str, pd.DataFrame] = {}
         for api_name, api_indicators in grouped.items():
-            api_df: pd.DataFrame = self._fetch_api_data(
+            loaded_df: pd.DataFrame = self._load_api_data(
+                api_name, api_indicators, ts_code_list, date_range, season, single, latest, analytics
+            )
+            if loaded_df.empty:
+                continue
+            if derived_analytics is not None:
+                input_frames[api_name] = self._process_api_data(
+                    loaded_df,
+                    api_name,
+                    api_indicators,
+                    lookback_range(date_range, analytics, single),
+                    0,
+                    single,
+                    False,
+                    None,
+                    input_analytics,
+                )
+            api_df: pd.DataFrame = self._process_api_data(
+                loaded_df,
                 api_name,
                 api_indicators,
-                ts_code_list,
                 date_range,
                 season,
                 single,
                 latest,
                 aggregate,
+                analytics,
             )
             if api_df.empty:
                 continue
+            api_frames[api_name] = api_df
+            meta_cols: list[str] = [col for col in META_FIELDS if col in api_df.columns]
             for indicator in api_indicators:
-                meta_cols: list[str] = [col for col in META_FIELDS if col in api_df.columns]
-                indicator_df: pd.DataFrame = api_df[meta_cols + [indicator]].copy()
+                if indicator not in requested:
+                    continue
                 results.append(
                     IndicatorResult(
-                        name=indicator, frequency="quarterly", data=indicator_df
+                        name=indicator,
+                        frequency="quarterly",
+                        frame=api_df,
+                        columns=(*meta_cols, indicator),
+                        source=api_name,
                     )
                 )
 
+        # latest periods differ per API and aggregates have none, so those align by ts_code
+        keys: list[str] = ["ts_code"] if latest or aggregate else ["ts_code", "end_date"]
+        finish: Callable[[pd.DataFrame, list[str]], pd.DataFrame] | None = None
+        if derived_analytics is not None:
+            api_frames, keys = input_frames, ["ts_code", "end_date"]
+
+            def finish(data: pd.DataFrame, names: list[str]) -> pd.DataFrame:
+                return process_frame(
+                    data, "derived", names, date_range, season, False, latest, aggregate,
+                    derived_analytics, self._profiler,
+                )
+
+        for indicator, inputs in plugin_inputs.items():
+            plugin_df: pd.DataFrame | None = self._join_inputs(inputs, api_frames, keys)
+            if plugin_df is not None:
+                plugin_df = self._run_plugin_indicator(indicator, plugin_df)
+                results.append(
+                    IndicatorResult(
+                        name=indicator,
+                        frequency="quarterly",
+                        frame=plugin_df if finish is None else finish(plugin_df, [indicator]),
+                        columns=(*META_FIELDS, indicator),
+                        source=indicator,
+                    )
+                )
+        if expressions:
+            results.extend(self._evaluate_expressions(expressions, api_frames, keys, finish))
+
+        # results were built per API; hand them back in the requested order
+        positions: dict[str, int] = {
+            indicator: position for position, indicator in enumerate(indicator_list)
+        }
+        results.sort(key=lambda result: positions.get(result.name, len(positions)))
         return results
 
+    def frequency(self, indicator: str) -> str:
+        '''
+        The output table an indicator's result lands in: "custom" for custom
+        indicators without declared inputs, "quarterly" for everything else.
+        '''
+        if (
+            self._registry.get_api(indicator) is None
+            and indicator not in self._registry.custom_inputs
+            and (indicator in self._registry.custom_indicators or not is_expression(indicator))
+        ):
+            return "custom"
+        return "quarterly"
+
+    def _input_names(self, indicator: str) -> tuple[str, ...]:
+        if indicator in self._registry.custom_inputs:
+            return self._registry.custom_inputs[indicator]
+        if indicator not in self._registry.custom_indicators and is_expression(indicator):
+            return parse_expression(indicator).inputs
+        return (indicator,)
+
     def _run_custom_indicator(
         self, indicator: str, ts_code_list: list[str]
     ) -> pd.DataFrame:
@@ -131,7 +392,83 @@ class DataFetcher:
         custom_df: pd.DataFrame = pd.DataFrame({"ts_code": ts_code_list, indicator: series})
         return custom_df
 
-    def _fetch_api_data(
+    def _join_inputs(
+        self, inputs: Iterable[str], api_frames: dict[str, pd.DataFrame], keys: list[str]
+    ) -> pd.DataFrame | None:
+        '''
+        Outer-join the fetched input columns on keys into one frame sorted by keys.
+        ann_date and end_date come from the first API that has the row; inputs no
+        API returned are NaN.
+        '''
+        input_list: list[str] = list(dict.fromkeys(inputs))
+        data: pd.DataFrame | None = None
+        for api_df in api_frames.values():
+            columns: list[str] = [col for col in input_list if col in api_df.columns]
+            if not columns:
+                continue
+            meta_cols: list[str] = [col for col in META_FIELDS if col in api_df.columns]
+            part: pd.DataFrame = restore_frame(api_df[meta_cols + columns])
+            if data is None:
+                data = part
+                continue
+            data = data.merge(part, on=keys, how="outer", suffixes=("", "_right"))
+            for col in META_FIELDS:
+                if f"{col}_right" in data.columns:
+                    data[col] = data[col].fillna(data.pop(f"{col}_right"))
+        if data is None:
+            return None
+
+        data = data.sort_values(keys, kind="stable", ignore_index=True)
+        data = _ensure_indicator_columns(data, input_list)
+        return data.reindex(columns=list(dict.fromkeys(META_FIELDS + input_list)))
+
+    def _run_plugin_indicator(self, indicator: str, data: pd.DataFrame) -> pd.DataFrame:
+        custom_func: Callable[[pd.DataFrame], pd.Series] = self._registry.custom_indicators[
+            indicator
+        ]
+        values: Any = custom_func(data)
+        if not isinstance(values, pd.Series):
+            values = pd.Series(values, index=data.index)
+        return data.assign(**{indicator: values})
+
+    def _evaluate_expressions(
+        self,
+        expressions: dict[str, Expression],
+        api_frames: dict[str, pd.DataFrame],
+        keys: list[str],
+        finish: Callable[[pd.DataFrame, list[str]], pd.DataFrame] | None = None,
+    ) -> list[IndicatorResult]:
+        '''
+        Evaluate every expression over one joined frame of their combined inputs.
+        One evaluator serves all of them, so shared subexpressions are computed
+        once, and the results share the frame, which finish (if given) then
+        takes through the remaining stages.
+        '''
+        inputs: list[str] = [
+            name for expression in expressions.values() for name in expression.inputs
+        ]
+        data: pd.DataFrame | None = self._join_inputs(inputs, api_frames, keys)
+        if data is None:
+            return []
+        evaluator: ExpressionEvaluator = ExpressionEvaluator(data)
+        values: dict[str, pd.Series] = {
+            text: evaluator.evaluate(expression) for text, expression in expressions.items()
+        }
+        data = data.assign(**values)
+        if finish is not None:
+            data = finish(data, list(expressions))
+        return [
+            IndicatorResult(
+                name=text,
+                frequency="quarterly",
+                frame=data,
+                columns=(*META_FIELDS, text),
+                source="expressions",
+            )
+            for text in expressions
+        ]
+
+    def _load_api_data(
         self,
         api_name: str,
         indicators: list[str],
@@ -140,220 +477,542 @@ class DataFetcher:
         season: int,
         single: bool,
         latest: bool,
-        aggregate: str | None,
+        analytics: Analytics | None = None,
     ) -> pd.DataFrame:
-        frames: list[pd.DataFrame] = []
-        dedupe_fields: list[str] = self._dedupe_fields_for_api(api_name)
-        fields: list[str] = list(dict.fromkeys(META_FIELDS + dedupe_fields + indicators))
-        fields_value: str = ",".join(fields)
-
-        for ts_code in ts_codes:
-            params: dict[str, Any] = {"ts_code": ts_code, "fields": fields_value}
-            if date_range is not None and not latest:
-                params["start_date"] = to_yyyymmdd(date_range.start)
-                params["end_date"] = to_yyyymmdd(date_range.end)
-            api_df: pd.DataFrame = self._client.query(api_name, **params)
-            # XXX: pd complains: The behavior of DataFrame concatenation with empty or all-NA entries is deprecated
-            api_df = api_df.dropna(how="all")
-            if api_df.empty:
-                continue
-            all_na_mask: pd.Series = api_df.isna().all()
-            all_na_cols: list[str] = all_na_mask[all_na_mask].index.tolist()
-            if all_na_cols:
-                api_df = api_df.drop(columns=all_na_cols)
-            required_cols: set[str] = {"ts_code", "end_date"}
-            if not required_cols.issubset(api_df.columns):
-                continue
-            frames.append(api_df)
+        '''Fetch (or take from the prefetch) and compact the rows of one API.'''
+        fields: list[str] = self._requested_fields(api_name, indicators)
+        # --single and analytics of the first periods in range read earlier quarters
+        fetch_range: DateRange | None = lookback_range(date_range, analytics, single)
+        frames: list[pd.DataFrame] | None = self._prefetched_frames(
+            api_name, fields, ts_codes, fetch_range, latest
+        )
+        if frames is None:
+            with stage(self._profiler, f"fetch:{api_name}"):
+                frames = self._fetch_frames(
+                    api_name,
+                    self._plan_fields(api_name, fields),
+                    ts_codes,
+                    fetch_range,
+                    0 if analytics is not None and analytics.all_quarters else season,
+                    single,
+                    latest,
+                )
 
         if not frames:
             return pd.DataFrame()
 
         combined_df: pd.DataFrame = pd.concat(frames, ignore_index=True)
-        combined_df = self._normalize_and_filter_range(combined_df, date_range)
-        combined_df = self._ensure_indicator_columns(combined_df, indicators)
-
-        if single and api_name in SINGLE_QUARTER_APIS:
-            combined_df = self._to_single_quarter(combined_df, indicators)
-
-        combined_df = self._filter_by_season(combined_df, season)
-
-        if latest:
-            combined_df = self._select_latest(combined_df)
-        elif aggregate:
-            combined_df = self._aggregate_quarter(combined_df, indicators, aggregate)
-
+        combined_df = combined_df[[col for col in fields if col in combined_df.columns]]
+        measure: bool = self._profiler is not None or LOGGER.isEnabledFor(logging.DEBUG)
+        raw_bytes: int = memory_bytes(combined_df) if measure else 0
+        combined_df = compact_frame(combined_df, self._float32)
+        if measure:
+            compact_bytes: int = memory_bytes(combined_df)
+            LOGGER.debug(
+                "%s: %d rows, %.1f MB fetched, %.1f MB compacted",
+                api_name,
+                len(combined_df),
+                raw_bytes / 1024 / 1024,
+                compact_bytes / 1024 / 1024,
+            )
+            if self._profiler is not None:
+                self._profiler.add_rows(f"fetch:{api_name}", len(combined_df), raw_bytes)
+                self._profiler.add_rows(f"process:{api_name}", len(combined_df), compact_bytes)
         return combined_df
 
-    def _ensure_indicator_columns(
-        self, data: pd.DataFrame, indicators: list[str]
+    def _process_api_data(
+        self,
+        combined_df: pd.DataFrame,
+        api_name: str,
+        indicators: list[str],
+        date_range: DateRange | None,
+        season: int,
+        single: bool,
+        latest: bool,
+        aggregate: str | None,
+        analytics: Analytics | None,
     ) -> pd.DataFrame:
-        missing: list[str] = [
-            indicator for indicator in indicators if indicator not in data.columns
-        ]
-        if not missing:
-            return data
-        data = data.copy()
-        for indicator in missing:
-            data[indicator] = float("nan")
-        return data
+        with stage(self._profiler, f"process:{api_name}"):
+            if self._shard_pool is not None and len(combined_df) >= PARALLEL_MIN_ROWS:
+                return self._process_sharded(
+                    self._shard_pool,
+                    combined_df,
+                    api_name,
+                    indicators,
+                    date_range,
+                    season,
+                    single,
+                    latest,
+                    aggregate,
+                    analytics,
+                )
+            return process_frame(
+                combined_df,
+                api_name,
+                indicators,
+                date_range,
+                season,
+                single,
+                latest,
+                aggregate,
+                analytics,
+                self._profiler,
+            )
 
-    def _dedupe_fields_for_api(self, api_name: str) -> list[str]:
-        api_spec: ApiSpec | None = self._registry.api_specs.get(api_name)
-        if api_spec is None:
+    def close(self) -> None:
+        if self._shard_pool is not None:
+            self._shard_pool.close()
+
+    def _requested_fields(self, api_name: str, indicators: list[str]) -> list[str]:
+        dedupe_fields: list[str] = self._dedupe_fields_for_api(api_name)
+        return list(dict.fromkeys(META_FIELDS + dedupe_fields + indicators))
+
+    def _prefetched_frames(
+        self,
+        api_name: str,
+        fields: list[str],
+        ts_codes: list[str],
+        date_range: DateRange | None,
+        latest: bool,
+    ) -> list[pd.DataFrame] | None:
+        held: _PrefetchedFrame | None = self._prefetched.get((api_name, date_range, latest))
+        if held is None or not held.fields.issuperset(fields):
+            return None
+        if not held.ts_codes.issuperset(ts_codes):
+            return None
+        if held.data.empty:
             return []
-        return [field for field in DEDUP_FIELD_CANDIDATES if field in api_spec.fields]
+        selected: pd.DataFrame = held.data[held.data["ts_code"].isin(ts_codes)]
+        return [] if selected.empty else [selected.reset_index(drop=True)]
 
-    def _normalize_and_filter_range(
-        self, data: pd.DataFrame, date_range: DateRange | None
+    def _plan_fields(self, api_name: str, fields: list[str]) -> list[str]:
+        '''
+        Widen the requested fields to the configured superset. The cache records
+        the fields each entry holds, so a wide query now answers later runs for
+        other indicators of the same API without another round-trip.
+        '''
+        if self._prefetch_fields is None or self._store is not None:
+            return fields
+        superset: list[str] | None = self._prefetch_fields.get(api_name)
+        if superset is None:
+            api_spec: ApiSpec | None = self._registry.api_specs.get(api_name)
+            superset = api_spec.fields if api_spec is not None else []
+        return list(dict.fromkeys(fields + superset))
+
+    def _process_sharded(
+        self,
+        pool: ShardPool,
+        data: pd.DataFrame,
+        api_name: str,
+        indicators: list[str],
+        date_range: DateRange | None,
+        season: int,
+        single: bool,
+        latest: bool,
+        aggregate: str | None,
+        analytics: Analytics | None,
     ) -> pd.DataFrame:
-        data = data.copy()
-        end_dates: pd.Series = pd.to_datetime(
-            data["end_date"], format="%Y%m%d", errors="coerce"
+        '''
+        Run process_frame on contiguous ts_code ranges in worker processes. Every
+        stage works per ts_code and output is sorted by ts_code, so the shards
+        concatenated in order equal an in-process run.
+        '''
+        shards: list[list[str]] = code_shards(data, pool.processes)
+        LOGGER.debug("Processing %s rows of %s in %d shards", len(data), api_name, len(shards))
+        processed: list[pd.DataFrame] = pool.map_shards(
+            process_frame,
+            data,
+            shards,
+            api_name,
+            indicators,
+            date_range,
+            season,
+            single,
+            latest,
+            aggregate,
+            analytics,
         )
-        # FIXME: no silent failures
-        data["_end_date"] = end_dates
-        data = data[data["_end_date"].notna()]
+        # aggregates come back with a fresh index per shard
+        return pd.concat(processed, ignore_index=bool(aggregate) and not latest)
 
-        if date_range is not None:
-            start_date: date = date_range.start
-            end_date: date = date_range.end
-            mask_range: pd.Series = (data["_end_date"].dt.date >= start_date) & ( # type: ignore
-                data["_end_date"].dt.date <= end_date                             # type: ignore
+    def _fetch_frames(
+        self,
+        api_name: str,
+        fields: list[str],
+        ts_codes: list[str],
+        date_range: DateRange | None,
+        season: int,
+        single: bool,
+        latest: bool,
+    ) -> list[pd.DataFrame]:
+        if self._store is not None:
+            if not self._store.has_api(api_name):
+                raise ValueError(f"{api_name} has not been synced; run 'mara sync' first")
+            store_df: pd.DataFrame | None = self._clean_frame(
+                self._store.read(api_name, fields, ts_codes, date_range)
             )
-            data = data[mask_range]
+            return [] if store_df is None else [store_df]
+
+        bulk_api: str | None = BULK_API_NAMES.get(api_name)
+        use_bulk: bool = (
+            bulk_api is not None
+            and date_range is not None
+            and not latest
+            and self._bulk_threshold > 0
+            and len(ts_codes) >= self._bulk_threshold
+        )
+        if use_bulk and bulk_api is not None and date_range is not None:
+            try:
+                return self._fetch_bulk(
+                    api_name, bulk_api, fields, ts_codes, date_range, season, single
+                )
+            except RateLimitError:
+                raise
+            except Exception as exc:
+                # most likely no VIP access, which will not change within this run
+                self._bulk_threshold = 0
+                LOGGER.warning(
+                    "Bulk fetch via %s failed (%s); using per-stock requests from now on",
+                    bulk_api,
+                    exc,
+                )
+        return self._fetch_per_stock(api_name, fields, ts_codes, date_range, latest)
 
-        data = self._dedupe_by_official_fields(data)
-        data = data.sort_values(["ts_code", "_end_date"]).drop(columns=["_end_date"])
-        data["end_date"] = data["end_date"].astype(str)
-        return data
+    def _fetch_per_stock(
+        self,
+        api_name: str,
+        fields: list[str],
+        ts_codes: list[str],
+        date_range: DateRange | None,
+        latest: bool,
+    ) -> list[pd.DataFrame]:
+        base_params: dict[str, Any] = {"fields": ",".join(fields)}
+        if date_range is not None and not latest:
+            base_params["start_date"] = to_yyyymmdd(date_range.start)
+            base_params["end_date"] = to_yyyymmdd(date_range.end)
+        params_list: list[dict[str, Any]] = [
+            {"ts_code": ts_code, **base_params} for ts_code in ts_codes
+        ]
+        stock_frames: list[pd.DataFrame | None] = self._run_queries(
+            api_name, params_list, self._query_one
+        )
+        return [frame for frame in stock_frames if frame is not None]
 
-    def _dedupe_by_official_fields(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _fetch_bulk(
+        self,
+        api_name: str,
+        bulk_api: str,
+        fields: list[str],
+        ts_codes: list[str],
+        date_range: DateRange,
+        season: int,
+        single: bool,
+    ) -> list[pd.DataFrame]:
         '''
-        Deduplicate DataFrame records based on official fields (ts_code and end_date).
-        This method removes duplicate records for the same security (ts_code) and reporting period (end_date),
-        keeping only the most recent or highest-priority record based on multiple ranking criteria.
-        The deduplication logic prioritizes records in the following order:
-        1. Report type priority (defined by REPORT_TYPE_PRIORITY mapping)
-        2. Update flag (preferring updated records marked as '1')
-        3. Announcement date (preferring f_ann_date, then ann_date, then end_date)
+        Fetch every company per report period from a VIP endpoint, then keep the
+        selected ts_codes. --single needs the earlier quarters of each year, so the
+        season only narrows the periods when single-quarter values are not requested.
+        The per-stock statement endpoints bound ann_date by date_range, so rows
+        announced outside it (such as a Q4 reported the next spring, or a later
+        restatement) are dropped here as well; APIs in REPORT_PERIOD_RANGE_APIS
+        bound the report period, which the periods already do.
         '''
-        if "ts_code" not in data.columns or "end_date" not in data.columns:
-            return data
-        data = data.copy()
-        if "_end_date" not in data.columns:
-            data["_end_date"] = pd.to_datetime(
-                data["end_date"], format="%Y%m%d", errors="coerce"
-            )
-        data = data[data["_end_date"].notna()]
-
-        if "report_type" in data.columns:
-            report_rank: pd.Series = (
-                data["report_type"]
-                .astype(str)
-                .map(REPORT_TYPE_PRIORITY)
-                .fillna(0)
-                .astype(int)
-            )
-            data["_report_rank"] = report_rank
-        else:
-            data["_report_rank"] = 0
-
-        if "update_flag" in data.columns:
-            data["_update_rank"] = data["update_flag"].astype(str).eq("1").astype(int)
-        else:
-            data["_update_rank"] = 0
-
-        f_ann_date: pd.Series | None = None
-        if "f_ann_date" in data.columns:
-            data["_f_ann_date"] = pd.to_datetime(
-                data["f_ann_date"], format="%Y%m%d", errors="coerce"
-            )
-            f_ann_date = data["_f_ann_date"]
-        ann_date: pd.Series | None = None
-        if "ann_date" in data.columns:
-            data["_ann_date"] = pd.to_datetime(
-                data["ann_date"], format="%Y%m%d", errors="coerce"
-            )
-            ann_date = data["_ann_date"]
-
-        if f_ann_date is not None:
-            date_rank: pd.Series = f_ann_date
-            if ann_date is not None:
-                date_rank = date_rank.fillna(ann_date)
-        elif ann_date is not None:
-            date_rank = ann_date
-        else:
-            date_rank = data["_end_date"]
-
-        data["_date_rank"] = date_rank.fillna(data["_end_date"])
-        data = data.sort_values(
-            ["ts_code", "_end_date", "_report_rank", "_update_rank", "_date_rank"]
-        )
-        data = data.groupby(["ts_code", "_end_date"], as_index=False, sort=False).tail(1)
-        drop_cols: list[str] = [
-            "_report_rank",
-            "_update_rank",
-            "_date_rank",
-            "_ann_date",
-            "_f_ann_date",
+        periods: list[date] = quarter_end_dates(date_range, 0 if single else season)
+        fields_value: str = ",".join(fields)
+        params_list: list[dict[str, Any]] = [
+            {"period": to_yyyymmdd(period), "fields": fields_value} for period in periods
         ]
-        data = data.drop(columns=[col for col in drop_cols if col in data.columns])
-        return data
+        LOGGER.debug(
+            "Bulk fetching %s for %d periods instead of %d stocks",
+            bulk_api,
+            len(periods),
+            len(ts_codes),
+        )
+        selected: set[str] = set(ts_codes)
+        announced_within: bool = api_name not in REPORT_PERIOD_RANGE_APIS
+        first_day: str = to_yyyymmdd(date_range.start)
+        last_day: str = to_yyyymmdd(date_range.end)
+        frames: list[pd.DataFrame] = []
+        for period_df in self._run_queries(bulk_api, params_list, self._query_pages):
+            if period_df is None:
+                continue
+            keep: pd.Series = period_df["ts_code"].isin(selected)
+            if announced_within and "ann_date" in period_df.columns:
+                announced: pd.Series = period_df["ann_date"].astype("string")
+                keep &= ((announced >= first_day) & (announced <= last_day)).fillna(False)
+            period_df = period_df[keep]
+            if not period_df.empty:
+                frames.append(period_df)
+        return frames
+
+    def _run_queries(
+        self,
+        api_name: str,
+        params_list: list[dict[str, Any]],
+        query_func: Callable[[str, dict[str, Any]], pd.DataFrame | None],
+    ) -> list[pd.DataFrame | None]:
+        '''
+        Run one query per params entry, returning frames in params_list order.
 
-    def _filter_by_season(self, data: pd.DataFrame, season: int) -> pd.DataFrame:
-        if season == 0:
-            return data
-        if season not in (1, 2, 3, 4):
-            return data
-        data = data.copy()
-        data["_end_date"] = pd.to_datetime(data["end_date"], format="%Y%m%d", errors="coerce")
-        data = data[data["_end_date"].notna()]
-        quarter_mask: list[bool] = filter_quarter_dates(
-            data["_end_date"].dt.date.tolist(), season # type: ignore
+        With more than one worker the requests run on a bounded thread pool; the
+        first failure (in params_list order) is re-raised and the requests that
+        have not started yet are cancelled.
+        '''
+        if self._workers == 1 or len(params_list) < 2:
+            return [query_func(api_name, params) for params in params_list]
+
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=min(self._workers, len(params_list)),
+            thread_name_prefix="mara-fetch",
         )
-        data = data[pd.Series(quarter_mask, index=data.index)]
-        data = data.drop(columns=["_end_date"])
-        return data
+        try:
+            futures: list[Future[pd.DataFrame | None]] = [
+                executor.submit(query_func, api_name, params) for params in params_list
+            ]
+            return [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _query_one(self, api_name: str, params: dict[str, Any]) -> pd.DataFrame | None:
+        try:
+            api_df: pd.DataFrame = self._client.query(api_name, **params)
+        except Exception as exc:
+            target: Any = params.get("ts_code") or params.get("period")
+            exc.add_note(f"while querying {api_name} for {target}")
+            raise
+        return self._clean_frame(api_df)
+
+    def _query_pages(self, api_name: str, params: dict[str, Any]) -> pd.DataFrame | None:
+        try:
+            api_df: pd.DataFrame = self._client.query_all(api_name, **params)
+        except Exception as exc:
+            exc.add_note(f"while querying {api_name} for {params.get('period')}")
+            raise
+        return self._clean_frame(api_df)
+
+    def _clean_frame(self, api_df: pd.DataFrame) -> pd.DataFrame | None:
+        # XXX: pd complains: The behavior of DataFrame concatenation with empty or all-NA entries is deprecated
+        api_df = api_df.dropna(how="all")
+        if api_df.empty:
+            return None
+        all_na_mask: pd.Series = api_df.isna().all()
+        all_na_cols: list[str] = all_na_mask[all_na_mask].index.tolist()
+        if all_na_cols:
+            api_df = api_df.drop(columns=all_na_cols)
+        required_cols: set[str] = {"ts_code", "end_date"}
+        if not required_cols.issubset(api_df.columns):
+            return None
+        return api_df
 
-    def _to_single_quarter(self, data: pd.DataFrame, indicators: list[str]) -> pd.DataFrame:
-        data = data.copy()
-        data["_end_date"] = pd.to_datetime(data["end_date"], format="%Y%m%d", errors="coerce")
-        data = data[data["_end_date"].notna()]
-        data["_year"] = data["_end_date"].dt.year # type: ignore
-        data = data.sort_values(["ts_code", "_year", "_end_date"])
+    def _dedupe_fields_for_api(self, api_name: str) -> list[str]:
+        api_spec: ApiSpec | None = self._registry.api_specs.get(api_name)
+        if api_spec is None:
+            return []
+        return [field for field in DEDUP_FIELD_CANDIDATES if field in api_spec.fields]
 
-        for indicator in indicators:
-            data[indicator] = (
-                data.groupby(["ts_code", "_year"], sort=False)[indicator]
-                .diff()
-                .fillna(data[indicator])
-            )
 
-        data = data.drop(columns=["_end_date", "_year"])
+def process_frame(
+    data: pd.DataFrame,
+    api_name: str,
+    indicators: list[str],
+    date_range: DateRange | None,
+    season: int,
+    single: bool,
+    latest: bool,
+    aggregate: str | None,
+    analytics: Analytics | None = None,
+    profiler: Profiler | None = None,
+) -> pd.DataFrame:
+    '''
+    Run the post-fetch stages in one pass.
+
+    end_date is parsed once into a `_end_date` datetime column that every stage
+    reuses; the frame is sorted by (ts_code, _end_date) after deduplication and
+    stays sorted, and stages never copy it explicitly. --single and analytics
+    run on the rows of the widened fetch range, trimmed to date_range after.
+    '''
+    fetch_range: DateRange | None = lookback_range(date_range, analytics, single)
+    data = _normalize_and_filter_range(data, fetch_range, profiler)
+    data = _ensure_indicator_columns(data, indicators)
+
+    cumulative: bool = api_name in SINGLE_QUARTER_APIS
+    # TTM sums are built from the cumulative values and replace --single
+    if single and cumulative and not (analytics is not None and analytics.ttm):
+        data = _to_single_quarter(data, indicators)
+    if analytics is not None:
+        with stage(profiler, "analytics"):
+            data = apply_analytics(data, indicators, analytics, cumulative)
+    if fetch_range is not None and date_range is not None and fetch_range != date_range:
+        data = data[data["_end_date"] >= pd.Timestamp(date_range.start)]
+
+    data = _filter_by_season(data, season)
+
+    if latest:
+        data = _select_latest(data)
+    elif aggregate:
+        return _aggregate_quarter(data, indicators, aggregate)
+
+    return data.drop(columns=["_end_date"])
+
+
+def _ensure_indicator_columns(
+    data: pd.DataFrame, indicators: list[str]
+) -> pd.DataFrame:
+    missing: list[str] = [
+        indicator for indicator in indicators if indicator not in data.columns
+    ]
+    if not missing:
         return data
+    return data.assign(**{indicator: float("nan") for indicator in missing})
+
+
+def _normalize_and_filter_range(
+    data: pd.DataFrame, date_range: DateRange | None, profiler: Profiler | None
+) -> pd.DataFrame:
+    if not pd.api.types.is_integer_dtype(data["end_date"]):
+        data["end_date"] = data["end_date"].astype(str)
+    end_dates: pd.Series = _parse_yyyymmdd(data["end_date"])
+    # FIXME: no silent failures
+    mask: pd.Series = end_dates.notna()
 
-    def _select_latest(self, data: pd.DataFrame) -> pd.DataFrame:
-        data = data.copy()
-        data["_end_date"] = pd.to_datetime(data["end_date"], format="%Y%m%d", errors="coerce")
+    if date_range is not None:
+        mask &= (end_dates >= pd.Timestamp(date_range.start)) & (
+            end_dates <= pd.Timestamp(date_range.end)
+        )
+
+    data = data[mask]
+    data["_end_date"] = end_dates[mask]
+    with stage(profiler, "dedupe"):
+        return _dedupe_by_official_fields(data)
+
+
+def _dedupe_by_official_fields(data: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Deduplicate DataFrame records based on official fields (ts_code and end_date).
+    This method removes duplicate records for the same security (ts_code) and reporting period (end_date),
+    keeping only the most recent or highest-priority record based on multiple ranking criteria.
+    The deduplication logic prioritizes records in the following order:
+    1. Report type priority (defined by REPORT_TYPE_PRIORITY mapping)
+    2. Update flag (preferring updated records marked as '1')
+    3. Announcement date (preferring f_ann_date, then ann_date, then end_date)
+    The criteria and the row position are packed into one int64 per row and
+    the winner of each (ts_code, end_date) group is its maximum, so no sort
+    runs over the rows; among equal ranks the later row wins. Only the
+    winning rows are taken from data, which comes back sorted by
+    (ts_code, _end_date).
+    '''
+    if "_end_date" not in data.columns:
+        data = data.assign(_end_date=_parse_yyyymmdd(data["end_date"]))
         data = data[data["_end_date"].notna()]
-        data = data.sort_values(["ts_code", "_end_date"])
-        latest_df: pd.DataFrame = data.groupby("ts_code", as_index=False).tail(1)
-        latest_df = latest_df.drop(columns=["_end_date"])
-        return latest_df
+    if data.empty:
+        return data
 
-    def _aggregate_quarter(
-        self, data: pd.DataFrame, indicators: list[str], agg: str
-    ) -> pd.DataFrame:
-        data = data.copy()
-        grouped: Any = data.groupby("ts_code", as_index=False)[indicators]
-        if agg == "mean":
-            agg_df: pd.DataFrame = grouped.mean(numeric_only=True)
-        elif agg == "median":
-            agg_df: pd.DataFrame = grouped.median(numeric_only=True)
-        else:
-            raise ValueError(f"Unsupported aggregate method: {agg}")
-        agg_df["ann_date"] = None
-        agg_df["end_date"] = None
-        columns: list[str] = META_FIELDS + indicators
-        return agg_df[columns]
+    end_days: np.ndarray = _epoch_days(data["_end_date"])
+    code_ids, _codes = pd.factorize(data["ts_code"], sort=True)
+    period_ids, periods = pd.factorize(end_days, sort=True)
+    valid: np.ndarray = (code_ids >= 0) & (end_days != NAT_DAYS)
+    if not valid.any():
+        # no row has a full key to rank within
+        return data.drop_duplicates(subset=["ts_code", "_end_date"], keep="last")
+    # dense group ids in (ts_code, end_date) order
+    group_ids, groups = pd.factorize(
+        np.where(valid, code_ids.astype(np.int64) * len(periods) + period_ids, -1),
+        sort=True,
+        use_na_sentinel=False,
+    )
+
+    report_rank: np.ndarray = np.zeros(len(data), dtype=np.int64)
+    if "report_type" in data.columns:
+        report_rank = _lookup_rank(
+            data["report_type"], lambda value: REPORT_TYPE_PRIORITY.get(str(value), 0)
+        )
+    update_rank: np.ndarray = np.zeros(len(data), dtype=np.int64)
+    if "update_flag" in data.columns:
+        update_rank = _lookup_rank(data["update_flag"], lambda value: int(str(value) == "1"))
+
+    date_rank: np.ndarray = end_days
+    for column in ("ann_date", "f_ann_date"):
+        if column in data.columns:
+            announced: np.ndarray = _epoch_days(_parse_yyyymmdd(data[column]))
+            date_rank = np.where(announced != NAT_DAYS, announced, date_rank)
+    date_rank = np.where(valid, date_rank - date_rank[valid].min(), 0)
+
+    position_bits: int = max(len(data) - 1, 1).bit_length()
+    date_bits: int = max(int(date_rank.max()), 1).bit_length()
+    update_shift: int = position_bits + date_bits
+    if update_shift + 1 + int(report_rank.max()).bit_length() > 63:
+        raise ValueError(f"Too many rows to deduplicate in one frame: {len(data)}")
+    packed: np.ndarray = (
+        (report_rank << (update_shift + 1))
+        | (update_rank << update_shift)
+        | (date_rank << position_bits)
+        | np.arange(len(data), dtype=np.int64)
+    )
+
+    best: np.ndarray = np.full(len(groups), -1, dtype=np.int64)
+    np.maximum.at(best, group_ids, packed)
+    if groups[0] == -1:
+        best = best[1:]
+    return data.iloc[best & ((1 << position_bits) - 1)]
+
+
+def _filter_by_season(data: pd.DataFrame, season: int) -> pd.DataFrame:
+    if season not in (1, 2, 3, 4):
+        return data
+    month: int
+    day: int
+    month, day = QUARTER_END_MONTH_DAYS[season - 1]
+    end_dates: Any = data["_end_date"].dt
+    return data[(end_dates.month == month) & (end_dates.day == day)]
+
+
+def _to_single_quarter(data: pd.DataFrame, indicators: list[str]) -> pd.DataFrame:
+    # data is sorted by (ts_code, _end_date), so each (ts_code, year) group is in date order
+    years: pd.Index = pd.DatetimeIndex(data["_end_date"]).year
+    values: pd.DataFrame = data[indicators]
+    diffs: pd.DataFrame = values.groupby([data["ts_code"], years], sort=False).diff()
+    data[indicators] = diffs.fillna(values)
+    return data
+
+
+def _select_latest(data: pd.DataFrame) -> pd.DataFrame:
+    # data is sorted by (ts_code, _end_date)
+    return data.groupby("ts_code", sort=False).tail(1)
+
+
+def _aggregate_quarter(
+    data: pd.DataFrame, indicators: list[str], agg: str
+) -> pd.DataFrame:
+    grouped: Any = data.groupby("ts_code", as_index=False)[indicators]
+    if agg == "mean":
+        agg_df: pd.DataFrame = grouped.mean(numeric_only=True)
+    elif agg == "median":
+        agg_df: pd.DataFrame = grouped.median(numeric_only=True)
+    else:
+        raise ValueError(f"Unsupported aggregate method: {agg}")
+    agg_df["ann_date"] = None
+    agg_df["end_date"] = None
+    columns: list[str] = META_FIELDS + indicators
+    return agg_df[columns]
+
+
+def _parse_yyyymmdd(values: pd.Series) -> pd.Series:
+    # statement frames repeat a few hundred distinct dates over many rows, so
+    # parse each distinct value once
+    codes, uniques = pd.factorize(values)
+    parsed: pd.DatetimeIndex = pd.DatetimeIndex(
+        pd.to_datetime(pd.Index(uniques, dtype=object).astype(str), format="%Y%m%d", errors="coerce")
+    )
+    return pd.Series(
+        parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name
+    )
+
+
+def _epoch_days(dates: pd.Series) -> np.ndarray:
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def _lookup_rank(values: pd.Series, rank_of: Callable[[Any], int]) -> np.ndarray:
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    ranks: np.ndarray = np.array([rank_of(value) for value in uniques], dtype=np.int64)
+    return ranks[codes]
@@ -7,6 +7,7 @@ from dataclasses import dataclass
 
 import pandas as pd
 
+from mara.compact import restore_frame
 from mara.constants import BASIC_FIELDS, META_FIELDS
 from mara.data_fetcher import IndicatorResult
 
@@ -45,24 +46,58 @@ class DataProcessor:
     def _merge_results(
         self, results: list[IndicatorResult], include_end_date: bool
     ) -> pd.DataFrame:
-        base_result: IndicatorResult = max(results, key=lambda item: len(item.data))
-        base_df: pd.DataFrame = base_result.data.copy()
-        join_keys: list[str] = ["ts_code"]
-        if include_end_date and "end_date" in base_df.columns:
-            join_keys.append("end_date")
-
-        merged: pd.DataFrame = base_df
+        '''
+        Outer-join all results on (ts_code[, end_date]) in one pd.concat.
+
+        Results from the same source share one frame, so their columns are taken
+        side by side without a join. Metadata columns that several sources carry (such as
+        ann_date) are collapsed into one column, taking the first non-null value
+        in result order. Indicator columns follow result order.
+        '''
+        if len(results) == 1:
+            return results[0].data
+
+        keys: list[str] = ["ts_code"]
+        if include_end_date and all("end_date" in result.frame.columns for result in results):
+            keys.append("end_date")
+        meta_cols: list[str] = [col for col in META_FIELDS if col not in keys]
+
+        by_source: dict[str, list[IndicatorResult]] = {}
         for result in results:
-            if result is base_result:
-                continue
-            other_df: pd.DataFrame = result.data.copy()
-            if include_end_date and "end_date" in other_df.columns and "end_date" in merged.columns:
-                keys: list[str] = join_keys
-            else:
-                keys: list[str] = ["ts_code"]
-            merged = merged.merge(other_df, on=keys, how="left")
-
-        return merged
+            by_source.setdefault(result.source or result.name, []).append(result)
+
+        frames: list[pd.DataFrame] = []
+        meta_values: dict[str, list[pd.Series]] = {}
+        for source_results in by_source.values():
+            # sources may hold compact or text keys; align on the text form
+            base_df: pd.DataFrame = restore_frame(source_results[0].frame)
+            indicators: list[str] = list(
+                dict.fromkeys(result.name for result in source_results)
+            )
+            columns: dict[str, pd.Series] = {}
+            for result in source_results:
+                columns[result.name] = result.frame[result.name]
+            frame: pd.DataFrame = pd.DataFrame(columns)[indicators]
+            index: pd.MultiIndex = pd.MultiIndex.from_frame(base_df[keys])
+            frame = frame.set_axis(index)
+            for col in meta_cols:
+                if col in base_df.columns:
+                    meta_values.setdefault(col, []).append(base_df[col].set_axis(index))
+            frames.append(frame[~index.duplicated(keep="last")])
+
+        merged: pd.DataFrame = pd.concat(frames, axis=1, join="outer", sort=True)
+        for col, values in meta_values.items():
+            column: pd.Series = values[0]
+            column = column[~column.index.duplicated(keep="last")].reindex(merged.index)
+            for other in values[1:]:
+                other = other[~other.index.duplicated(keep="last")]
+                column = column.fillna(other.reindex(merged.index))
+            merged[col] = column
+
+        merged = merged.reset_index()
+        ordered_cols: list[str] = [col for col in META_FIELDS if col in merged.columns]
+        ordered_cols += [result.name for result in results if result.name not in ordered_cols]
+        return merged[list(dict.fromkeys(ordered_cols))]
 
     def _attach_basic_info(self, data: pd.DataFrame) -> pd.DataFrame:
         if self._basic_info.empty:
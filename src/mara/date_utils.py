@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import date, datetime
 
+QUARTER_END_MONTH_DAYS: tuple[tuple[int, int], ...] = ((3, 31), (6, 30), (9, 30), (12, 31))
+
 
 @dataclass(frozen=True)
 class DateRange:
@@ -47,13 +48,17 @@ def quarter_from_date(value: date) -> int:
 
 def is_quarter_end(value: date) -> bool:
     month_day: tuple[int, int] = (value.month, value.day)
-    return month_day in ((3, 31), (6, 30), (9, 30), (12, 31))
-
-
-def filter_quarter_dates(values: Iterable[date], season: int) -> list[bool]:
-    results: list[bool] = []
-    for item in values:
-        item_date: date = item
-        is_match: bool = quarter_from_date(item_date) == season and is_quarter_end(item_date)
-        results.append(is_match)
+    return month_day in QUARTER_END_MONTH_DAYS
+
+
+def quarter_end_dates(date_range: DateRange, season: int = 0) -> list[date]:
+    results: list[date] = []
+    for year in range(date_range.start.year, date_range.end.year + 1):
+        for month, day in QUARTER_END_MONTH_DAYS:
+            item_date: date = date(year, month, day)
+            if not date_range.start <= item_date <= date_range.end:
+                continue
+            if season and quarter_from_date(item_date) != season:
+                continue
+            results.append(item_date)
     return results
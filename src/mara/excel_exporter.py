@@ -2,15 +2,23 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable
+import itertools
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
+import numpy as np
 import pandas as pd
 
-from mara.constants import BASIC_FIELDS, META_FIELDS
+from mara.constants import BASIC_FIELDS, EXCEL_ENGINES, META_FIELDS
 from mara.data_fetcher import IndicatorResult
 
+# rows converted to Python values at a time while streaming a sheet
+ROW_CHUNK_SIZE: int = 10000
+
+SHEET_NAME_INVALID: dict[int, str] = str.maketrans(dict.fromkeys("[]:*?/\\", "_"))
+
 
 @dataclass(frozen=True)
 class ExcelSheet:
@@ -19,36 +27,90 @@ class ExcelSheet:
 
 
 class ExcelExporter:
-    def __init__(self, basic_info: pd.DataFrame) -> None:
-        self._basic_info: pd.DataFrame = basic_info
+    '''
+    Write one sheet per indicator, streaming rows into the workbook.
+
+    xlsxwriter runs in constant_memory mode and openpyxl in write-only mode, so
+    neither keeps the sheets in memory, and each sheet's frame is only built
+    once the previous sheet has been written. The basic_info lookup table is
+    built once, and consecutive sheets over the same ts_code rows (indicators
+    sharing one API frame) reuse the same joined columns.
+    '''
+
+    def __init__(self, basic_info: pd.DataFrame, engine: str = "xlsxwriter") -> None:
+        if engine not in EXCEL_ENGINES:
+            raise ValueError(f"Unsupported Excel engine: {engine}")
+        self._engine: str = engine
+        self._info_df: pd.DataFrame = pd.DataFrame()
+        if not basic_info.empty:
+            info_cols: list[str] = [col for col in BASIC_FIELDS if col in basic_info.columns]
+            self._info_df = basic_info[info_cols].drop_duplicates("ts_code").set_index("ts_code")
+        self._last_frame: pd.DataFrame | None = None
+        self._last_codes: pd.Series | None = None
+        self._last_info: pd.DataFrame | None = None
 
     def export(self, path: str, results: Iterable[IndicatorResult]) -> None:
         output_path: Path = Path(path).expanduser()
-        sheets: list[ExcelSheet] = self._build_sheets(list(results))
-        if not sheets:
+        sheets: Iterator[ExcelSheet] = self._iter_sheets(results)
+        first: ExcelSheet | None = next(sheets, None)
+        if first is None:
             return
+        sheets = itertools.chain([first], sheets)
 
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            for sheet in sheets:
-                sheet.data.to_excel(writer, sheet_name=sheet.name, index=False)
+        if self._engine == "xlsxwriter":
+            self._write_xlsxwriter(output_path, sheets)
+        else:
+            self._write_openpyxl(output_path, sheets)
+
+    def _write_xlsxwriter(self, path: Path, sheets: Iterable[ExcelSheet]) -> None:
+        import xlsxwriter
 
-    def _build_sheets(self, results: list[IndicatorResult]) -> list[ExcelSheet]:
-        sheets: list[ExcelSheet] = []
+        workbook: Any = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+        try:
+            for sheet in sheets:
+                worksheet: Any = workbook.add_worksheet(sheet.name)
+                worksheet.write_row(0, 0, list(sheet.data.columns))
+                for row_idx, row in enumerate(_iter_rows(sheet.data), start=1):
+                    worksheet.write_row(row_idx, 0, row)
+        finally:
+            workbook.close()
+
+    def _write_openpyxl(self, path: Path, sheets: Iterable[ExcelSheet]) -> None:
+        from openpyxl import Workbook
+
+        workbook: Any = Workbook(write_only=True)
+        for sheet in sheets:
+            worksheet: Any = workbook.create_sheet(sheet.name)
+            worksheet.append(list(sheet.data.columns))
+            for row in _iter_rows(sheet.data):
+                worksheet.append(row)
+        workbook.save(path)
+
+    def _iter_sheets(self, results: Iterable[IndicatorResult]) -> Iterator[ExcelSheet]:
         used_names: dict[str, int] = {}
         for result in results:
-            df: pd.DataFrame = self._attach_basic_info(result.data)
+            df: pd.DataFrame = self._attach_basic_info(result.data, result.frame)
             base_name: str = self._sanitize_sheet_name(result.name)
             sheet_name: str = self._dedupe_sheet_name(base_name, used_names)
-            sheets.append(ExcelSheet(name=sheet_name, data=df))
-        return sheets
+            yield ExcelSheet(name=sheet_name, data=df)
 
-    def _attach_basic_info(self, data: pd.DataFrame) -> pd.DataFrame:
-        if self._basic_info.empty:
+    def _attach_basic_info(self, data: pd.DataFrame, frame: pd.DataFrame) -> pd.DataFrame:
+        if self._info_df.empty or "ts_code" not in data.columns:
             return data
 
-        info_cols: list[str] = [col for col in BASIC_FIELDS if col in self._basic_info.columns]
-        info_df: pd.DataFrame = self._basic_info[info_cols].copy()
-        merged: pd.DataFrame = info_df.merge(data, on="ts_code", how="right")
+        codes: pd.Series = data["ts_code"]
+        # views over the same shared frame have the same rows
+        same_rows: bool = frame is self._last_frame or (
+            self._last_codes is not None and codes.equals(self._last_codes)
+        )
+        if not same_rows:
+            self._last_frame = frame
+            self._last_codes = codes
+            self._last_info = self._info_df.reindex(codes.to_numpy()).set_axis(data.index)
+        info_df: pd.DataFrame = self._last_info  # type: ignore[assignment]
+        merged: pd.DataFrame = pd.concat(
+            [info_df, data.drop(columns=["ts_code"])], axis=1
+        ).assign(ts_code=codes)
 
         ordered_cols: list[str] = []
         for col in BASIC_FIELDS:
@@ -60,10 +122,11 @@ class ExcelExporter:
         for col in merged.columns:
             if col not in ordered_cols:
                 ordered_cols.append(col)
-        return merged[ordered_cols]
+        return merged[ordered_cols].reset_index(drop=True)
 
     def _sanitize_sheet_name(self, name: str) -> str:
-        cleaned: str = name.replace("/", "_")
+        # Excel rejects these in sheet names; expression indicators contain them
+        cleaned: str = name.translate(SHEET_NAME_INVALID)
         if len(cleaned) > 31:
             cleaned = cleaned[:31]
         if not cleaned:
@@ -80,3 +143,13 @@ class ExcelExporter:
         if len(base) + len(suffix) > 31:
             truncated = base[: 31 - len(suffix)]
         return f"{truncated}{suffix}"
+
+
+def _iter_rows(data: pd.DataFrame) -> Iterator[list[Any]]:
+    for start in range(0, len(data), ROW_CHUNK_SIZE):
+        # xlsxwriter rejects ±inf (e.g. an expression dividing by zero); write blanks
+        chunk: pd.DataFrame = data.iloc[start : start + ROW_CHUNK_SIZE]
+        chunk = chunk.replace([np.inf, -np.inf], np.nan).astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            yield list(row)
@@ -0,0 +1,114 @@
+"""Arithmetic expressions over indicators, such as netprofit/revenue*100."""
+
+from __future__ import annotations
+
+import ast
+import operator
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+BINARY_OPERATORS: dict[type[ast.operator], Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS: dict[type[ast.unaryop], Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@dataclass(frozen=True)
+class Expression:
+    text: str
+    tree: ast.Expression
+    # referenced indicator names in first-use order
+    inputs: tuple[str, ...]
+
+
+def is_expression(name: str) -> bool:
+    # indicator names are identifiers; anything else is read as an expression
+    return not name.isidentifier()
+
+
+def parse_expression(text: str) -> Expression:
+    '''
+    Parse an arithmetic expression of indicator names and numbers with + - * /
+    ** and parentheses. Anything else (calls, attributes, comparisons) raises
+    ValueError.
+    '''
+    try:
+        tree: ast.Expression = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"Invalid expression {text!r}: {exc.msg}") from None
+
+    inputs: dict[str, None] = {}
+    for node in ast.walk(tree.body):
+        if isinstance(node, ast.Name):
+            inputs[node.id] = None
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, int | float):
+                raise ValueError(f"Invalid expression {text!r}: only numbers are allowed")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in BINARY_OPERATORS:
+                raise ValueError(f"Invalid expression {text!r}: unsupported operator")
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in UNARY_OPERATORS:
+                raise ValueError(f"Invalid expression {text!r}: unsupported operator")
+        elif not isinstance(node, ast.expr_context | ast.operator | ast.unaryop):
+            raise ValueError(f"Invalid expression {text!r}: unsupported {type(node).__name__}")
+    if not inputs:
+        raise ValueError(f"Invalid expression {text!r}: no indicator referenced")
+    return Expression(text=text, tree=tree, inputs=tuple(inputs))
+
+
+class ExpressionEvaluator:
+    '''
+    Evaluate expressions column-wise over one frame. Every subexpression is
+    memoized by its syntax tree, so a term shared by several expressions (or
+    repeated within one) is computed once per frame. Numbers are float64, so
+    constant arithmetic follows IEEE rules too: 1/0 is inf and 9**9**9
+    overflows to inf rather than being computed as an integer.
+    '''
+
+    def __init__(self, data: pd.DataFrame) -> None:
+        self._data: pd.DataFrame = data
+        self._memo: dict[str, Any] = {}
+        # subexpressions computed rather than taken from the memo
+        self.nodes_evaluated: int = 0
+
+    def evaluate(self, expression: Expression) -> pd.Series:
+        with np.errstate(all="ignore"):
+            value: Any = self._evaluate_node(expression.tree.body)
+        if isinstance(value, pd.Series):
+            return value
+        return pd.Series(float(value), index=self._data.index)
+
+    def _evaluate_node(self, node: ast.expr) -> Any:
+        key: str = ast.dump(node)
+        if key in self._memo:
+            return self._memo[key]
+
+        value: Any
+        if isinstance(node, ast.Name):
+            value = self._data[node.id]
+        elif isinstance(node, ast.Constant):
+            value = np.float64(node.value)
+        elif isinstance(node, ast.UnaryOp):
+            value = UNARY_OPERATORS[type(node.op)](self._evaluate_node(node.operand))
+        elif isinstance(node, ast.BinOp):
+            value = BINARY_OPERATORS[type(node.op)](
+                self._evaluate_node(node.left), self._evaluate_node(node.right)
+            )
+        else:
+            raise ValueError(f"Unsupported expression node: {type(node).__name__}")
+        self.nodes_evaluated += 1
+        self._memo[key] = value
+        return value
@@ -23,12 +23,27 @@ class IndicatorRegistry:
     api_specs: dict[str, ApiSpec]
     indicator_to_api: dict[str, str] = field(default_factory=dict)
     custom_indicators: dict[str, CustomCompute] = field(default_factory=dict)
+    # Tushare indicators a custom indicator is computed from
+    custom_inputs: dict[str, tuple[str, ...]] = field(default_factory=dict)
 
     def register_indicator(self, name: str, api: str) -> None:
         self.indicator_to_api[name] = api
 
-    def register_custom_indicator(self, name: str, compute: CustomCompute) -> None:
+    def register_custom_indicator(
+        self, name: str, compute: CustomCompute, inputs: Iterable[str] = ()
+    ) -> None:
+        '''
+        Register a plugin indicator. Without inputs, compute receives a frame with
+        only the selected ts_codes. With inputs, the fetcher fetches them like any
+        other indicator and compute receives one frame of ts_code, ann_date,
+        end_date and the input columns, aligned by (ts_code, end_date), and returns
+        a Series over its rows.
+        '''
         self.custom_indicators[name] = compute
+        if inputs:
+            self.custom_inputs[name] = tuple(inputs)
+        else:
+            self.custom_inputs.pop(name, None)
 
     def get_api(self, name: str) -> str | None:
         if name in self.custom_indicators:
@@ -4,18 +4,34 @@ from __future__ import annotations
 
 import argparse
 import logging
+import os
 import sys
 from collections.abc import Sequence
-from importlib.metadata import PackageNotFoundError, version
+from typing import TYPE_CHECKING, NoReturn
 
-from mara.app import run_app
+from mara.constants import (
+    API_ORDER,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_STREAM_CHUNK_SIZE,
+    EXCEL_ENGINES,
+    OUTPUT_FORMATS,
+    SERVER_ENV_VAR,
+    SERVER_TOKEN_ENV_VAR,
+)
 from mara.logger import (
     DEFAULT_LOG_LEVEL_NAME,
     LOG_LEVEL_CHOICES,
     parse_log_level,
     setup_logging,
 )
-from mara.query_options import QueryOptions
+from mara.query_options import BatchOptions, QueryOptions, ServeOptions, SyncOptions
+
+if TYPE_CHECKING:
+    from mara.store import SyncResult
+
+# mara.app pulls in pandas and pyarrow, and mara.remote http.client; each is
+# imported only by the subcommand that needs it so --help starts fast
 
 
 class VersionAction(argparse.Action):
@@ -34,9 +50,24 @@ class VersionAction(argparse.Action):
         parser.exit()
 
 
-def build_parser() -> argparse.ArgumentParser:
-    parser: argparse.ArgumentParser = argparse.ArgumentParser(
-        prog="mara", description="Stock analysis CLI via Tushare"
+class QueryArgumentParser(argparse.ArgumentParser):
+    # used by 'mara serve': a bad forwarded query must not exit the server
+    def error(self, message: str) -> NoReturn:
+        raise ValueError(message)
+
+
+def build_parser(
+    parser_class: type[argparse.ArgumentParser] = argparse.ArgumentParser,
+) -> argparse.ArgumentParser:
+    parser: argparse.ArgumentParser = parser_class(
+        prog="mara",
+        description="Stock analysis CLI via Tushare",
+        epilog=(
+            "Subcommands: 'mara sync' updates the local statement store, 'mara batch' "
+            "runs a file of queries with shared fetches, 'mara serve' runs a query server "
+            f"(see 'mara <subcommand> --help'). With {SERVER_ENV_VAR} set, queries are "
+            "forwarded to that server."
+        ),
     )
     parser.add_argument("keywords", nargs="*", help="Stock codes/names/industry keywords")
     parser.add_argument("-i", "--indicators", required=True, help="Indicators, comma-separated")
@@ -46,16 +77,39 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--single", action="store_true", help="Use single-quarter (non-cumulative) values")
     parser.add_argument("--latest", action="store_true", help="Fetch latest data")
     parser.add_argument("-a", "--aggregate", choices=["mean", "median"], help="Aggregate quarterly data")
+    parser.add_argument("--ttm", action="store_true", help="Trailing-twelve-month sums of income and cash flow items")
+    parser.add_argument("--yoy", action="store_true", help="Year-over-year growth in percent")
+    parser.add_argument("--qoq", action="store_true", help="Quarter-over-quarter growth in percent")
+    parser.add_argument("--rolling", metavar="N:AGG", help="Rolling mean/median/sum/min/max over N quarters, e.g. 4:mean")
     parser.add_argument("-t", "--sort-by", dest="sort_by", help="Sort by indicator")
     parser.add_argument("--sort-order", choices=["asc", "desc"], default="asc")
     parser.add_argument("-v", "--verbose", default=DEFAULT_LOG_LEVEL_NAME, type=parse_log_level, metavar="LEVEL",
         help=f"Log level ({', '.join(LOG_LEVEL_CHOICES)}); default: {DEFAULT_LOG_LEVEL_NAME}",
     )
     parser.add_argument("-x", "--excel", dest="excel_path", help="Excel output path")
+    parser.add_argument("--excel-engine", dest="excel_engine", choices=EXCEL_ENGINES, default="xlsxwriter", help="Excel writer backend; default: xlsxwriter")
     parser.add_argument("--no-header", action="store_true", help="Disable header row")
     parser.add_argument("--delimiter", default=",", help="Output delimiter")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default="csv", help="Output format; default: csv")
+    parser.add_argument("-o", "--output", dest="output_path", help="Output file path; default: stdout (csv, jsonl, arrow)")
+    parser.add_argument("--stream", action="store_true", help="Fetch, process and print stocks chunk by chunk")
+    parser.add_argument("--chunk-size", dest="chunk_size", type=int, default=DEFAULT_STREAM_CHUNK_SIZE,
+        help=f"Stocks per chunk in --stream mode; default: {DEFAULT_STREAM_CHUNK_SIZE}",
+    )
     parser.add_argument("-p", "--plot", action="store_true", help="Plot indicators")
     parser.add_argument("-c", "--config", dest="config_path", default="~/.mararc")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Concurrent per-stock requests; default: 1")
+    parser.add_argument("--bulk-threshold", dest="bulk_threshold", type=int,
+        help="Stock count from which per-period VIP queries are used; 0 disables; default: bulk_threshold in the config, else 0",
+    )
+    parser.add_argument("--from-store", dest="from_store", action="store_true", help="Read statements from the local store filled by 'mara sync'")
+    parser.add_argument("--float32", action="store_true", help="Hold indicator values as float32 (less memory, ~7 significant digits)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes for post-processing large fetches; default: 1")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Bypass the on-disk query cache")
+    parser.add_argument("--refresh", action="store_true", help="Re-download and overwrite cached query results")
+    parser.add_argument("--profile", action="store_true", help="Print stage timings and per-API call statistics to stderr")
+    parser.add_argument("--profile-json", dest="profile_json", metavar="PATH", help="Write the profile as JSON to PATH")
+    parser.add_argument("--profile-trace", dest="profile_trace", metavar="PATH", help="Write a cProfile trace (pstats) to PATH")
     parser.add_argument(
         "--version",
         action=VersionAction,
@@ -66,7 +120,59 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def build_sync_parser() -> argparse.ArgumentParser:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="mara sync", description="Incrementally sync financial statements into the local store"
+    )
+    parser.add_argument("--api", dest="apis", action="append", choices=API_ORDER, help="API to sync (repeatable); default: all")
+    parser.add_argument("-s", "--start-date", dest="start_date", help="First report period for an initial sync, YYYY-MM-DD")
+    parser.add_argument("--full", action="store_true", help="Ignore the high-water mark and reload every period")
+    parser.add_argument("-v", "--verbose", default=DEFAULT_LOG_LEVEL_NAME, type=parse_log_level, metavar="LEVEL",
+        help=f"Log level ({', '.join(LOG_LEVEL_CHOICES)}); default: {DEFAULT_LOG_LEVEL_NAME}",
+    )
+    parser.add_argument("-c", "--config", dest="config_path", default="~/.mararc")
+    return parser
+
+
+def build_batch_parser() -> argparse.ArgumentParser:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="mara batch", description="Run the queries of a YAML file, fetching shared data once"
+    )
+    parser.add_argument("query_file", help="YAML file with a 'queries' list (and optional 'defaults')")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Concurrent per-stock requests; default: 1")
+    parser.add_argument("--bulk-threshold", dest="bulk_threshold", type=int,
+        help="Stock count from which per-period VIP queries are used; 0 disables; default: bulk_threshold in the config, else 0",
+    )
+    parser.add_argument("--from-store", dest="from_store", action="store_true", help="Read statements from the local store filled by 'mara sync'")
+    parser.add_argument("--float32", action="store_true", help="Hold indicator values as float32 (less memory, ~7 significant digits)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes for post-processing large fetches; default: 1")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Bypass the on-disk query cache")
+    parser.add_argument("--refresh", action="store_true", help="Re-download and overwrite cached query results")
+    parser.add_argument("-v", "--verbose", default=DEFAULT_LOG_LEVEL_NAME, type=parse_log_level, metavar="LEVEL",
+        help=f"Log level ({', '.join(LOG_LEVEL_CHOICES)}); default: {DEFAULT_LOG_LEVEL_NAME}",
+    )
+    parser.add_argument("-c", "--config", dest="config_path", default="~/.mararc")
+    return parser
+
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="mara serve",
+        description="Serve queries over local HTTP with the registry, plugins and caches kept warm",
+    )
+    parser.add_argument("--host", default=DEFAULT_SERVER_HOST, help=f"Bind address; default: {DEFAULT_SERVER_HOST}")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT, help=f"TCP port; default: {DEFAULT_SERVER_PORT}")
+    parser.add_argument("--socket", dest="socket_path", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("-v", "--verbose", default=DEFAULT_LOG_LEVEL_NAME, type=parse_log_level, metavar="LEVEL",
+        help=f"Log level ({', '.join(LOG_LEVEL_CHOICES)}); default: {DEFAULT_LOG_LEVEL_NAME}",
+    )
+    parser.add_argument("-c", "--config", dest="config_path", default="~/.mararc")
+    return parser
+
+
 def _get_version_text() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
     try:
         package_version: str = version("mara")
     except PackageNotFoundError:
@@ -90,28 +196,147 @@ def _build_options(parsed: argparse.Namespace) -> QueryOptions:
         single=parsed.single,
         latest=parsed.latest,
         aggregate=parsed.aggregate,
+        ttm=parsed.ttm,
+        yoy=parsed.yoy,
+        qoq=parsed.qoq,
+        rolling=parsed.rolling,
         sort_by=parsed.sort_by,
         sort_order=parsed.sort_order,
         no_header=parsed.no_header,
         delimiter=parsed.delimiter,
         plot=parsed.plot,
         excel_path=parsed.excel_path,
+        excel_engine=parsed.excel_engine,
         config_path=parsed.config_path,
+        workers=parsed.workers,
+        bulk_threshold=parsed.bulk_threshold,
+        no_cache=parsed.no_cache,
+        refresh=parsed.refresh,
+        from_store=parsed.from_store,
+        float32=parsed.float32,
+        processes=parsed.processes,
+        output_format=parsed.output_format,
+        output_path=parsed.output_path,
+        stream=parsed.stream,
+        chunk_size=parsed.chunk_size,
+        profile=parsed.profile,
+        profile_json=parsed.profile_json,
+        profile_trace=parsed.profile_trace,
         log_level=log_level,
         debug=parsed.debug,
     )
     return options
 
 
+def _build_sync_options(parsed: argparse.Namespace) -> SyncOptions:
+    return SyncOptions(
+        apis=list(dict.fromkeys(parsed.apis or API_ORDER)),
+        start_date=parsed.start_date,
+        full=parsed.full,
+        config_path=parsed.config_path,
+        log_level=parsed.verbose,
+    )
+
+
+def parse_query_args(argv: list[str]) -> tuple[QueryOptions, list[str]]:
+    '''
+    Parse a query's CLI arguments for 'mara serve'; usage errors raise ValueError
+    instead of exiting.
+    '''
+    parser: argparse.ArgumentParser = build_parser(QueryArgumentParser)
+    parsed: argparse.Namespace = parser.parse_args(argv)
+    return _build_options(parsed), list(parsed.keywords)
+
+
+def batch_main(argv: list[str]) -> int:
+    from mara.app import run_batch
+
+    parsed: argparse.Namespace = build_batch_parser().parse_args(argv)
+    options: BatchOptions = BatchOptions(
+        query_file=parsed.query_file,
+        config_path=parsed.config_path,
+        log_level=parsed.verbose,
+        workers=parsed.workers,
+        bulk_threshold=parsed.bulk_threshold,
+        no_cache=parsed.no_cache,
+        refresh=parsed.refresh,
+        from_store=parsed.from_store,
+        float32=parsed.float32,
+        processes=parsed.processes,
+    )
+    if options.no_cache and options.refresh:
+        raise ValueError("--no-cache and --refresh cannot be used together")
+    setup_logging(options.log_level)
+    run_batch(options)
+    return 0
+
+
+def serve_main(argv: list[str]) -> int:
+    from mara.server import serve
+
+    parsed: argparse.Namespace = build_serve_parser().parse_args(argv)
+    options: ServeOptions = ServeOptions(
+        host=parsed.host,
+        port=parsed.port,
+        socket_path=parsed.socket_path,
+        config_path=parsed.config_path,
+        log_level=parsed.verbose,
+        token=os.environ.get(SERVER_TOKEN_ENV_VAR) or None,
+    )
+    setup_logging(options.log_level)
+    serve(options, parse_query_args)
+    return 0
+
+
+def remote_main(address: str, argv: list[str]) -> int:
+    from mara.remote import forward_query
+
+    output: str = forward_query(address, argv, token=os.environ.get(SERVER_TOKEN_ENV_VAR) or None)
+    sys.stdout.write(output)
+    return 0
+
+
+def sync_main(argv: list[str]) -> int:
+    from mara.app import run_sync
+
+    parser: argparse.ArgumentParser = build_sync_parser()
+    options: SyncOptions = _build_sync_options(parser.parse_args(argv))
+    setup_logging(options.log_level)
+    results: list[SyncResult] = run_sync(options)
+    for result in results:
+        print(
+            f"{result.api_name}: {result.rows} rows, {result.periods} periods, "
+            f"high-water mark {result.high_water_mark or '-'}"
+        )
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
+    args: list[str] = list(sys.argv[1:] if argv is None else argv)
+    if args and args[0] == "sync":
+        return sync_main(args[1:])
+    if args and args[0] == "batch":
+        return batch_main(args[1:])
+    if args and args[0] == "serve":
+        return serve_main(args[1:])
+    server_address: str | None = os.environ.get(SERVER_ENV_VAR)
+    if server_address and not _runs_locally(args):
+        return remote_main(server_address, args)
     parser: argparse.ArgumentParser = build_parser()
-    parsed: argparse.Namespace = parser.parse_args(argv)
+    parsed: argparse.Namespace = parser.parse_args(args)
     options: QueryOptions = _build_options(parsed)
     setup_logging(options.log_level)
     keywords: list[str] = list(parsed.keywords)
+    from mara.app import run_app
+
     _ = run_app(options, keywords)
     return 0
 
 
+def _runs_locally(args: list[str]) -> bool:
+    # help, version and plots are answered by this process, not the server
+    return any(arg in ("-h", "--help", "--version", "-p", "--plot") for arg in args)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,27 +1,131 @@
-"""Stdout formatting for mara."""
+"""Stdout and file output for mara."""
 
 from __future__ import annotations
 
+import sys
 from collections.abc import Iterable
+from pathlib import Path
+from typing import TextIO
 
 import pandas as pd
 
+from mara.constants import COLUMNAR_FORMATS, TEXT_FORMATS
 from mara.data_processor import OutputTable
 
+# YYYYMMDD string columns stored as dates in columnar outputs
+DATE_COLUMNS: tuple[str, ...] = ("ann_date", "end_date", "list_date")
 
-def print_tables(tables: Iterable[OutputTable], delimiter: str, include_header: bool) -> None:
+
+def print_tables(
+    tables: Iterable[OutputTable],
+    delimiter: str,
+    include_header: bool,
+    file: TextIO | None = None,
+) -> None:
     tables_list: list[OutputTable] = list(tables)
     multiple: bool = len(tables_list) > 1
 
     for idx, table in enumerate(tables_list):
         if multiple:
             label: str = f"# frequency: {table.frequency}"
-            print(label)
+            print(label, file=file)
         df: pd.DataFrame = table.data
         if df.empty:
-            print("")
+            print("", file=file)
         else:
             text: str = df.to_csv(sep=delimiter, index=False, header=include_header)
-            print(text.rstrip("\n"))
+            print(text.rstrip("\n"), file=file)
         if idx < len(tables_list) - 1:
-            print("")
+            print("", file=file)
+
+
+def write_text_tables(
+    tables: Iterable[OutputTable],
+    output_format: str,
+    delimiter: str,
+    include_header: bool,
+    file: TextIO | None = None,
+) -> None:
+    if output_format == "csv":
+        print_tables(tables, delimiter, include_header, file=file)
+        return
+    stream: TextIO = file if file is not None else sys.stdout
+    for table in tables:
+        if table.data.empty:
+            continue
+        text: str = table.data.to_json(orient="records", lines=True, force_ascii=False)
+        stream.write(text if text.endswith("\n") else f"{text}\n")
+
+
+def write_tables(
+    tables: Iterable[OutputTable],
+    output_format: str,
+    output_path: str | None,
+    delimiter: str,
+    include_header: bool,
+    file: TextIO | None = None,
+) -> None:
+    '''
+    Write tables as delimited text, JSON lines, Parquet, Feather or an Arrow IPC
+    stream. Text formats go to file (default stdout) and Arrow to stdout without
+    a path. When a file output holds several frequency tables, each goes to
+    <stem>.<frequency><suffix>.
+    '''
+    tables_list: list[OutputTable] = list(tables)
+    if output_format in TEXT_FORMATS:
+        if output_path is None:
+            write_text_tables(tables_list, output_format, delimiter, include_header, file)
+            return
+        with Path(output_path).expanduser().open("w", encoding="utf-8") as handle:
+            write_text_tables(tables_list, output_format, delimiter, include_header, handle)
+        return
+
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    if output_path is None:
+        if output_format != "arrow":
+            raise ValueError(f"--format {output_format} requires --output")
+        if len(tables_list) > 1:
+            raise ValueError("Arrow output to stdout holds a single table; use --output")
+        for table in tables_list:
+            _write_arrow(table.data, sys.stdout.buffer)
+        return
+
+    base_path: Path = Path(output_path).expanduser()
+    for table in tables_list:
+        table_path: Path = base_path
+        if len(tables_list) > 1:
+            table_path = base_path.with_name(
+                f"{base_path.stem}.{table.frequency}{base_path.suffix}"
+            )
+        _write_columnar(table.data, output_format, table_path)
+
+
+def _write_columnar(data: pd.DataFrame, output_format: str, path: Path) -> None:
+    if output_format == "parquet":
+        to_columnar(data).to_parquet(path, index=False)
+    elif output_format == "feather":
+        to_columnar(data).reset_index(drop=True).to_feather(path)
+    else:
+        with path.open("wb") as handle:
+            _write_arrow(data, handle)
+
+
+def _write_arrow(data: pd.DataFrame, sink: object) -> None:
+    import pyarrow as pa
+
+    arrow_table: pa.Table = pa.Table.from_pandas(to_columnar(data), preserve_index=False)
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+
+
+def to_columnar(data: pd.DataFrame) -> pd.DataFrame:
+    converted: dict[str, pd.Series] = {}
+    for column in DATE_COLUMNS:
+        if column in data.columns and not pd.api.types.is_datetime64_any_dtype(data[column]):
+            converted[column] = pd.to_datetime(
+                data[column].astype("string"), format="%Y%m%d", errors="coerce"
+            )
+    if not converted:
+        return data
+    return data.assign(**converted)
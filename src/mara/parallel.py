@@ -0,0 +1,144 @@
+"""Process pool for partitioned frame processing."""
+
+from __future__ import annotations
+
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+FrameFunc = Callable[..., pd.DataFrame]
+
+
+class ShardPool:
+    '''
+    Run a frame function over ts_code shards of a frame in worker processes.
+
+    Each shard's rows are written, as an Arrow IPC stream, into a shared memory
+    block of their own, so a worker reads only its shard and the frame is never
+    held once per process. Results come back the same way, so no data goes
+    through the pool's pipes. Workers are started with 'spawn' on first use,
+    which is safe next to the fetch threads, and kept until close().
+    '''
+
+    def __init__(self, processes: int) -> None:
+        if processes < 2:
+            raise ValueError("processes must be >= 2")
+        self._processes: int = processes
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def processes(self) -> int:
+        return self._processes
+
+    def map_shards(
+        self, func: FrameFunc, data: pd.DataFrame, shards: list[list[str]], *args: Any
+    ) -> list[pd.DataFrame]:
+        '''
+        Apply func(rows, *args) to the rows of each shard's ts_codes, in their
+        original order, and return the results in shard order.
+        '''
+        import pyarrow as pa
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        table: pa.Table = pa.Table.from_pandas(data, preserve_index=True)
+        blocks: list[SharedMemory] = []
+        try:
+            for ts_codes in shards:
+                rows: np.ndarray = data["ts_code"].isin(ts_codes).to_numpy()
+                blocks.append(_write_table(table.filter(pa.array(rows))))
+            del table
+            futures: list[Future[str]] = [
+                self._executor.submit(_run_shard, func, block.name, args) for block in blocks
+            ]
+            wait(futures)
+            failed: list[BaseException] = [
+                error for future in futures if (error := future.exception()) is not None
+            ]
+            if failed:
+                for future in futures:
+                    if future.exception() is None:
+                        _unlink(future.result())
+                raise failed[0]
+            return [read_shared(future.result(), unlink=True) for future in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def code_shards(data: pd.DataFrame, shards: int) -> list[list[str]]:
+    '''
+    Split the sorted ts_codes of data into up to `shards` contiguous ranges of
+    about equal row counts.
+    '''
+    counts: pd.Series = data["ts_code"].astype(str).value_counts().sort_index()
+    bounds: np.ndarray = np.searchsorted(
+        counts.cumsum().to_numpy(), np.linspace(0, len(data), shards + 1)[1:-1], side="right"
+    )
+    codes: list[str] = counts.index.tolist()
+    edges: list[int] = [0, *sorted({int(bound) for bound in bounds} - {0, len(codes)}), len(codes)]
+    return [codes[start:end] for start, end in zip(edges, edges[1:], strict=False)]
+
+
+def write_shared(data: pd.DataFrame) -> SharedMemory:
+    import pyarrow as pa
+
+    return _write_table(pa.Table.from_pandas(data, preserve_index=True))
+
+
+def _write_table(table: Any) -> SharedMemory:
+    import pyarrow as pa
+
+    counter: pa.MockOutputStream = pa.MockOutputStream()
+    with pa.ipc.new_stream(counter, table.schema) as writer:
+        writer.write_table(table)
+    block: SharedMemory = SharedMemory(create=True, size=max(counter.size(), 1))
+    sink: pa.FixedSizeBufferWriter = pa.FixedSizeBufferWriter(pa.py_buffer(block.buf))
+    writer: pa.RecordBatchStreamWriter = pa.ipc.new_stream(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+    sink.close()
+    # the block can only be closed once nothing exports its buffer
+    del writer, sink
+    return block
+
+
+def read_shared(name: str, unlink: bool = False) -> pd.DataFrame:
+    import pyarrow as pa
+
+    block: SharedMemory = SharedMemory(name=name)
+    try:
+        # one copy out of the block: to_pandas may keep views into its source,
+        # and the block is released below
+        stream: bytes = bytes(block.buf)
+        return pa.ipc.open_stream(stream).read_all().to_pandas()
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+
+
+def _unlink(name: str) -> None:
+    block: SharedMemory = SharedMemory(name=name)
+    block.close()
+    block.unlink()
+
+
+def _run_shard(func: FrameFunc, name: str, args: tuple[Any, ...]) -> str:
+    result: pd.DataFrame = func(read_shared(name), *args)
+    block: SharedMemory = write_shared(result)
+    block.close()
+    return block.name
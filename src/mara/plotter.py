@@ -21,7 +21,7 @@ class PlotSpec:
 def plot_indicators(results: Iterable[IndicatorResult]) -> None:
     specs: list[PlotSpec] = []
     for result in results:
-        if result.data.empty:
+        if result.empty:
             continue
         specs.append(PlotSpec(title=result.name, data=result.data, indicator=result.name))
 
@@ -42,9 +42,11 @@ def plot_indicators(results: Iterable[IndicatorResult]) -> None:
 
 
 def _plot_indicator(axis: plt.Axes, spec: PlotSpec) -> None:
-    data: pd.DataFrame = spec.data.copy()
+    data: pd.DataFrame = spec.data
     if "end_date" in data.columns and data["end_date"].notna().any():
-        data["_end_date"] = pd.to_datetime(data["end_date"], format="%Y%m%d", errors="coerce")
+        data = data.assign(
+            _end_date=pd.to_datetime(data["end_date"], format="%Y%m%d", errors="coerce")
+        )
         for ts_code, group in data.groupby("ts_code"):
             group_sorted: pd.DataFrame = group.sort_values("_end_date")
             axis.plot(group_sorted["_end_date"], group_sorted[spec.indicator], label=ts_code)
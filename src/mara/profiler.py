@@ -0,0 +1,203 @@
+"""Run profiling: stage timings, API call statistics and memory."""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TextIO
+
+# upper bounds in milliseconds of the per-endpoint latency histogram buckets
+LATENCY_BUCKETS_MS: tuple[float, ...] = (10.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0)
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class ApiStats:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    retries: int = 0
+    retry_sleep: float = 0.0
+    throttle_wait: float = 0.0
+    rows: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+class Profiler:
+    '''
+    Collect timings for one run. Stages are named spans aggregated by name;
+    API statistics come from TushareClient. All methods are thread-safe so
+    worker threads can record into the same profiler.
+    '''
+
+    def __init__(self) -> None:
+        self._started: float = time.perf_counter()
+        self._stages: dict[str, StageStats] = {}
+        self._apis: dict[str, ApiStats] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed: float = time.perf_counter() - started
+            with self._lock:
+                stats: StageStats = self._stages.setdefault(name, StageStats())
+                stats.calls += 1
+                stats.seconds += elapsed
+
+    def add_rows(self, stage_name: str, rows: int, nbytes: int) -> None:
+        with self._lock:
+            stats: StageStats = self._stages.setdefault(stage_name, StageStats())
+            stats.rows += rows
+            stats.bytes += nbytes
+
+    def record_call(self, api_name: str, seconds: float, rows: int, error: bool = False) -> None:
+        with self._lock:
+            stats: ApiStats = self._apis.setdefault(api_name, ApiStats())
+            stats.calls += 1
+            stats.latencies.append(seconds)
+            stats.rows += rows
+            if error:
+                stats.errors += 1
+
+    def record_cache_hit(self, api_name: str) -> None:
+        with self._lock:
+            self._apis.setdefault(api_name, ApiStats()).cache_hits += 1
+
+    def record_retry(self, api_name: str, delay: float) -> None:
+        with self._lock:
+            stats: ApiStats = self._apis.setdefault(api_name, ApiStats())
+            stats.retries += 1
+            stats.retry_sleep += delay
+
+    def record_throttle(self, api_name: str, seconds: float) -> None:
+        with self._lock:
+            self._apis.setdefault(api_name, ApiStats()).throttle_wait += seconds
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            stages: dict[str, Any] = {
+                name: {
+                    "calls": stats.calls,
+                    "seconds": round(stats.seconds, 6),
+                    "rows": stats.rows,
+                    "bytes": stats.bytes,
+                }
+                for name, stats in self._stages.items()
+            }
+            apis: dict[str, Any] = {
+                name: _api_summary(stats) for name, stats in sorted(self._apis.items())
+            }
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": stages,
+            "apis": apis,
+        }
+
+    def write_json(self, path: str) -> None:
+        Path(path).expanduser().write_text(
+            json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+
+    def print_summary(self, file: TextIO | None = None) -> None:
+        stream: TextIO = file if file is not None else sys.stderr
+        summary: dict[str, Any] = self.to_dict()
+        peak_rss: int = summary["peak_rss_bytes"]
+        print(
+            f"profile: total {summary['total_seconds']:.3f}s, "
+            f"peak RSS {f'{peak_rss / 1024 / 1024:.1f} MB' if peak_rss else 'n/a'}",
+            file=stream,
+        )
+        print(f"{'stage':<28}{'calls':>7}{'seconds':>10}{'rows':>11}{'MB':>9}", file=stream)
+        for name, stats in summary["stages"].items():
+            print(
+                f"{name:<28}{stats['calls']:>7}{stats['seconds']:>10.3f}"
+                f"{stats['rows']:>11}{stats['bytes'] / 1024 / 1024:>9.1f}",
+                file=stream,
+            )
+        if not summary["apis"]:
+            return
+        print(
+            f"{'api':<22}{'calls':>7}{'hits':>6}{'errors':>7}{'retries':>8}{'sleep_s':>9}"
+            f"{'wait_s':>8}{'p50_ms':>8}{'p95_ms':>8}{'max_ms':>8}",
+            file=stream,
+        )
+        for name, stats in summary["apis"].items():
+            print(
+                f"{name:<22}{stats['calls']:>7}{stats['cache_hits']:>6}{stats['errors']:>7}"
+                f"{stats['retries']:>8}{stats['retry_sleep_seconds']:>9.2f}"
+                f"{stats['throttle_wait_seconds']:>8.2f}{stats['p50_ms']:>8.0f}"
+                f"{stats['p95_ms']:>8.0f}{stats['max_ms']:>8.0f}",
+                file=stream,
+            )
+        for name, stats in summary["apis"].items():
+            buckets: str = " ".join(
+                f"{label}:{count}" for label, count in stats["latency_histogram"].items()
+            )
+            print(f"latency {name}: {buckets}", file=stream)
+
+
+def stage(profiler: Profiler | None, name: str) -> AbstractContextManager[None]:
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+def peak_rss_bytes() -> int:
+    # getrusage is POSIX only; report 0 (unknown) elsewhere, e.g. on Windows
+    try:
+        import resource
+    except ImportError:
+        return 0
+    usage: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _api_summary(stats: ApiStats) -> dict[str, Any]:
+    latencies_ms: list[float] = sorted(value * 1000 for value in stats.latencies)
+    histogram: dict[str, int] = {f"<={bound:g}": 0 for bound in LATENCY_BUCKETS_MS}
+    histogram[f">{LATENCY_BUCKETS_MS[-1]:g}"] = 0
+    for value in latencies_ms:
+        label: str = next(
+            (f"<={bound:g}" for bound in LATENCY_BUCKETS_MS if value <= bound),
+            f">{LATENCY_BUCKETS_MS[-1]:g}",
+        )
+        histogram[label] += 1
+    return {
+        "calls": stats.calls,
+        "cache_hits": stats.cache_hits,
+        "errors": stats.errors,
+        "retries": stats.retries,
+        "retry_sleep_seconds": round(stats.retry_sleep, 6),
+        "throttle_wait_seconds": round(stats.throttle_wait, 6),
+        "rows": stats.rows,
+        "p50_ms": _percentile(latencies_ms, 0.5),
+        "p95_ms": _percentile(latencies_ms, 0.95),
+        "max_ms": latencies_ms[-1] if latencies_ms else 0.0,
+        "latency_histogram": histogram,
+    }
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index: int = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
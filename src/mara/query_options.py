@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from mara.constants import DEFAULT_STREAM_CHUNK_SIZE
+
 
 @dataclass(frozen=True)
 class QueryOptions:
@@ -23,3 +25,58 @@ class QueryOptions:
     config_path: str
     log_level: int
     debug: bool
+    workers: int = 1
+    # None takes bulk_threshold from the config
+    bulk_threshold: int | None = None
+    no_cache: bool = False
+    refresh: bool = False
+    from_store: bool = False
+    excel_engine: str = "xlsxwriter"
+    output_format: str = "csv"
+    output_path: str | None = None
+    stream: bool = False
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE
+    profile: bool = False
+    profile_json: str | None = None
+    profile_trace: str | None = None
+    float32: bool = False
+    processes: int = 1
+    ttm: bool = False
+    yoy: bool = False
+    qoq: bool = False
+    rolling: str | None = None
+
+
+@dataclass(frozen=True)
+class SyncOptions:
+    apis: list[str]
+    start_date: str | None
+    full: bool
+    config_path: str
+    log_level: int
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    query_file: str
+    config_path: str
+    log_level: int
+    workers: int = 1
+    # None takes bulk_threshold from the config
+    bulk_threshold: int | None = None
+    no_cache: bool = False
+    refresh: bool = False
+    from_store: bool = False
+    float32: bool = False
+    processes: int = 1
+
+
+@dataclass(frozen=True)
+class ServeOptions:
+    host: str
+    port: int
+    socket_path: str | None
+    config_path: str
+    log_level: int
+    # required over TCP; the Unix socket is guarded by its file mode instead
+    token: str | None = None
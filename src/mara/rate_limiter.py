@@ -0,0 +1,101 @@
+"""Client-side rate limiting for Tushare APIs."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Mapping
+
+DEFAULT_RATE_KEY: str = "default"
+
+# keep sustained throughput just under the configured quota
+RATE_HEADROOM: float = 0.95
+
+# multiplicative decrease on throttling, never below this share of the quota
+MIN_RATE_FRACTION: float = 0.25
+THROTTLE_FACTOR: float = 0.75
+# additive increase per successful call, as a share of the quota
+RECOVERY_FRACTION: float = 0.01
+
+
+class TokenBucket:
+    '''
+    Thread-safe token bucket refilled at a per-minute rate.
+
+    Callers reserve a token under the lock and sleep outside it, so concurrent
+    waiters are spread evenly instead of waking together. The rate adapts
+    (AIMD) between MIN_RATE_FRACTION and 100% of the configured quota.
+    '''
+
+    def __init__(self, calls_per_minute: float) -> None:
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be > 0")
+        self._max_rate: float = calls_per_minute * RATE_HEADROOM / 60.0
+        self._rate: float = self._max_rate
+        self._capacity: float = max(1.0, self._max_rate)
+        self._tokens: float = self._capacity
+        self._updated: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def calls_per_minute(self) -> float:
+        return self._rate * 60.0
+
+    def acquire(self) -> float:
+        with self._lock:
+            now: float = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0
+            wait: float = 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._rate = min(self._max_rate, self._rate + self._max_rate * RECOVERY_FRACTION)
+
+    def on_throttled(self, pause: float) -> None:
+        with self._lock:
+            now: float = time.monotonic()
+            self._refill(now)
+            self._rate = max(self._max_rate * MIN_RATE_FRACTION, self._rate * THROTTLE_FACTOR)
+            # hold back every caller sharing the bucket for the pause window
+            self._tokens = min(self._tokens, -pause * self._rate)
+
+    def _refill(self, now: float) -> None:
+        elapsed: float = now - self._updated
+        self._updated = now
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+
+
+class RateLimiter:
+    def __init__(self, calls_per_minute: Mapping[str, float | None]) -> None:
+        self._limits: dict[str, float | None] = dict(calls_per_minute)
+        self._buckets: dict[str, TokenBucket | None] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self, api_name: str) -> float:
+        bucket: TokenBucket | None = self._bucket(api_name)
+        if bucket is None:
+            return 0.0
+        return bucket.acquire()
+
+    def on_success(self, api_name: str) -> None:
+        bucket: TokenBucket | None = self._bucket(api_name)
+        if bucket is not None:
+            bucket.on_success()
+
+    def on_throttled(self, api_name: str, pause: float) -> None:
+        bucket: TokenBucket | None = self._bucket(api_name)
+        if bucket is not None:
+            bucket.on_throttled(pause)
+
+    def _bucket(self, api_name: str) -> TokenBucket | None:
+        with self._lock:
+            if api_name not in self._buckets:
+                limit: float | None = self._limits.get(
+                    api_name, self._limits.get(DEFAULT_RATE_KEY)
+                )
+                self._buckets[api_name] = TokenBucket(limit) if limit else None
+            return self._buckets[api_name]
@@ -0,0 +1,75 @@
+"""Thin client forwarding CLI queries to a running 'mara serve'."""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+import sys
+from typing import Any, TextIO
+from urllib.parse import SplitResult, urlsplit
+
+UNIX_PREFIX: str = "unix:"
+
+# queries may fetch for a while on a cold cache; the server enforces nothing
+DEFAULT_TIMEOUT: float = 600.0
+
+
+class RemoteError(RuntimeError):
+    pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path: str = socket_path
+
+    def connect(self) -> None:
+        sock: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+def forward_query(
+    address: str,
+    argv: list[str],
+    timeout: float = DEFAULT_TIMEOUT,
+    token: str | None = None,
+    stderr: TextIO | None = None,
+) -> str:
+    '''
+    Send one query's CLI arguments to the server at address (http://host:port or
+    unix:/path) and return what the query printed. What the query wrote to
+    stderr, such as the --profile summary, is copied to stderr (sys.stderr by
+    default). token is the server's shared secret, if it has one. Server-side
+    failures raise RemoteError with the server's message.
+    '''
+    body: bytes = json.dumps({"argv": argv, "cwd": os.getcwd()}).encode("utf-8")
+    headers: dict[str, str] = {"Content-Type": "application/json"}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    connection: http.client.HTTPConnection = _connect(address, timeout)
+    try:
+        connection.request("POST", "/query", body=body, headers=headers)
+        response: http.client.HTTPResponse = connection.getresponse()
+        payload: Any = json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+    if not isinstance(payload, dict):
+        raise RemoteError(f"Unexpected response from {address}")
+    if response.status != 200:
+        raise RemoteError(str(payload.get("error") or f"HTTP {response.status}"))
+    (stderr if stderr is not None else sys.stderr).write(str(payload.get("stderr") or ""))
+    return str(payload.get("output", ""))
+
+
+def _connect(address: str, timeout: float) -> http.client.HTTPConnection:
+    if address.startswith(UNIX_PREFIX):
+        return _UnixHTTPConnection(os.path.expanduser(address[len(UNIX_PREFIX) :]), timeout)
+    parts: SplitResult = urlsplit(address if "://" in address else f"http://{address}")
+    if parts.scheme != "http" or parts.hostname is None:
+        raise ValueError(f"Unsupported server address: {address}")
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
@@ -0,0 +1,205 @@
+"""Long-running query server for mara."""
+
+from __future__ import annotations
+
+import dataclasses
+import hmac
+import io
+import json
+import logging
+import os
+import secrets
+import socketserver
+import sys
+from collections.abc import Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from mara.app import AppContext, run_app
+from mara.constants import SERVER_TOKEN_ENV_VAR
+from mara.logger import get_logger
+from mara.query_options import QueryOptions, ServeOptions
+
+QueryParser = Callable[[list[str]], tuple[QueryOptions, list[str]]]
+
+# request bodies are argument lists; anything larger is not a query
+MAX_REQUEST_BYTES: int = 1024 * 1024
+
+LOGGER: logging.Logger = get_logger(__name__)
+
+
+class QueryServer:
+    '''
+    Answer forwarded `mara` queries against one warm AppContext.
+
+    A query is the CLI argument list plus the caller's working directory, which
+    relative --output/--excel/--profile-json/--profile-trace paths are resolved
+    against. Output that would go to stdout, and the --profile summary that
+    would go to stderr, are returned in the response instead. The server's own
+    config applies to every query.
+    '''
+
+    def __init__(self, context: AppContext, parse_args: QueryParser) -> None:
+        self._context: AppContext = context
+        self._parse_args: QueryParser = parse_args
+
+    def handle_query(self, payload: Any) -> tuple[str, str]:
+        if not isinstance(payload, dict) or not isinstance(payload.get("argv"), list):
+            raise ValueError("Request body must be a JSON object with an 'argv' list")
+        argv: list[str] = [str(item) for item in payload["argv"]]
+        cwd: Path = Path(str(payload.get("cwd") or os.getcwd()))
+
+        options, keywords = self._parse_args(argv)
+        if options.plot:
+            raise ValueError("--plot is not available through mara serve")
+        if options.output_format == "arrow" and options.output_path is None:
+            raise ValueError("Arrow output through mara serve requires --output")
+        options = dataclasses.replace(
+            options,
+            output_path=_resolve_path(cwd, options.output_path),
+            excel_path=_resolve_path(cwd, options.excel_path),
+            profile_json=_resolve_path(cwd, options.profile_json),
+            profile_trace=_resolve_path(cwd, options.profile_trace),
+        )
+
+        stdout: io.StringIO = io.StringIO()
+        stderr: io.StringIO = io.StringIO()
+        run_app(options, keywords, context=self._context, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    server: _QueryHTTPServer | _QueryUnixServer
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {self.path}"})
+            return
+        self._send_json(HTTPStatus.OK, {"status": "ok"})
+
+    def do_POST(self) -> None:
+        if self.path != "/query":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {self.path}"})
+            return
+        if not self._authorized():
+            self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "Missing or wrong server token"})
+            return
+        # browsers send text/plain and form bodies cross-origin without a preflight
+        if self.headers.get_content_type() != "application/json":
+            self._send_json(
+                HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {"error": "Content-Type must be application/json"}
+            )
+            return
+        length: int = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request too large"})
+            return
+        try:
+            payload: Any = json.loads(self.rfile.read(length) or b"null")
+            output, stderr = self.server.query_server.handle_query(payload)
+        except (ValueError, FileNotFoundError) as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            return
+        except Exception as exc:
+            LOGGER.exception("Query failed")
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+            )
+            return
+        self._send_json(HTTPStatus.OK, {"output": output, "stderr": stderr})
+
+    def _authorized(self) -> bool:
+        token: str | None = self.server.token
+        if token is None:
+            return True
+        sent: str = self.headers.get("Authorization") or ""
+        return hmac.compare_digest(sent.encode(), f"Bearer {token}".encode())
+
+    def log_message(self, format: str, *args: Any) -> None:
+        LOGGER.debug("%s", format % args)
+
+    def _send_json(self, status: HTTPStatus, body: dict[str, Any]) -> None:
+        data: bytes = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _QueryHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple[str, int], query_server: QueryServer, token: str | None
+    ) -> None:
+        super().__init__(address, _QueryHandler)
+        self.query_server: QueryServer = query_server
+        self.token: str | None = token
+
+
+class _QueryUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, query_server: QueryServer, token: str | None) -> None:
+        super().__init__(path, _QueryHandler)
+        self.query_server: QueryServer = query_server
+        self.token: str | None = token
+
+    def server_bind(self) -> None:
+        # only the owner may connect; umask would otherwise leave it open to others
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+    def get_request(self) -> tuple[Any, Any]:
+        # BaseHTTPRequestHandler expects a (host, port) style client address
+        request, _address = super().get_request()
+        return request, ("unix", 0)
+
+
+def create_server(
+    options: ServeOptions, query_server: QueryServer
+) -> _QueryHTTPServer | _QueryUnixServer:
+    '''
+    Bind the HTTP or Unix socket server. Over TCP any local process, and any web
+    page through the browser, can reach the port, so a token is required there.
+    '''
+    if options.socket_path is None:
+        if not options.token:
+            raise ValueError("mara serve over TCP requires a token")
+        return _QueryHTTPServer((options.host, options.port), query_server, options.token)
+    socket_path: Path = Path(options.socket_path).expanduser()
+    socket_path.unlink(missing_ok=True)
+    return _QueryUnixServer(str(socket_path), query_server, options.token)
+
+
+def serve(options: ServeOptions, parse_args: QueryParser) -> None:
+    if options.socket_path is None and not options.token:
+        options = dataclasses.replace(options, token=secrets.token_urlsafe(32))
+        print(
+            f"No {SERVER_TOKEN_ENV_VAR} set; clients need: "
+            f"export {SERVER_TOKEN_ENV_VAR}={options.token}",
+            file=sys.stderr,
+        )
+    context: AppContext = AppContext.load(options.config_path)
+    server: _QueryHTTPServer | _QueryUnixServer = create_server(
+        options, QueryServer(context, parse_args)
+    )
+    address: str = options.socket_path or f"http://{options.host}:{server.server_address[1]}"
+    LOGGER.info("mara serve listening on %s", address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        LOGGER.info("mara serve stopped")
+    finally:
+        server.server_close()
+        if options.socket_path is not None:
+            Path(options.socket_path).expanduser().unlink(missing_ok=True)
+
+
+def _resolve_path(cwd: Path, path: str | None) -> str | None:
+    if path is None:
+        return None
+    return str(cwd / Path(path).expanduser())
@@ -17,23 +17,112 @@ class StockSelection:
     basic_info: pd.DataFrame
 
 
-def select_stocks(client: TushareClient, keywords: Iterable[str]) -> StockSelection:
+class StockIndex:
+    '''
+    Lookup index over stock_basic rows.
+
+    Keywords match an industry exactly, or a ts_code/name as a case-insensitive
+    literal substring. Full ts_codes and symbols resolve through an exact map;
+    other substrings go through character n-gram postings and are verified
+    against the candidates only.
+    '''
+
+    def __init__(self, basic_info: pd.DataFrame) -> None:
+        self._basic_info: pd.DataFrame = basic_info.reset_index(drop=True)
+        self._codes: list[str] = self._column_values("ts_code")
+        self._names: list[str] = self._column_values("name")
+        self._exact: dict[str, set[int]] = {}
+        self._industry: dict[str, set[int]] = {}
+        self._code_grams: dict[str, set[int]] = {}
+        self._name_grams: dict[str, set[int]] = {}
+
+        for position, code in enumerate(self._codes):
+            if code:
+                self._exact.setdefault(code, set()).add(position)
+                self._exact.setdefault(code.split(".", 1)[0], set()).add(position)
+            _add_grams(self._code_grams, code, position)
+        for position, name in enumerate(self._names):
+            _add_grams(self._name_grams, name, position)
+        for position, industry in enumerate(self._basic_info_values("industry")):
+            if industry:
+                self._industry.setdefault(industry, set()).add(position)
+
+    @property
+    def basic_info(self) -> pd.DataFrame:
+        return self._basic_info
+
+    def select(self, keywords: Iterable[str]) -> StockSelection:
+        if self._basic_info.empty:
+            return StockSelection(ts_codes=[], basic_info=self._basic_info)
+
+        keyword_list: list[str] = [item.strip() for item in keywords if item.strip()]
+        if not keyword_list:
+            ts_codes: list[str] = sorted(self._basic_info["ts_code"].dropna().unique().tolist())
+            return StockSelection(ts_codes=ts_codes, basic_info=self._basic_info)
+
+        positions: set[int] = set()
+        for keyword in keyword_list:
+            positions |= self.lookup(keyword)
+
+        filtered_df: pd.DataFrame = self._basic_info.iloc[sorted(positions)]
+        ts_codes: list[str] = sorted(filtered_df["ts_code"].dropna().unique().tolist())
+        return StockSelection(ts_codes=ts_codes, basic_info=filtered_df)
+
+    def lookup(self, keyword: str) -> set[int]:
+        needle: str = keyword.lower()
+        positions: set[int] = set(self._industry.get(keyword, set()))
+        exact: set[int] | None = self._exact.get(needle)
+        if exact is not None:
+            # A-share codes are fixed width, so a full ts_code or symbol is not a
+            # substring of any other ts_code
+            positions |= exact
+        else:
+            positions |= _substring_matches(self._code_grams, self._codes, needle)
+        positions |= _substring_matches(self._name_grams, self._names, needle)
+        return positions
+
+    def _column_values(self, column: str) -> list[str]:
+        return [value.lower() for value in self._basic_info_values(column)]
+
+    def _basic_info_values(self, column: str) -> list[str]:
+        if column not in self._basic_info.columns:
+            return [""] * len(self._basic_info)
+        return self._basic_info[column].fillna("").astype(str).tolist()
+
+
+def load_stock_index(client: TushareClient) -> StockIndex:
     basic_df: pd.DataFrame = client.stock_basic(fields=BASIC_FIELDS)
-    if basic_df.empty:
-        return StockSelection(ts_codes=[], basic_info=basic_df)
-
-    keyword_list: list[str] = [item.strip() for item in keywords if item.strip()]
-    if not keyword_list:
-        ts_codes: list[str] = sorted(basic_df["ts_code"].dropna().unique().tolist())
-        return StockSelection(ts_codes=ts_codes, basic_info=basic_df)
-
-    mask: pd.Series = pd.Series(False, index=basic_df.index)
-    for keyword in keyword_list:
-        industry_match: pd.Series = basic_df["industry"].fillna("") == keyword
-        code_match: pd.Series = basic_df["ts_code"].fillna("").str.contains(keyword, case=False)
-        name_match: pd.Series = basic_df["name"].fillna("").str.contains(keyword, case=False)
-        mask |= industry_match | code_match | name_match
-
-    filtered_df: pd.DataFrame = basic_df[mask].copy()
-    ts_codes: list[str] = sorted(filtered_df["ts_code"].dropna().unique().tolist())
-    return StockSelection(ts_codes=ts_codes, basic_info=filtered_df)
+    return StockIndex(basic_df)
+
+
+def select_stocks(client: TushareClient, keywords: Iterable[str]) -> StockSelection:
+    return load_stock_index(client).select(keywords)
+
+
+def _grams(text: str) -> set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[idx : idx + 2] for idx in range(len(text) - 1)}
+
+
+def _add_grams(postings: dict[str, set[int]], text: str, position: int) -> None:
+    for char in set(text):
+        postings.setdefault(char, set()).add(position)
+    for gram in _grams(text):
+        postings.setdefault(gram, set()).add(position)
+
+
+def _substring_matches(
+    postings: dict[str, set[int]], values: list[str], needle: str
+) -> set[int]:
+    if not needle:
+        return set()
+    gram_sets: list[set[int]] = []
+    for gram in _grams(needle):
+        posting: set[int] | None = postings.get(gram)
+        if posting is None:
+            return set()
+        gram_sets.append(posting)
+    gram_sets.sort(key=len)
+    candidates: set[int] = set(gram_sets[0]).intersection(*gram_sets[1:])
+    return {position for position in candidates if needle in values[position]}
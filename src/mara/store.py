@@ -0,0 +1,211 @@
+"""Local columnar store of financial statements."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from mara.constants import BULK_API_NAMES, REPORT_PERIOD_RANGE_APIS, SYNC_OPEN_QUARTERS
+from mara.date_utils import (
+    DateRange,
+    parse_yyyymmdd,
+    quarter_end_dates,
+    to_yyyymmdd,
+)
+from mara.indicator_registry import ApiSpec, IndicatorRegistry
+from mara.logger import get_logger
+from mara.tushare_client import TushareClient
+
+STATE_FILE: str = "_state.json"
+
+PARTITION_PREFIX: str = "period="
+
+LOGGER: logging.Logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class SyncResult:
+    api_name: str
+    rows: int
+    periods: int
+    high_water_mark: str | None
+
+
+class StatementStore:
+    '''
+    Parquet files partitioned by API and report period:
+    <directory>/<api_name>/period=YYYYMMDD.parquet. Every announced row is
+    kept (restatements included); deduplication happens in DataFetcher.
+    '''
+
+    def __init__(self, directory: Path) -> None:
+        self._directory: Path = directory
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def has_api(self, api_name: str) -> bool:
+        return (self._directory / api_name / STATE_FILE).exists()
+
+    def high_water_mark(self, api_name: str) -> str | None:
+        state: dict[str, Any] = self._read_state(api_name)
+        value: Any = state.get("high_water_mark")
+        return value if isinstance(value, str) else None
+
+    def periods(self, api_name: str) -> list[str]:
+        api_dir: Path = self._directory / api_name
+        return sorted(
+            path.stem.removeprefix(PARTITION_PREFIX)
+            for path in api_dir.glob(f"{PARTITION_PREFIX}*.parquet")
+        )
+
+    def read(
+        self,
+        api_name: str,
+        fields: Iterable[str],
+        ts_codes: Iterable[str],
+        date_range: DateRange | None,
+    ) -> pd.DataFrame:
+        field_list: list[str] = list(fields)
+        code_list: list[str] = list(ts_codes)
+        frames: list[pd.DataFrame] = []
+        for period in self.periods(api_name):
+            if date_range is not None:
+                period_date: date = parse_yyyymmdd(period)
+                if not date_range.start <= period_date <= date_range.end:
+                    continue
+            period_df: pd.DataFrame = pd.read_parquet(
+                self._partition_path(api_name, period),
+                filters=[("ts_code", "in", code_list)],
+            )
+            period_df = period_df[[col for col in field_list if col in period_df.columns]]
+            if not period_df.empty:
+                frames.append(period_df)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def sync(
+        self,
+        client: TushareClient,
+        registry: IndicatorRegistry,
+        api_name: str,
+        start: date,
+        full: bool = False,
+    ) -> SyncResult:
+        '''
+        Bring one API up to date. The first sync (or --full) loads every report
+        period since start; later syncs only request announcements from the stored
+        ann_date high-water mark onwards, re-reading that day to catch late rows.
+        APIs in REPORT_PERIOD_RANGE_APIS cannot be asked by announcement date, so
+        their last SYNC_OPEN_QUARTERS report periods are re-read per period and
+        the rows announced from the mark onwards kept.
+        '''
+        bulk_api: str | None = BULK_API_NAMES.get(api_name)
+        api_spec: ApiSpec | None = registry.api_specs.get(api_name)
+        if bulk_api is None or api_spec is None:
+            raise ValueError(f"Unsupported API for sync: {api_name}")
+        fields_value: str = ",".join(api_spec.fields)
+        today: date = date.today()
+
+        high_water_mark: str | None = None if full else self.high_water_mark(api_name)
+        delta_frames: list[pd.DataFrame] = []
+        if high_water_mark is None:
+            for period in quarter_end_dates(DateRange(start=start, end=today)):
+                period_df: pd.DataFrame = client.query_all(
+                    bulk_api, period=to_yyyymmdd(period), fields=fields_value
+                )
+                delta_frames.append(period_df)
+        elif api_name in REPORT_PERIOD_RANGE_APIS:
+            for period in _open_periods(start, today):
+                period_df = client.query_all(
+                    bulk_api, period=to_yyyymmdd(period), fields=fields_value
+                )
+                if "ann_date" in period_df.columns:
+                    announced: pd.Series = period_df["ann_date"].astype("string")
+                    period_df = period_df[announced.isna() | (announced >= high_water_mark)]
+                delta_frames.append(period_df)
+        else:
+            delta_frames.append(
+                client.query_all(
+                    bulk_api,
+                    start_date=high_water_mark,
+                    end_date=to_yyyymmdd(today),
+                    fields=fields_value,
+                )
+            )
+
+        delta_frames = [frame for frame in delta_frames if not frame.empty]
+        if not delta_frames:
+            self._write_state(api_name, high_water_mark)
+            return SyncResult(api_name, rows=0, periods=0, high_water_mark=high_water_mark)
+
+        delta_df: pd.DataFrame = pd.concat(delta_frames, ignore_index=True)
+        delta_df = delta_df[delta_df["end_date"].notna()]
+        for period, period_df in delta_df.groupby("end_date", sort=True):
+            self._merge_partition(api_name, str(period), period_df, replace=full)
+
+        new_mark: str | None = _max_date(delta_df, "ann_date")
+        if high_water_mark is not None and (new_mark is None or new_mark < high_water_mark):
+            new_mark = high_water_mark
+        self._write_state(api_name, new_mark)
+        periods: int = int(delta_df["end_date"].nunique())
+        LOGGER.info("Synced %s: %d rows across %d periods", api_name, len(delta_df), periods)
+        return SyncResult(api_name, rows=len(delta_df), periods=periods, high_water_mark=new_mark)
+
+    def _merge_partition(
+        self, api_name: str, period: str, delta_df: pd.DataFrame, replace: bool
+    ) -> None:
+        path: Path = self._partition_path(api_name, period)
+        merged: pd.DataFrame = delta_df
+        if path.exists() and not replace:
+            existing: pd.DataFrame = pd.read_parquet(path)
+            merged = pd.concat([existing, delta_df], ignore_index=True)
+        merged = merged.drop_duplicates(ignore_index=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        merged.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def _partition_path(self, api_name: str, period: str) -> Path:
+        return self._directory / api_name / f"{PARTITION_PREFIX}{period}.parquet"
+
+    def _read_state(self, api_name: str) -> dict[str, Any]:
+        path: Path = self._directory / api_name / STATE_FILE
+        if not path.exists():
+            return {}
+        raw_data: Any = json.loads(path.read_text(encoding="utf-8"))
+        return raw_data if isinstance(raw_data, dict) else {}
+
+    def _write_state(self, api_name: str, high_water_mark: str | None) -> None:
+        path: Path = self._directory / api_name / STATE_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state: dict[str, Any] = {
+            "high_water_mark": high_water_mark,
+            "synced_at": date.today().isoformat(),
+        }
+        path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def _open_periods(start: date, today: date) -> list[date]:
+    quarter: int = today.year * 4 + (today.month - 1) // 3 - SYNC_OPEN_QUARTERS
+    open_start: date = max(start, date(quarter // 4, quarter % 4 * 3 + 1, 1))
+    return quarter_end_dates(DateRange(start=open_start, end=today))
+
+
+def _max_date(data: pd.DataFrame, column: str) -> str | None:
+    if column not in data.columns:
+        return None
+    values: pd.Series = data[column].dropna().astype(str)
+    if values.empty:
+        return None
+    return str(values.max())
@@ -2,38 +2,165 @@
 
 from __future__ import annotations
 
+import json
+import logging
+import random
+import threading
 import time
 from collections.abc import Iterable
 from dataclasses import dataclass
 from typing import Any
 
 import pandas as pd
-import tushare as ts
+
+from mara.cache import QueryCache
+from mara.constants import BULK_PAGE_SIZE
+from mara.logger import get_logger
+from mara.profiler import Profiler
+from mara.rate_limiter import RateLimiter
+
+# Tushare reports quota exhaustion only through the error message text
+RATE_LIMIT_MARKERS: tuple[str, ...] = ("每分钟最多访问", "最多访问该接口", "访问过于频繁")
+# daily quotas do not reset within a run, so retrying is pointless
+HARD_LIMIT_MARKERS: tuple[str, ...] = ("每天最多访问", "每日最多访问")
+
+LOGGER: logging.Logger = get_logger(__name__)
+
+
+class RateLimitError(RuntimeError):
+    pass
 
 
 @dataclass
 class TushareClient:
     token: str
-    max_retries: int = 3
-    retry_delay: float = 60.0
+    max_retries: int = 5
+    backoff_base: float = 2.0
+    backoff_max: float = 60.0
+    rate_limiter: RateLimiter | None = None
+    cache: QueryCache | None = None
+    refresh: bool = False
+    profiler: Profiler | None = None
 
     def __post_init__(self) -> None:
-        self._pro: Any = ts.pro_api(self.token)
+        # created on the first remote call: importing tushare is slow and fully
+        # cached runs never need it
+        self._pro: Any = None
+        self._pro_lock: threading.Lock = threading.Lock()
 
     def query(self, api_name: str, **params: Any) -> pd.DataFrame:
+        if self.cache is not None and not self.refresh:
+            cached: pd.DataFrame | None = self.cache.get(api_name, params)
+            if cached is not None:
+                if self.profiler is not None:
+                    self.profiler.record_cache_hit(api_name)
+                return cached
+
+        result: pd.DataFrame = self._query_remote(api_name, **params)
+        if self.cache is not None:
+            self.cache.put(api_name, params, result)
+        return result
+
+    def query_all(self, api_name: str, **params: Any) -> pd.DataFrame:
+        '''
+        Query an endpoint page by page (limit/offset) until a short page is returned.
+        '''
+        pages: list[pd.DataFrame] = []
+        offset: int = 0
+        while True:
+            page_df: pd.DataFrame = self.query(
+                api_name, **params, limit=BULK_PAGE_SIZE, offset=offset
+            )
+            if not page_df.empty:
+                pages.append(page_df)
+            if len(page_df) < BULK_PAGE_SIZE:
+                break
+            offset += BULK_PAGE_SIZE
+        if not pages:
+            return pd.DataFrame()
+        if len(pages) == 1:
+            return pages[0]
+        return pd.concat(pages, ignore_index=True)
+
+    def _query_remote(self, api_name: str, **params: Any) -> pd.DataFrame:
+        '''
+        Query Tushare, retrying only rate-limit and transient errors.
+
+        Retries use exponential backoff with jitter. Rate-limit responses also
+        slow down the shared limiter so concurrent callers back off together.
+        '''
         attempt: int = 0
         while True:
+            if self.rate_limiter is not None:
+                waited_from: float = time.perf_counter()
+                self.rate_limiter.acquire(api_name)
+                if self.profiler is not None:
+                    self.profiler.record_throttle(api_name, time.perf_counter() - waited_from)
+            started: float = time.perf_counter()
             try:
-                result: Any = self._pro.query(api_name, **params)
-                if isinstance(result, pd.DataFrame):
-                    return result
-                return pd.DataFrame(result)
-            except Exception:
+                result: Any = self._pro_api().query(api_name, **params)
+            except Exception as exc:
+                if self.profiler is not None:
+                    self.profiler.record_call(
+                        api_name, time.perf_counter() - started, rows=0, error=True
+                    )
+                rate_limited: bool = is_rate_limit_error(exc)
+                if not rate_limited and not is_transient_error(exc):
+                    raise
                 attempt += 1
                 if attempt > self.max_retries:
+                    if rate_limited:
+                        raise RateLimitError(f"{api_name}: {exc}") from exc
                     raise
-                time.sleep(self.retry_delay)
+                delay: float = self._backoff_delay(attempt)
+                if self.profiler is not None:
+                    self.profiler.record_retry(api_name, delay)
+                LOGGER.info(
+                    "%s failed (%s), retry %d/%d in %.1fs",
+                    api_name,
+                    exc,
+                    attempt,
+                    self.max_retries,
+                    delay,
+                )
+                if rate_limited and self.rate_limiter is not None:
+                    self.rate_limiter.on_throttled(api_name, delay)
+                    continue
+                time.sleep(delay)
+                continue
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.on_success(api_name)
+            data: pd.DataFrame = result if isinstance(result, pd.DataFrame) else pd.DataFrame(result)
+            if self.profiler is not None:
+                self.profiler.record_call(api_name, time.perf_counter() - started, rows=len(data))
+            return data
+
+    def _pro_api(self) -> Any:
+        with self._pro_lock:
+            if self._pro is None:
+                import tushare as ts
+
+                self._pro = ts.pro_api(self.token)
+            return self._pro
+
+    def _backoff_delay(self, attempt: int) -> float:
+        ceiling: float = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(ceiling / 2, ceiling)
 
     def stock_basic(self, fields: Iterable[str]) -> pd.DataFrame:
         fields_value: str = ",".join(fields)
         return self.query("stock_basic", fields=fields_value)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    message: str = str(exc)
+    if any(marker in message for marker in HARD_LIMIT_MARKERS):
+        return False
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    # requests' exceptions derive from OSError; a non-JSON body is what tushare
+    # surfaces for gateway errors
+    return isinstance(exc, (OSError, TimeoutError, json.JSONDecodeError))
@@ -0,0 +1,67 @@
+"""In-memory stand-ins shared by the tests."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+import pandas as pd
+
+from mara.tushare_client import TushareClient
+
+
+class FakeClient:
+    '''
+    Serve canned frames per API name, honouring the ts_code, period, fields and
+    limit/offset params. start_date/end_date filter on ann_date only for whole
+    market queries (no ts_code or period), as used by incremental sync.
+    '''
+
+    def __init__(self, frames: dict[str, pd.DataFrame], delay: float = 0.0) -> None:
+        self._frames: dict[str, pd.DataFrame] = frames
+        self._delay: float = delay
+        self._lock: threading.Lock = threading.Lock()
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+    query_all = TushareClient.query_all
+
+    def query(self, api_name: str, **params: Any) -> pd.DataFrame:
+        with self._lock:
+            self.calls.append((api_name, params))
+        if self._delay:
+            time.sleep(self._delay)
+        data: pd.DataFrame = self._frames[api_name]
+        if "ts_code" in params:
+            data = data[data["ts_code"] == params["ts_code"]]
+        if "period" in params:
+            data = data[data["end_date"] == params["period"]]
+        elif "ts_code" not in params and "start_date" in params:
+            data = data[
+                (data["ann_date"] >= params["start_date"])
+                & (data["ann_date"] <= params["end_date"])
+            ]
+        if "limit" in params:
+            data = data.iloc[params["offset"] : params["offset"] + params["limit"]]
+        if "fields" in params:
+            fields: list[str] = params["fields"].split(",")
+            data = data[[col for col in fields if col in data.columns]]
+        return data.reset_index(drop=True)
+
+
+def income_frame(ts_codes: list[str]) -> pd.DataFrame:
+    rows: list[dict[str, Any]] = []
+    for idx, ts_code in enumerate(ts_codes):
+        for quarter, end_date in enumerate(["20230331", "20230630", "20230930", "20231231"], 1):
+            rows.append(
+                {
+                    "ts_code": ts_code,
+                    "ann_date": "20240401",
+                    "end_date": end_date,
+                    "report_type": "1",
+                    "update_flag": "0",
+                    "revenue": float(10 * quarter + idx),
+                    "n_income": float(quarter),
+                }
+            )
+    return pd.DataFrame(rows)
@@ -0,0 +1,148 @@
+"""Tests for the trailing, rolling and growth analytics."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fakes import FakeClient
+from mara.analytics import Analytics, apply_analytics, lookback_range, parse_rolling
+from mara.constants import API_ORDER
+from mara.data_fetcher import DataFetcher, IndicatorResult
+from mara.date_utils import DateRange
+from mara.indicator_registry import IndicatorRegistry, load_registry
+
+
+def _quarters(end_dates: list[str], values: list[float], ts_code: str = "000001.SZ") -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ts_code": ts_code,
+            "end_date": end_dates,
+            "_end_date": pd.to_datetime(end_dates, format="%Y%m%d"),
+            "revenue": values,
+        }
+    )
+
+
+def test_ttm_sums_cumulative_values_and_needs_prior_year() -> None:
+    data: pd.DataFrame = _quarters(
+        ["20220630", "20221231", "20230331", "20230630", "20231231"], [40, 100, 30, 70, 150]
+    )
+
+    result: pd.DataFrame = apply_analytics(data, ["revenue"], Analytics(ttm=True), cumulative=True)
+
+    # 2023Q2: 70 + 100 - 40; 2023Q1 lacks 2022Q1; Q4 is the annual value
+    np.testing.assert_allclose(result["revenue"], [np.nan, 100.0, np.nan, 130.0, 150.0])
+
+
+def test_growth_compares_the_same_quarter_not_the_previous_row() -> None:
+    first: pd.DataFrame = _quarters(["20211231", "20221231", "20231231"], [100, 50, 75])
+    # 2022Q4 is missing here, so 2023Q4 has no year-over-year base
+    second: pd.DataFrame = _quarters(["20211231", "20231231"], [10, -20], "000002.SZ")
+    data: pd.DataFrame = pd.concat([first, second], ignore_index=True)
+
+    result: pd.DataFrame = apply_analytics(
+        data, ["revenue"], Analytics(growth="yoy"), cumulative=True
+    )
+
+    np.testing.assert_allclose(result["revenue"], [np.nan, -50.0, 50.0, np.nan, np.nan])
+
+
+def test_rolling_window_requires_complete_consecutive_quarters() -> None:
+    data: pd.DataFrame = _quarters(
+        ["20230331", "20230630", "20230930", "20240331"], [1.0, 2.0, 6.0, 4.0]
+    )
+
+    result: pd.DataFrame = apply_analytics(
+        data, ["revenue"], Analytics(window=2, window_agg="sum"), cumulative=False
+    )
+
+    np.testing.assert_allclose(result["revenue"], [np.nan, 3.0, 8.0, np.nan])
+
+
+def test_lookback_range_adds_the_quarters_analytics_read() -> None:
+    date_range: DateRange = DateRange(start=date(2023, 5, 10), end=date(2024, 12, 31))
+
+    assert lookback_range(date_range, None) == date_range
+    assert lookback_range(date_range, Analytics(growth="yoy")).start == date(2022, 4, 1)
+    assert lookback_range(date_range, Analytics(ttm=True, growth="qoq")).start == date(2022, 1, 1)
+    assert lookback_range(date_range, Analytics(window=4)).start == date(2022, 7, 1)
+    # --single differences from the year start of the earliest quarter read
+    assert lookback_range(date_range, None, single=True).start == date(2023, 1, 1)
+    assert lookback_range(date_range, Analytics(growth="yoy"), single=True).start == date(2022, 1, 1)
+    assert lookback_range(date_range, Analytics(ttm=True), single=True).start == date(2022, 4, 1)
+
+
+@pytest.mark.parametrize("spec", ["0:mean", "4:avg", "x", ""])
+def test_parse_rolling_rejects_bad_specs(spec: str) -> None:
+    with pytest.raises(ValueError, match="--rolling"):
+        parse_rolling(spec)
+
+
+def test_fetch_widens_the_range_and_trims_the_lookback() -> None:
+    rows: list[dict[str, Any]] = [
+        {
+            "ts_code": "000001.SZ",
+            "ann_date": f"{year + 1}0330",
+            "end_date": f"{year}1231",
+            "update_flag": "0",
+            "roe": float(year - 2019),
+        }
+        for year in (2020, 2021, 2022)
+    ]
+    client: FakeClient = FakeClient({"fina_indicator": pd.DataFrame(rows)})
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER))  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["roe"],
+        ts_codes=["000001.SZ"],
+        date_range=DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+        analytics=Analytics(growth="yoy"),
+    )
+
+    assert client.calls[0][1]["start_date"] == "20200101"
+    assert results[0].data["end_date"].tolist() == ["20211231", "20221231"]
+    np.testing.assert_allclose(results[0].data["roe"], [100.0, 50.0])
+
+
+def test_growth_applies_to_expression_results_not_their_inputs() -> None:
+    rows: list[dict[str, Any]] = [
+        {
+            "ts_code": "000001.SZ",
+            "ann_date": f"{year + 1}0330",
+            "end_date": f"{year}1231",
+            "report_type": "1",
+            "update_flag": "0",
+            "revenue": revenue,
+            "n_income": n_income,
+        }
+        for year, revenue, n_income in ((2021, 100.0, 10.0), (2022, 200.0, 40.0))
+    ]
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    registry.register_custom_indicator(
+        "margin", lambda data: data["n_income"] / data["revenue"], inputs=["n_income", "revenue"]
+    )
+    fetcher: DataFetcher = DataFetcher(FakeClient({"income": pd.DataFrame(rows)}), registry)  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["n_income/revenue", "margin", "revenue"],
+        ts_codes=["000001.SZ"],
+        date_range=DateRange(start=date(2022, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+        analytics=Analytics(growth="yoy"),
+    )
+
+    # the margin doubled; growth of the inputs would give 300% / 100%
+    assert [result.data.iloc[:, -1].tolist() for result in results] == [[100.0], [100.0], [100.0]]
+    assert results[0].data["end_date"].tolist() == ["20221231"]
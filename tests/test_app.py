@@ -0,0 +1,94 @@
+"""Tests for the application workflow helpers."""
+
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient, income_frame
+from mara.app import _fetch_indicators, _stream_tables
+from mara.constants import API_ORDER
+from mara.data_fetcher import DataFetcher
+from mara.data_processor import DataProcessor
+from mara.date_utils import DateRange
+from mara.indicator_registry import load_registry
+from mara.output import print_tables
+from mara.query_options import QueryOptions
+from mara.stock_selector import StockSelection
+
+BASE_OPTIONS: QueryOptions = QueryOptions(
+    indicators=["revenue", "n_income"],
+    start_date=None,
+    end_date=None,
+    season=0,
+    single=True,
+    latest=False,
+    aggregate=None,
+    sort_by=None,
+    sort_order="asc",
+    no_header=False,
+    delimiter=",",
+    plot=False,
+    excel_path=None,
+    config_path="~/.mararc",
+    log_level=0,
+    debug=False,
+)
+
+
+@pytest.mark.parametrize("overrides", [{}, {"latest": True}, {"aggregate": "mean", "single": False}])
+def test_stream_matches_batch_output(
+    capsys: pytest.CaptureFixture[str], overrides: dict[str, Any]
+) -> None:
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(7)]
+    selection: StockSelection = StockSelection(
+        ts_codes=ts_codes,
+        basic_info=pd.DataFrame({"ts_code": ts_codes, "name": [f"n{idx}" for idx in range(7)]}),
+    )
+    fetcher: DataFetcher = DataFetcher(
+        FakeClient({"income": income_frame(ts_codes)}), load_registry(API_ORDER)  # type: ignore[arg-type]
+    )
+    options: QueryOptions = dataclasses.replace(BASE_OPTIONS, stream=True, chunk_size=3, **overrides)
+    date_range: DateRange | None = (
+        None if options.latest else DateRange(start=date(2023, 1, 1), end=date(2023, 12, 31))
+    )
+    include_end_date: bool = not options.latest and options.aggregate is None
+
+    print_tables(
+        DataProcessor(selection.basic_info).build_output_tables(
+            _fetch_indicators(fetcher, options, ts_codes, date_range), include_end_date
+        ),
+        ",",
+        include_header=True,
+    )
+    batch_output: str = capsys.readouterr().out
+    _stream_tables(fetcher, options, selection, date_range, include_end_date)
+    stream_output: str = capsys.readouterr().out
+
+    assert stream_output == batch_output
+    assert stream_output.count("ts_code") == 1
+
+
+def test_stream_keeps_indicator_missing_from_first_chunk(capsys: pytest.CaptureFixture[str]) -> None:
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(7)]
+    # no fina_indicator rows for the first chunk's stocks
+    roe: pd.DataFrame = income_frame(ts_codes[3:]).rename(columns={"n_income": "roe"})
+    fetcher: DataFetcher = DataFetcher(
+        FakeClient({"income": income_frame(ts_codes), "fina_indicator": roe}),  # type: ignore[arg-type]
+        load_registry(API_ORDER),
+    )
+    options: QueryOptions = dataclasses.replace(
+        BASE_OPTIONS, indicators=["revenue", "roe"], single=False, stream=True, chunk_size=3
+    )
+    selection: StockSelection = StockSelection(ts_codes=ts_codes, basic_info=pd.DataFrame())
+
+    _stream_tables(fetcher, options, selection, None, include_end_date=True)
+    lines: list[str] = capsys.readouterr().out.splitlines()
+
+    assert lines[0] == "ts_code,ann_date,end_date,revenue,roe"
+    assert lines[1] == "000000.SZ,20240401,20230331,10.0,"
+    assert lines[-1] == "000006.SZ,20240401,20231231,46.0,4.0"
@@ -0,0 +1,104 @@
+"""Tests for batch query files."""
+
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient, income_frame
+from mara.app import run_app, run_batch
+from mara.batch import BatchQuery, load_batch
+from mara.query_options import BatchOptions
+
+TS_CODES: list[str] = ["000001.SZ", "000002.SZ", "000003.SZ"]
+
+BATCH_YAML: str = """
+defaults:
+  start_date: 2023-01-01
+  end_date: 2023-12-31
+  season: 0
+queries:
+  - name: first
+    keywords: ["000001", "000002"]
+    indicators: revenue
+    output_path: {out}/first.csv
+  - name: second
+    keywords: 000002.SZ,000003.SZ
+    indicators: [n_income, revenue]
+    single: true
+    output_path: {out}/second.csv
+"""
+
+
+@pytest.fixture
+def remote(monkeypatch: pytest.MonkeyPatch) -> FakeClient:
+    client: FakeClient = FakeClient(
+        {
+            "stock_basic": pd.DataFrame({"ts_code": TS_CODES, "name": ["a", "b", "c"]}),
+            "income": income_frame(TS_CODES),
+        }
+    )
+    monkeypatch.setattr("tushare.pro_api", lambda _token: client)
+    return client
+
+
+def test_batch_fetches_shared_stocks_once(tmp_path: Path, remote: FakeClient) -> None:
+    config_path: Path = tmp_path / "mararc"
+    config_path.write_text("token: token\n", encoding="utf-8")
+    batch_path: Path = tmp_path / "batch.yaml"
+    batch_path.write_text(BATCH_YAML.format(out=tmp_path), encoding="utf-8")
+
+    run_batch(BatchOptions(str(batch_path), str(config_path), log_level=0, no_cache=True))
+    income_calls: list[str] = [params["ts_code"] for api, params in remote.calls if api == "income"]
+    batch_outputs: list[str] = [
+        (tmp_path / name).read_text(encoding="utf-8") for name in ("first.csv", "second.csv")
+    ]
+
+    queries: list[BatchQuery] = load_batch(str(batch_path), str(config_path), log_level=0)
+    for query in queries:
+        run_app(dataclasses.replace(query.options, no_cache=True), query.keywords)
+
+    assert sorted(income_calls) == TS_CODES
+    assert "000003.SZ" in batch_outputs[1]
+    assert batch_outputs == [
+        (tmp_path / name).read_text(encoding="utf-8") for name in ("first.csv", "second.csv")
+    ]
+
+
+def test_load_batch_rejects_unknown_keys(tmp_path: Path) -> None:
+    batch_path: Path = tmp_path / "batch.yaml"
+    batch_path.write_text("queries:\n  - indicators: roe\n    plot: true\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="unsupported keys plot"):
+        load_batch(str(batch_path), "~/.mararc", log_level=0)
+
+
+@pytest.mark.parametrize(
+    ("entry", "message"),
+    [
+        ("latest: 'yes'", "'latest' must be true or false"),
+        ("aggregate: 1", "'aggregate' must be a string or null"),
+        ("season: 5", "'season' must be one of 0, 1, 2, 3, 4"),
+        ("season: spring", "'season' must be an integer"),
+    ],
+)
+def test_load_batch_checks_value_types(tmp_path: Path, entry: str, message: str) -> None:
+    batch_path: Path = tmp_path / "batch.yaml"
+    batch_path.write_text(
+        f"queries:\n  - indicators: roe\n  - indicators: roe\n    {entry}\n", encoding="utf-8"
+    )
+
+    with pytest.raises(ValueError, match=f"Batch query 2: {message}"):
+        load_batch(str(batch_path), "~/.mararc", log_level=0)
+
+
+def test_load_batch_reads_digit_strings_as_integers(tmp_path: Path) -> None:
+    batch_path: Path = tmp_path / "batch.yaml"
+    batch_path.write_text("queries:\n  - indicators: roe\n    season: '4'\n", encoding="utf-8")
+
+    queries: list[BatchQuery] = load_batch(str(batch_path), "~/.mararc", log_level=0)
+
+    assert queries[0].options.season == 4
@@ -0,0 +1,83 @@
+"""Tests for the on-disk query cache."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from mara.cache import QueryCache
+
+
+def _make_cache(tmp_path: Path, max_bytes: int = 1024 * 1024) -> QueryCache:
+    return QueryCache(directory=tmp_path, ttl={"default": 3600.0}, max_bytes=max_bytes)
+
+
+def test_cache_roundtrip_ignores_field_order(tmp_path: Path) -> None:
+    cache: QueryCache = _make_cache(tmp_path)
+    data: pd.DataFrame = pd.DataFrame(
+        {"ts_code": ["000001.SZ"], "end_date": ["20231231"], "roe": [1.5]}
+    )
+    cache.put("fina_indicator", {"ts_code": "000001.SZ", "fields": "ts_code,end_date,roe"}, data)
+
+    cached: pd.DataFrame | None = cache.get(
+        "fina_indicator", {"ts_code": "000001.SZ", "fields": "roe,ts_code,end_date"}
+    )
+
+    assert cached is not None
+    assert list(cached.columns) == ["roe", "ts_code", "end_date"]
+    assert cached["roe"].tolist() == [1.5]
+
+
+def test_cache_expires_entries_past_ttl(tmp_path: Path) -> None:
+    cache: QueryCache = _make_cache(tmp_path)
+    params: dict[str, str] = {"ts_code": "000001.SZ"}
+    cache.put("income", params, pd.DataFrame({"ts_code": ["000001.SZ"]}))
+
+    entry: Path = next(tmp_path.glob("income/*.parquet"))
+    stale: float = entry.stat().st_mtime - 7200
+    os.utime(entry, (stale, stale))
+
+    assert cache.get("income", params) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    data: pd.DataFrame = pd.DataFrame({"value": range(100)})
+    probe: QueryCache = _make_cache(tmp_path / "probe")
+    probe.put("income", {"ts_code": "probe"}, data)
+    entry_size: int = next((tmp_path / "probe").glob("income/*.parquet")).stat().st_size
+
+    cache: QueryCache = _make_cache(tmp_path / "lru", max_bytes=entry_size * 2)
+    cache.put("income", {"ts_code": "a"}, data)
+    cache.put("income", {"ts_code": "b"}, data)
+    for path in (tmp_path / "lru").glob("income/*.parquet"):
+        os.utime(path, (1.0, path.stat().st_mtime))
+    assert cache.get("income", {"ts_code": "a"}) is not None
+
+    cache.put("income", {"ts_code": "c"}, data)
+
+    assert cache.get("income", {"ts_code": "a"}) is not None
+    assert cache.get("income", {"ts_code": "b"}) is None
+    assert cache.get("income", {"ts_code": "c"}) is not None
+
+
+def test_cache_serves_field_subsets_of_an_entry(tmp_path: Path) -> None:
+    cache: QueryCache = _make_cache(tmp_path)
+    data: pd.DataFrame = pd.DataFrame(
+        {"ts_code": ["000001.SZ"], "end_date": ["20231231"], "roe": [1.5], "roa": [0.5]}
+    )
+    cache.put(
+        "fina_indicator", {"ts_code": "000001.SZ", "fields": "ts_code,end_date,roe,roa"}, data
+    )
+
+    narrow: pd.DataFrame | None = cache.get(
+        "fina_indicator", {"ts_code": "000001.SZ", "fields": "ts_code,roa"}
+    )
+    wider: pd.DataFrame | None = cache.get(
+        "fina_indicator", {"ts_code": "000001.SZ", "fields": "ts_code,roe,eps"}
+    )
+
+    assert narrow is not None
+    assert list(narrow.columns) == ["ts_code", "roa"]
+    assert wider is None
@@ -0,0 +1,35 @@
+"""Tests for compact frame dtypes."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from fakes import income_frame
+from mara.compact import compact_frame, memory_bytes, restore_frame
+
+
+def test_compact_frame_round_trips_text_columns() -> None:
+    data: pd.DataFrame = pd.concat(
+        [income_frame([f"{idx:06d}.SZ" for idx in range(50)])] * 4, ignore_index=True
+    ).assign(update_flag=["0", "1", None, "0"] * 200)
+
+    compact: pd.DataFrame = compact_frame(data)
+
+    assert isinstance(compact["ts_code"].dtype, pd.CategoricalDtype)
+    assert compact["end_date"].dtype == "Int32"
+    assert compact["update_flag"].dtype == "Int8"
+    assert memory_bytes(compact) < memory_bytes(data)
+    pd.testing.assert_frame_equal(restore_frame(compact), data)
+
+
+def test_compact_frame_keeps_columns_that_would_not_read_back() -> None:
+    data: pd.DataFrame = pd.DataFrame(
+        {"ts_code": ["000001.SZ"], "end_date": ["20231231"], "report_type": ["01"], "x": [1.5]}
+    )
+
+    compact: pd.DataFrame = compact_frame(data, float32=True)
+
+    assert compact["report_type"].tolist() == ["01"]
+    assert compact["x"].dtype == np.float32
+    assert restore_frame(compact)["end_date"].tolist() == ["20231231"]
@@ -0,0 +1,408 @@
+"""Tests for DataFetcher against an in-memory Tushare stand-in."""
+
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient, income_frame
+from mara import data_fetcher
+from mara.cache import QueryCache
+from mara.constants import API_ORDER
+from mara.data_fetcher import DataFetcher, IndicatorResult
+from mara.date_utils import DateRange
+from mara.indicator_registry import IndicatorRegistry, load_registry
+from mara.tushare_client import TushareClient
+
+
+def _fina_frame(ts_codes: list[str]) -> pd.DataFrame:
+    rows: list[dict[str, Any]] = []
+    for idx, ts_code in enumerate(ts_codes):
+        for year in (2021, 2022):
+            rows.append(
+                {
+                    "ts_code": ts_code,
+                    "ann_date": f"{year + 1}0330",
+                    "end_date": f"{year}1231",
+                    "update_flag": "0",
+                    "roe": float(idx + year - 2020),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def _fetch(fetcher: DataFetcher, ts_codes: list[str]) -> list[IndicatorResult]:
+    return fetcher.fetch_indicators(
+        indicators=["roe"],
+        ts_codes=ts_codes,
+        date_range=DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+
+def test_workers_keep_result_order_deterministic() -> None:
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(12)]
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    client: FakeClient = FakeClient({"fina_indicator": _fina_frame(ts_codes)}, delay=0.01)
+
+    serial: list[IndicatorResult] = _fetch(DataFetcher(client, registry), ts_codes)  # type: ignore[arg-type]
+    threaded: list[IndicatorResult] = _fetch(DataFetcher(client, registry, workers=4), ts_codes)  # type: ignore[arg-type]
+
+    pd.testing.assert_frame_equal(serial[0].data, threaded[0].data)
+    assert threaded[0].data["ts_code"].unique().tolist() == ts_codes
+
+
+def test_workers_surface_query_failures() -> None:
+    class FailingClient(FakeClient):
+        def query(self, api_name: str, **params: Any) -> pd.DataFrame:
+            if params.get("ts_code") == "000003.SZ":
+                raise RuntimeError("boom")
+            return super().query(api_name, **params)
+
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(6)]
+    client: FailingClient = FailingClient({"fina_indicator": _fina_frame(ts_codes)})
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER), workers=3)  # type: ignore[arg-type]
+
+    with pytest.raises(RuntimeError, match="boom") as exc_info:
+        _fetch(fetcher, ts_codes)
+    assert "fina_indicator for 000003.SZ" in "".join(exc_info.value.__notes__)
+
+
+def test_bulk_mode_queries_once_per_period() -> None:
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(5)]
+    frame: pd.DataFrame = _fina_frame(ts_codes + ["999999.SZ"])
+    client: FakeClient = FakeClient({"fina_indicator": frame, "fina_indicator_vip": frame})
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+
+    per_stock: list[IndicatorResult] = _fetch(
+        DataFetcher(client, registry, bulk_threshold=0), ts_codes  # type: ignore[arg-type]
+    )
+    client.calls.clear()
+    bulk: list[IndicatorResult] = _fetch(
+        DataFetcher(client, registry, bulk_threshold=3), ts_codes  # type: ignore[arg-type]
+    )
+
+    assert [(api, params["period"]) for api, params in client.calls] == [
+        ("fina_indicator_vip", "20211231"),
+        ("fina_indicator_vip", "20221231"),
+    ]
+    pd.testing.assert_frame_equal(
+        per_stock[0].data.reset_index(drop=True), bulk[0].data.reset_index(drop=True)
+    )
+
+
+def test_bulk_mode_keeps_the_announcement_window_of_per_stock_queries() -> None:
+    ts_codes: list[str] = ["000001.SZ", "000002.SZ"]
+    statements: pd.DataFrame = income_frame(ts_codes)
+    # Q1-Q3 announced within the year, Q4 the next spring
+    statements["ann_date"] = statements["end_date"].str[:4] + "1030"
+    statements.loc[statements["end_date"] == "20231231", "ann_date"] = "20240330"
+    client: FakeClient = FakeClient({"income_vip": statements})
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER), bulk_threshold=2)  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["revenue"],
+        ts_codes=ts_codes,
+        date_range=DateRange(start=date(2023, 1, 1), end=date(2023, 12, 31)),
+        season=0,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+    assert {api for api, _params in client.calls} == {"income_vip"}
+    assert sorted(set(results[0].data["end_date"])) == ["20230331", "20230630", "20230930"]
+
+
+def test_failed_bulk_fetch_is_not_retried() -> None:
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(3)]
+    # no fina_indicator_vip frame: the stand-in fails like a token without VIP access
+    client: FakeClient = FakeClient({"fina_indicator": _fina_frame(ts_codes)})
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER), bulk_threshold=2)  # type: ignore[arg-type]
+
+    first: list[IndicatorResult] = _fetch(fetcher, ts_codes)
+    second: list[IndicatorResult] = _fetch(fetcher, ts_codes)
+
+    vip_calls: list[str] = [api for api, _params in client.calls if api.endswith("_vip")]
+    assert vip_calls == ["fina_indicator_vip"]
+    assert len(first[0].data) == len(second[0].data) == 6
+
+
+def test_indicators_from_one_api_share_a_frame() -> None:
+    ts_codes: list[str] = ["000001.SZ", "000002.SZ"]
+    frame: pd.DataFrame = _fina_frame(ts_codes).assign(roa=1.0)
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    fetcher: DataFetcher = DataFetcher(FakeClient({"fina_indicator": frame}), registry)  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["roe", "roa"],
+        ts_codes=ts_codes,
+        date_range=DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+    assert results[0].frame is results[1].frame
+    assert list(results[1].data.columns) == ["ts_code", "ann_date", "end_date", "roa"]
+
+
+def test_widened_fields_answer_later_indicators_from_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ts_codes: list[str] = ["000001.SZ", "000002.SZ"]
+    remote: FakeClient = FakeClient({"fina_indicator": _fina_frame(ts_codes).assign(roa=1.0)})
+    monkeypatch.setattr("tushare.pro_api", lambda _token: remote)
+    cache: QueryCache = QueryCache(tmp_path, ttl={"default": 3600.0}, max_bytes=1 << 20)
+    client: TushareClient = TushareClient(token="token", cache=cache)
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER), prefetch_fields={})
+
+    _fetch(fetcher, ts_codes)
+    calls_after_roe: int = len(remote.calls)
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["roa"],
+        ts_codes=ts_codes,
+        date_range=DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+    assert calls_after_roe == len(ts_codes)
+    assert len(remote.calls) == calls_after_roe
+    assert results[0].data["roa"].tolist() == [1.0] * 4
+
+
+def test_dedupe_keeps_highest_ranked_row_per_period() -> None:
+    data: pd.DataFrame = pd.DataFrame(
+        [
+            # adjusted report beats the later consolidated restatement
+            ("000002.SZ", "20221231", "1", "1", "20230801", None, 1.0),
+            ("000002.SZ", "20221231", "4", "0", "20230330", None, 2.0),
+            # restatement beats the original; f_ann_date falls back to ann_date
+            ("000001.SZ", "20221231", "1", "0", None, "20230330", 3.0),
+            ("000001.SZ", "20221231", "1", "1", None, "20230301", 4.0),
+            # later announcement wins, exact ties keep the last row
+            ("000001.SZ", "20211231", "1", "0", "20220330", None, 5.0),
+            ("000001.SZ", "20211231", "1", "0", "20220420", None, 6.0),
+            ("000001.SZ", "20211231", "1", "0", "20220420", None, 7.0),
+            ("000001.SZ", "20210930", None, None, "bad", "bad", 8.0),
+        ],
+        columns=[
+            "ts_code", "end_date", "report_type", "update_flag", "f_ann_date", "ann_date", "roe",
+        ],
+    )
+
+    deduped: pd.DataFrame = data_fetcher._dedupe_by_official_fields(data)
+
+    assert deduped["ts_code"].tolist() == ["000001.SZ"] * 3 + ["000002.SZ"]
+    assert deduped["end_date"].tolist() == ["20210930", "20211231", "20221231", "20221231"]
+    assert deduped["roe"].tolist() == [8.0, 7.0, 4.0, 2.0]
+
+
+def test_dedupe_without_announcement_dates_or_ranked_keys() -> None:
+    statements: pd.DataFrame = income_frame(["000001.SZ"])
+    data: pd.DataFrame = pd.concat(
+        [statements, statements.assign(update_flag="1", revenue=-1.0), statements],
+        ignore_index=True,
+    ).assign(ann_date=float("nan"))
+
+    deduped: pd.DataFrame = data_fetcher._dedupe_by_official_fields(data)
+
+    assert deduped["end_date"].tolist() == statements["end_date"].tolist()
+    assert deduped["revenue"].tolist() == [-1.0] * 4
+    # no row has a ts_code, so there is no rank to take the maximum of
+    unkeyed: pd.DataFrame = data_fetcher._dedupe_by_official_fields(data.assign(ts_code=None))
+    assert unkeyed["revenue"].tolist() == statements["revenue"].tolist()
+
+
+def test_plugin_inputs_are_fetched_with_requested_indicators() -> None:
+    ts_codes: list[str] = ["000001.SZ", "000002.SZ"]
+    client: FakeClient = FakeClient(
+        {
+            "fina_indicator": _fina_frame(ts_codes),
+            "income": _fina_frame(ts_codes).drop(columns=["roe"]).assign(revenue=[1.0, 2.0, 4.0, 8.0]),
+        }
+    )
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    calls: list[int] = []
+
+    def roe_per_revenue(data: pd.DataFrame) -> pd.Series:
+        calls.append(len(data))
+        return data["roe"] / data["revenue"]
+
+    registry.register_custom_indicator("roe_per_revenue", roe_per_revenue, inputs=["roe", "revenue"])
+    fetcher: DataFetcher = DataFetcher(client, registry)  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["roe", "roe_per_revenue"],
+        ts_codes=ts_codes,
+        date_range=DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+    assert [result.name for result in results] == ["roe", "roe_per_revenue"]
+    assert sorted(api for api, _params in client.calls) == ["fina_indicator"] * 2 + ["income"] * 2
+    assert calls == [4]
+    plugin: pd.DataFrame = results[1].data
+    assert list(plugin.columns) == ["ts_code", "ann_date", "end_date", "roe_per_revenue"]
+    assert plugin["end_date"].tolist() == ["20211231", "20221231"] * 2
+    assert plugin["roe_per_revenue"].tolist() == [1.0, 1.0, 0.5, 0.375]
+
+
+def test_expressions_share_one_fetch_per_api() -> None:
+    ts_codes: list[str] = ["000001.SZ", "000002.SZ"]
+    client: FakeClient = FakeClient(
+        {
+            "fina_indicator": _fina_frame(ts_codes),
+            "income": _fina_frame(ts_codes).drop(columns=["roe"]).assign(revenue=[1.0, 2.0, 4.0, 8.0]),
+        }
+    )
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER))  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["roe / revenue", "roe/revenue*100", "roe"],
+        ts_codes=ts_codes,
+        date_range=DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+    assert [result.name for result in results] == ["roe / revenue", "roe/revenue*100", "roe"]
+    assert sorted(api for api, _params in client.calls) == ["fina_indicator"] * 2 + ["income"] * 2
+    assert results[0].frame is results[1].frame
+    assert results[1].data["roe/revenue*100"].tolist() == [100.0, 100.0, 50.0, 37.5]
+    with pytest.raises(ValueError, match="unknown input indicator nope"):
+        fetcher.fetch_indicators(
+            indicators=["roe/nope"],
+            ts_codes=ts_codes,
+            date_range=None,
+            season=0,
+            single=False,
+            latest=False,
+            aggregate=None,
+        )
+
+
+def test_single_mid_year_start_differences_against_earlier_quarters() -> None:
+    client: FakeClient = FakeClient({"income": income_frame(["000001.SZ"])})
+    fetcher: DataFetcher = DataFetcher(client, load_registry(API_ORDER))  # type: ignore[arg-type]
+
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["revenue"],
+        ts_codes=["000001.SZ"],
+        date_range=DateRange(start=date(2023, 8, 1), end=date(2023, 12, 31)),
+        season=0,
+        single=True,
+        latest=False,
+        aggregate=None,
+    )
+
+    # the fetch starts at the year start; Q1 and Q2 only feed the differences
+    assert client.calls[0][1]["start_date"] == "20230101"
+    assert results[0].data["end_date"].tolist() == ["20230930", "20231231"]
+    assert results[0].data["revenue"].tolist() == [10.0, 10.0]
+
+
+QUARTER_ENDS: tuple[tuple[int, int], ...] = ((3, 31), (6, 30), (9, 30), (12, 31))
+
+
+def _staged_reference(
+    data: pd.DataFrame,
+    indicators: list[str],
+    date_range: DateRange | None,
+    season: int,
+    single: bool,
+    latest: bool,
+    aggregate: str | None,
+) -> pd.DataFrame:
+    # the stages as they ran before the single-parse pipeline: each one
+    # re-parsed end_date and the season filter checked dates one by one
+    data = data.copy()
+    data["_end_date"] = pd.to_datetime(data["end_date"], format="%Y%m%d", errors="coerce")
+    data = data[data["_end_date"].notna()]
+    if date_range is not None:
+        dates: pd.Series = data["_end_date"].dt.date
+        data = data[(dates >= date_range.start) & (dates <= date_range.end)]
+    data = data.assign(
+        _report_rank=data["report_type"].map(data_fetcher.REPORT_TYPE_PRIORITY).fillna(0),
+        _update_rank=data["update_flag"].eq("1").astype(int),
+        _date_rank=pd.to_datetime(data["ann_date"], format="%Y%m%d"),
+    )
+    data = data.sort_values(["ts_code", "_end_date", "_report_rank", "_update_rank", "_date_rank"])
+    data = data.groupby(["ts_code", "_end_date"], sort=False).tail(1)
+    data = data.drop(columns=["_report_rank", "_update_rank", "_date_rank"])
+    data = data.sort_values(["ts_code", "_end_date"])
+
+    if single:
+        years: pd.Series = data["_end_date"].dt.year
+        for indicator in indicators:
+            data[indicator] = (
+                data.groupby(["ts_code", years], sort=False)[indicator].diff().fillna(data[indicator])
+            )
+    if season:
+        keep: list[bool] = [
+            (value.month - 1) // 3 + 1 == season and (value.month, value.day) in QUARTER_ENDS
+            for value in data["_end_date"].dt.date
+        ]
+        data = data[keep]
+    data = data.drop(columns=["_end_date"])
+    if latest:
+        return data.groupby("ts_code").tail(1)
+    if aggregate:
+        result: pd.DataFrame = data.groupby("ts_code", as_index=False)[indicators].agg(aggregate)
+        return result.assign(ann_date=None, end_date=None)[["ts_code", "ann_date", "end_date", *indicators]]
+    return data
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"season": 0, "single": False, "latest": False, "aggregate": None},
+        {"season": 2, "single": False, "latest": False, "aggregate": None},
+        {"season": 0, "single": True, "latest": False, "aggregate": None},
+        {"season": 3, "single": True, "latest": False, "aggregate": None},
+        {"season": 0, "single": False, "latest": True, "aggregate": None},
+        {"season": 1, "single": False, "latest": True, "aggregate": None},
+        {"season": 0, "single": False, "latest": False, "aggregate": "mean"},
+        {"season": 0, "single": True, "latest": False, "aggregate": "median"},
+    ],
+)
+def test_pipeline_matches_the_per_stage_results(options: dict[str, Any]) -> None:
+    ts_codes: list[str] = ["000001.SZ", "000002.SZ", "000003.SZ"]
+    statements: pd.DataFrame = income_frame(ts_codes)
+    # a later restatement and a period that is not a quarter end
+    restated: pd.DataFrame = statements.iloc[[1, 6]].assign(
+        update_flag="1", ann_date="20240501", revenue=-1.0
+    )
+    off_quarter: pd.DataFrame = statements.iloc[[2]].assign(end_date="20230815", revenue=7.0)
+    raw: pd.DataFrame = pd.concat([statements, restated, off_quarter], ignore_index=True)
+    raw = raw.sample(frac=1.0, random_state=3, ignore_index=True)
+    indicators: list[str] = ["revenue", "n_income"]
+    # a year-start range: mid-year --single starts widen the fetch since then
+    date_range: DateRange = DateRange(start=date(2023, 1, 1), end=date(2023, 9, 30))
+
+    expected: pd.DataFrame = _staged_reference(raw, indicators, date_range, **options)
+    result: pd.DataFrame = data_fetcher.process_frame(
+        raw.copy(), "income", indicators, date_range, **options
+    )
+
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True)[list(expected.columns)],
+        expected.reset_index(drop=True),
+        check_dtype=False,
+    )
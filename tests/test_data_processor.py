@@ -0,0 +1,57 @@
+"""Tests for combining indicator results into output tables."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+from mara.compact import compact_frame
+from mara.data_fetcher import IndicatorResult
+from mara.data_processor import DataProcessor, OutputTable
+
+
+def _result(name: str, source: str, rows: list[tuple[str, str, str, float]]) -> IndicatorResult:
+    data: pd.DataFrame = pd.DataFrame(rows, columns=["ts_code", "ann_date", "end_date", name])
+    return IndicatorResult(name=name, frequency="quarterly", frame=data, source=source)
+
+
+def test_merge_is_outer_and_collapses_metadata() -> None:
+    roe: IndicatorResult = _result(
+        "roe",
+        "fina_indicator",
+        [("000001.SZ", "20230320", "20221231", 1.0), ("000001.SZ", "20240320", "20231231", 2.0)],
+    )
+    roa: IndicatorResult = _result(
+        "roa", "fina_indicator", [("000001.SZ", "20230320", "20221231", 0.1), ("000001.SZ", "20240320", "20231231", 0.2)]
+    )
+    revenue: IndicatorResult = _result(
+        "revenue",
+        "income",
+        [("000001.SZ", "20240321", "20231231", 30.0), ("600000.SH", "20240322", "20231231", 40.0)],
+    )
+
+    tables: list[OutputTable] = DataProcessor(pd.DataFrame()).build_output_tables(
+        [roe, revenue, roa], include_end_date=True
+    )
+
+    merged: pd.DataFrame = tables[0].data
+    # indicator columns keep the requested order across sources
+    assert list(merged.columns) == ["ts_code", "ann_date", "end_date", "roe", "revenue", "roa"]
+    assert merged.astype(object).where(merged.notna(), None).values.tolist() == [
+        ["000001.SZ", "20230320", "20221231", 1.0, None, 0.1],
+        ["000001.SZ", "20240320", "20231231", 2.0, 30.0, 0.2],
+        ["600000.SH", "20240322", "20231231", None, 40.0, None],
+    ]
+
+
+def test_merge_aligns_compact_and_text_sources() -> None:
+    roe: IndicatorResult = _result("roe", "fina_indicator", [("000001.SZ", "20240320", "20231231", 2.0)])
+    ratio: IndicatorResult = _result("roe/2", "expressions", [("000001.SZ", "20240320", "20231231", 1.0)])
+    compact_roe: IndicatorResult = IndicatorResult(
+        name="roe", frequency="quarterly", frame=compact_frame(roe.frame), source="fina_indicator"
+    )
+
+    tables: list[OutputTable] = DataProcessor(pd.DataFrame()).build_output_tables(
+        [compact_roe, ratio], include_end_date=True
+    )
+
+    assert tables[0].data.values.tolist() == [["000001.SZ", "20240320", "20231231", 2.0, 1.0]]
@@ -0,0 +1,73 @@
+"""Tests for the streaming Excel exporter."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from mara.data_fetcher import IndicatorResult
+from mara.excel_exporter import ExcelExporter
+
+
+@pytest.mark.parametrize("engine", ["xlsxwriter", "openpyxl"])
+def test_export_streams_sheets_with_basic_info(tmp_path: Path, engine: str) -> None:
+    basic_info: pd.DataFrame = pd.DataFrame(
+        {"ts_code": ["000001.SZ", "600000.SH"], "name": ["平安银行", "浦发银行"]}
+    )
+    api_df: pd.DataFrame = pd.DataFrame(
+        {
+            "ts_code": ["600000.SH", "000001.SZ", "999999.SZ"],
+            "ann_date": ["20240320", "20240321", None],
+            "end_date": ["20231231", "20231231", "20231231"],
+            "roe": [1.5, float("nan"), 2.0],
+            "roa": [0.1, 0.2, 0.3],
+        }
+    )
+    results: list[IndicatorResult] = [
+        IndicatorResult(
+            name=name,
+            frequency="quarterly",
+            frame=api_df,
+            columns=("ts_code", "ann_date", "end_date", name),
+            source="fina_indicator",
+        )
+        for name in ("roe", "roa")
+    ]
+    path: Path = tmp_path / "out.xlsx"
+
+    ExcelExporter(basic_info, engine=engine).export(str(path), results)
+
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == ["roe", "roa"]
+    rows: list[tuple[object, ...]] = list(workbook["roe"].iter_rows(values_only=True))
+    assert rows == [
+        ("ts_code", "name", "ann_date", "end_date", "roe"),
+        ("600000.SH", "浦发银行", "20240320", "20231231", 1.5),
+        ("000001.SZ", "平安银行", "20240321", "20231231", None),
+        ("999999.SZ", None, None, "20231231", 2.0),
+    ]
+
+
+def test_sheet_names_replace_characters_excel_rejects() -> None:
+    exporter: ExcelExporter = ExcelExporter(pd.DataFrame())
+
+    assert exporter._sanitize_sheet_name("n_income/revenue*100") == "n_income_revenue_100"
+    assert exporter._sanitize_sheet_name("[a]:b?\\c") == "_a__b__c"
+
+
+@pytest.mark.parametrize("engine", ["xlsxwriter", "openpyxl"])
+def test_export_writes_infinite_values_as_blanks(tmp_path: Path, engine: str) -> None:
+    # what an expression dividing by a zero value yields
+    frame: pd.DataFrame = pd.DataFrame(
+        {"ts_code": ["000001.SZ", "600000.SH"], "a/b": [float("inf"), -float("inf")]}
+    )
+    result: IndicatorResult = IndicatorResult(name="a/b", frequency="quarterly", frame=frame)
+    path: Path = tmp_path / "out.xlsx"
+
+    ExcelExporter(pd.DataFrame(), engine=engine).export(str(path), [result])
+
+    rows: list[tuple[object, ...]] = list(load_workbook(path)["a_b"].iter_rows(values_only=True))
+    assert rows == [("ts_code", "a/b"), ("000001.SZ", None), ("600000.SH", None)]
@@ -0,0 +1,47 @@
+"""Tests for indicator expressions."""
+
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from mara.expressions import ExpressionEvaluator, is_expression, parse_expression
+
+
+def test_parse_expression_collects_inputs_in_order() -> None:
+    assert parse_expression("n_income / revenue * 100").inputs == ("n_income", "revenue")
+    assert not is_expression("roe")
+    assert is_expression("roe*100")
+
+
+@pytest.mark.parametrize("text", ["roe +", "__import__('os')", "roe.real", "roe > 1", "1 + 2", "roe % 2"])
+def test_parse_expression_rejects_anything_but_arithmetic(text: str) -> None:
+    with pytest.raises(ValueError, match="Invalid expression"):
+        parse_expression(text)
+
+
+def test_evaluator_computes_shared_subexpressions_once() -> None:
+    data: pd.DataFrame = pd.DataFrame({"a": [1.0, 4.0], "b": [2.0, 8.0]})
+    evaluator: ExpressionEvaluator = ExpressionEvaluator(data)
+
+    ratio: pd.Series = evaluator.evaluate(parse_expression("a/b"))
+    percent: pd.Series = evaluator.evaluate(parse_expression("(a / b) * 100"))
+    negated: pd.Series = evaluator.evaluate(parse_expression("-(a/b) + 1"))
+
+    assert ratio.tolist() == [0.5, 0.5]
+    assert percent.tolist() == [50.0, 50.0]
+    assert negated.tolist() == [0.5, 0.5]
+    # a, b, a/b, 100, *100, -(a/b), 1, +1
+    assert evaluator.nodes_evaluated == 8
+
+
+def test_evaluator_keeps_constant_arithmetic_in_floats() -> None:
+    data: pd.DataFrame = pd.DataFrame({"revenue": [1.0, -2.0]})
+    evaluator: ExpressionEvaluator = ExpressionEvaluator(data)
+
+    divided: pd.Series = evaluator.evaluate(parse_expression("revenue*(1/0)"))
+    # an integer power tower would take forever to compute exactly
+    overflowed: pd.Series = evaluator.evaluate(parse_expression("revenue*9**9**9"))
+
+    assert divided.tolist() == [float("inf"), -float("inf")]
+    assert overflowed.tolist() == [float("inf"), -float("inf")]
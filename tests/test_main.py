@@ -7,7 +7,7 @@ import argparse
 import pytest
 
 from mara.main import _build_options, build_parser, main
-from mara.query_options import QueryOptions
+from mara.query_options import QueryOptions, SyncOptions
 
 
 def test_build_parser_parses_keywords() -> None:
@@ -34,7 +34,20 @@ def test_main_runs_without_network(monkeypatch: pytest.MonkeyPatch) -> None:
         return object()
 
     monkeypatch.setattr("mara.main.setup_logging", lambda _level: None)
-    monkeypatch.setattr("mara.main.run_app", fake_run_app)
+    monkeypatch.setattr("mara.app.run_app", fake_run_app)
 
     exit_code: int = main(["-i", "roe", "000001.SZ"])
     assert exit_code == 0
+
+
+def test_main_dispatches_sync_subcommand(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_run_sync(options: SyncOptions) -> list[object]:
+        assert options.apis == ["income", "cashflow"]
+        assert options.full is True
+        return []
+
+    monkeypatch.setattr("mara.main.setup_logging", lambda _level: None)
+    monkeypatch.setattr("mara.app.run_sync", fake_run_sync)
+
+    exit_code: int = main(["sync", "--api", "income", "--api", "cashflow", "--full"])
+    assert exit_code == 0
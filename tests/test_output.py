@@ -0,0 +1,58 @@
+"""Tests for table output formats."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from mara.data_processor import OutputTable
+from mara.output import write_tables
+
+
+def _table(frequency: str = "quarterly") -> OutputTable:
+    data: pd.DataFrame = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ", "600000.SH"],
+            "end_date": ["20231231", "20231231"],
+            "roe": [1.5, float("nan")],
+        }
+    )
+    return OutputTable(frequency=frequency, data=data)
+
+
+def test_parquet_output_stores_dates_as_datetimes(tmp_path: Path) -> None:
+    path: Path = tmp_path / "out.parquet"
+
+    write_tables([_table()], "parquet", str(path), ",", include_header=True)
+
+    result: pd.DataFrame = pd.read_parquet(path)
+    assert pd.api.types.is_datetime64_any_dtype(result["end_date"])
+    assert result["roe"].dtype == "float64"
+
+
+def test_multiple_tables_get_one_file_per_frequency(tmp_path: Path) -> None:
+    write_tables(
+        [_table(), _table("custom")], "arrow", str(tmp_path / "out.arrow"), ",", True
+    )
+
+    with pa.ipc.open_stream((tmp_path / "out.custom.arrow").read_bytes()) as reader:
+        assert reader.read_all().num_rows == 2
+    assert (tmp_path / "out.quarterly.arrow").exists()
+
+
+def test_jsonl_output_writes_one_record_per_row(capsys: pytest.CaptureFixture[str]) -> None:
+    write_tables([_table()], "jsonl", None, ",", include_header=True)
+
+    lines: list[str] = capsys.readouterr().out.splitlines()
+    assert lines == [
+        '{"ts_code":"000001.SZ","end_date":"20231231","roe":1.5}',
+        '{"ts_code":"600000.SH","end_date":"20231231","roe":null}',
+    ]
+
+
+def test_feather_output_requires_a_path() -> None:
+    with pytest.raises(ValueError, match="requires --output"):
+        write_tables([_table()], "feather", None, ",", include_header=True)
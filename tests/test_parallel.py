@@ -0,0 +1,86 @@
+"""Tests for the ts_code sharded process pool."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient
+from mara import data_fetcher
+from mara.constants import API_ORDER
+from mara.data_fetcher import DataFetcher, IndicatorResult
+from mara.date_utils import DateRange
+from mara.indicator_registry import IndicatorRegistry, load_registry
+from mara.parallel import ShardPool, code_shards
+
+
+def _statements(ts_codes: list[str]) -> pd.DataFrame:
+    rows: list[dict[str, Any]] = []
+    for idx, ts_code in enumerate(ts_codes):
+        for year in (2021, 2022):
+            for quarter_end in ("0331", "0630", "0930", "1231"):
+                rows.append(
+                    {
+                        "ts_code": ts_code,
+                        "ann_date": f"{year + 1}0330",
+                        "end_date": f"{year}{quarter_end}",
+                        "update_flag": "0",
+                        "roe": float(idx * 10 + year - 2020),
+                    }
+                )
+    # interleave stocks the way per-period bulk queries return them
+    return pd.DataFrame(rows).sort_values("end_date", kind="stable", ignore_index=True)
+
+
+def test_code_shards_cover_codes_in_balanced_ranges() -> None:
+    frame: pd.DataFrame = pd.DataFrame(
+        {"ts_code": ["000003.SZ"] * 4 + ["000001.SZ"] * 4 + ["000002.SZ"] * 2 + ["000004.SZ"] * 2}
+    )
+
+    shards: list[list[str]] = code_shards(frame, 2)
+
+    assert shards == [["000001.SZ", "000002.SZ"], ["000003.SZ", "000004.SZ"]]
+    assert code_shards(frame, 8) == [["000001.SZ"], ["000002.SZ"], ["000003.SZ"], ["000004.SZ"]]
+
+
+def test_shard_pool_requires_two_processes() -> None:
+    with pytest.raises(ValueError, match="processes"):
+        ShardPool(1)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"season": 0, "single": False, "latest": False, "aggregate": None},
+        {"season": 4, "single": True, "latest": False, "aggregate": None},
+        {"season": 0, "single": False, "latest": True, "aggregate": None},
+        {"season": 0, "single": False, "latest": False, "aggregate": "mean"},
+    ],
+)
+def test_processes_match_in_process_results(
+    monkeypatch: pytest.MonkeyPatch, options: dict[str, Any]
+) -> None:
+    monkeypatch.setattr(data_fetcher, "PARALLEL_MIN_ROWS", 0)
+    ts_codes: list[str] = [f"{idx:06d}.SZ" for idx in range(7)]
+    client: FakeClient = FakeClient({"fina_indicator": _statements(ts_codes)})
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    date_range: DateRange | None = (
+        None if options["latest"] else DateRange(start=date(2021, 1, 1), end=date(2022, 12, 31))
+    )
+
+    def fetch(fetcher: DataFetcher) -> pd.DataFrame:
+        try:
+            results: list[IndicatorResult] = fetcher.fetch_indicators(
+                indicators=["roe"], ts_codes=ts_codes, date_range=date_range, **options
+            )
+        finally:
+            fetcher.close()
+        return results[0].data
+
+    serial: pd.DataFrame = fetch(DataFetcher(client, registry))  # type: ignore[arg-type]
+    parallel: pd.DataFrame = fetch(DataFetcher(client, registry, processes=3))  # type: ignore[arg-type]
+
+    pd.testing.assert_frame_equal(serial, parallel)
@@ -0,0 +1,92 @@
+"""Tests for --profile instrumentation."""
+
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient, income_frame
+from mara.app import AppContext, run_app
+from mara.config import AppConfig
+from mara.constants import API_ORDER
+from mara.indicator_registry import load_registry
+from mara.main import parse_query_args
+from mara.profiler import Profiler, peak_rss_bytes
+from mara.query_options import QueryOptions
+
+TS_CODES: list[str] = ["000001.SZ", "000002.SZ"]
+
+
+class FlakyClient(FakeClient):
+    def query(self, api_name: str, **params: Any) -> pd.DataFrame:
+        if api_name == "income" and not any(api == "income" for api, _params in self.calls):
+            self.calls.append((api_name, params))
+            raise OSError("connection reset")
+        return super().query(api_name, **params)
+
+
+def test_profile_records_stages_calls_and_retries(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    remote: FlakyClient = FlakyClient(
+        {
+            "stock_basic": pd.DataFrame({"ts_code": TS_CODES, "name": ["a", "b"]}),
+            "income": income_frame(TS_CODES),
+        }
+    )
+    monkeypatch.setattr("tushare.pro_api", lambda _token: remote)
+    monkeypatch.setattr("mara.tushare_client.time.sleep", lambda _seconds: None)
+    context: AppContext = AppContext(AppConfig(token="token"), load_registry(API_ORDER), None)
+    options, keywords = parse_query_args(["-i", "revenue", "-s", "2023-01-01", "-e", "2023-12-31"])
+    profile_path: Path = tmp_path / "profile.json"
+    options = dataclasses.replace(options, profile_json=str(profile_path))
+
+    run_app(options, keywords, context=context, stdout=io.StringIO())
+    profile: dict[str, Any] = json.loads(profile_path.read_text(encoding="utf-8"))
+
+    income: dict[str, Any] = profile["apis"]["income"]
+    assert income["calls"] == 3
+    assert income["errors"] == 1
+    assert income["retries"] == 1
+    assert sum(income["latency_histogram"].values()) == 3
+    assert {"select", "fetch:income", "process:income", "dedupe", "merge", "output"} <= set(
+        profile["stages"]
+    )
+    assert profile["stages"]["process:income"]["rows"] == 8
+    assert profile["peak_rss_bytes"] > 0
+
+
+def test_profile_summary_goes_to_stderr(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    remote: FakeClient = FakeClient({"stock_basic": pd.DataFrame({"ts_code": TS_CODES})})
+    monkeypatch.setattr("tushare.pro_api", lambda _token: remote)
+    context: AppContext = AppContext(AppConfig(token="token"), load_registry(API_ORDER), None)
+    options: QueryOptions
+    options, _keywords = parse_query_args(["-i", "revenue", "--profile", "600000"])
+
+    run_app(options, ["600000"], context=context)
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err.startswith("profile: total")
+    assert "stock_basic" in captured.err
+
+
+def test_peak_rss_is_unknown_without_resource_module(monkeypatch: pytest.MonkeyPatch) -> None:
+    # as on Windows, where the module does not exist
+    monkeypatch.setitem(sys.modules, "resource", None)
+    profiler: Profiler = Profiler()
+    output: io.StringIO = io.StringIO()
+
+    profiler.print_summary(output)
+
+    assert peak_rss_bytes() == 0
+    assert "peak RSS n/a" in output.getvalue()
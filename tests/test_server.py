@@ -0,0 +1,172 @@
+"""Tests for the query server and its thin client."""
+
+from __future__ import annotations
+
+import http.client
+import io
+import json
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient, income_frame
+from mara.app import AppContext, run_app
+from mara.config import AppConfig
+from mara.constants import API_ORDER
+from mara.indicator_registry import load_registry
+from mara.main import parse_query_args
+from mara.query_options import QueryOptions, ServeOptions
+from mara.remote import RemoteError, forward_query
+from mara.server import QueryServer, create_server
+
+TS_CODES: list[str] = ["000001.SZ", "000002.SZ"]
+
+TOKEN: str = "secret"
+
+
+@pytest.fixture
+def remote(monkeypatch: pytest.MonkeyPatch) -> FakeClient:
+    client: FakeClient = FakeClient(
+        {
+            "stock_basic": pd.DataFrame({"ts_code": TS_CODES, "name": ["a", "b"]}),
+            "income": income_frame(TS_CODES),
+        }
+    )
+    monkeypatch.setattr("tushare.pro_api", lambda _token: client)
+    return client
+
+
+@pytest.fixture
+def context(remote: FakeClient) -> AppContext:
+    return AppContext(AppConfig(token="token"), load_registry(API_ORDER), cache=None)
+
+
+@pytest.fixture
+def address(context: AppContext) -> Iterator[str]:
+    options: ServeOptions = ServeOptions(
+        host="127.0.0.1",
+        port=0,
+        socket_path=None,
+        config_path="unused",
+        log_level=0,
+        token=TOKEN,
+    )
+    server = create_server(options, QueryServer(context, parse_query_args))
+    thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_server_output_matches_local_run(
+    address: str, context: AppContext, remote: FakeClient
+) -> None:
+    argv: list[str] = ["-i", "revenue", "-s", "2023-01-01", "-e", "2023-12-31", "--season", "0"]
+    options, keywords = parse_query_args(argv)
+    local: io.StringIO = io.StringIO()
+    run_app(options, keywords, context=context, stdout=local)
+
+    first: str = forward_query(address, argv, token=TOKEN)
+    second: str = forward_query(address, [*argv, "000002"], token=TOKEN)
+
+    assert first == local.getvalue()
+    assert "000001.SZ" not in second and "000002.SZ" in second
+    stock_basic_calls: int = sum(1 for api, _params in remote.calls if api == "stock_basic")
+    assert stock_basic_calls == 1
+
+
+def test_server_reports_bad_arguments(address: str) -> None:
+    with pytest.raises(RemoteError, match="--indicators"):
+        forward_query(address, ["000001.SZ"], token=TOKEN)
+
+
+def test_server_resolves_output_paths_against_caller_cwd(
+    address: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+
+    output: str = forward_query(
+        address,
+        ["-i", "revenue", "-o", "out.csv", "--profile-json", "profile.json"],
+        token=TOKEN,
+    )
+
+    assert output == ""
+    assert (tmp_path / "out.csv").read_text(encoding="utf-8").startswith("ts_code,")
+    assert (tmp_path / "profile.json").exists()
+
+
+def test_server_returns_profile_summary_to_the_caller(address: str) -> None:
+    stderr: io.StringIO = io.StringIO()
+
+    output: str = forward_query(address, ["-i", "revenue", "--profile"], token=TOKEN, stderr=stderr)
+
+    assert "000001.SZ" in output
+    assert stderr.getvalue().startswith("profile: total ")
+
+
+def test_server_runs_concurrent_profile_traces_in_turn(
+    address: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    errors: list[Exception] = []
+
+    def query(name: str) -> None:
+        try:
+            forward_query(address, ["-i", "revenue", "--profile-trace", name], token=TOKEN)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads: list[threading.Thread] = [
+        threading.Thread(target=query, args=(f"trace{index}.prof",)) for index in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert all((tmp_path / f"trace{index}.prof").exists() for index in range(4))
+
+
+def test_server_requires_token(address: str) -> None:
+    with pytest.raises(RemoteError, match="token"):
+        forward_query(address, ["-i", "revenue"])
+    with pytest.raises(RemoteError, match="token"):
+        forward_query(address, ["-i", "revenue"], token="wrong")
+
+
+def test_server_rejects_non_json_content_type(address: str) -> None:
+    # the body a cross-origin form or fetch could send without a preflight
+    port: int = int(address.rsplit(":", 1)[1])
+    connection: http.client.HTTPConnection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request(
+        "POST",
+        "/query",
+        body=json.dumps({"argv": ["-i", "revenue"]}),
+        headers={"Content-Type": "text/plain", "Authorization": f"Bearer {TOKEN}"},
+    )
+    response: http.client.HTTPResponse = connection.getresponse()
+    connection.close()
+
+    assert response.status == 415
+
+
+def test_tcp_server_without_token_is_refused(context: AppContext) -> None:
+    options: ServeOptions = ServeOptions(
+        host="127.0.0.1", port=0, socket_path=None, config_path="unused", log_level=0
+    )
+
+    with pytest.raises(ValueError, match="token"):
+        create_server(options, QueryServer(context, parse_query_args))
+
+
+def test_parse_query_args_keeps_keywords() -> None:
+    options, keywords = parse_query_args(["-i", "roe", "000001.SZ"])
+
+    assert isinstance(options, QueryOptions)
+    assert keywords == ["000001.SZ"]
@@ -0,0 +1,114 @@
+"""Import-time budgets for CLI startup, measured with python -X importtime."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+import mara
+from mara.cache import QueryCache
+from mara.constants import API_ORDER, BASIC_FIELDS, META_FIELDS, SERVER_ENV_VAR
+from mara.indicator_registry import load_registry
+
+# total import time in seconds; generous against CI noise, far below the
+# eager-import cost (matplotlib alone takes ~0.3s)
+HELP_IMPORT_BUDGET: float = 0.25
+CACHED_QUERY_IMPORT_BUDGET: float = 2.0
+
+# never needed to print help or to answer a query from the cache
+DEFERRED_MODULES: tuple[str, ...] = ("tushare", "matplotlib", "openpyxl", "xlsxwriter")
+
+
+def _run_cli(
+    args: list[str], cwd: Path
+) -> tuple[subprocess.CompletedProcess[str], dict[str, int]]:
+    src_dir: str = str(Path(mara.__file__).resolve().parents[1])
+    env: dict[str, str] = {
+        key: value for key, value in os.environ.items() if key != SERVER_ENV_VAR
+    }
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    completed: subprocess.CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from mara.main import main; raise SystemExit(main())",
+            *args,
+        ],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    self_times: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _cumulative_us, name = line.removeprefix("import time:").split("|")
+        self_times[name.strip()] = int(self_us)
+    return completed, self_times
+
+
+def _assert_within_budget(self_times: dict[str, int], budget: float) -> None:
+    loaded: set[str] = {name.split(".", 1)[0] for name in self_times}
+    assert loaded.isdisjoint(DEFERRED_MODULES), sorted(loaded & set(DEFERRED_MODULES))
+    assert sum(self_times.values()) / 1e6 < budget
+
+
+def test_help_imports_stay_within_budget(tmp_path: Path) -> None:
+    completed, self_times = _run_cli(["--help"], tmp_path)
+
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    assert "usage: mara" in completed.stdout
+    assert "pandas" not in self_times
+    _assert_within_budget(self_times, HELP_IMPORT_BUDGET)
+
+
+def test_cached_query_imports_stay_within_budget(tmp_path: Path) -> None:
+    cache_dir: Path = tmp_path / "cache"
+    config_path: Path = tmp_path / "mararc"
+    config_path.write_text(
+        f"token: token\ncache:\n  dir: {cache_dir}\n  ttl:\n    default: null\n",
+        encoding="utf-8",
+    )
+    cache: QueryCache = QueryCache(cache_dir, ttl={"default": None}, max_bytes=1 << 30)
+    cache.put(
+        "stock_basic",
+        {"fields": ",".join(BASIC_FIELDS)},
+        pd.DataFrame({"ts_code": ["000001.SZ"], "name": ["平安银行"]}),
+    )
+    income_fields: list[str] = list(
+        dict.fromkeys(META_FIELDS + load_registry(API_ORDER).api_specs["income"].fields)
+    )
+    cache.put(
+        "income",
+        {
+            "ts_code": "000001.SZ",
+            "start_date": "20230101",
+            "end_date": "20231231",
+            "fields": ",".join(income_fields),
+        },
+        pd.DataFrame(
+            {
+                "ts_code": ["000001.SZ"],
+                "ann_date": ["20240320"],
+                "end_date": ["20231231"],
+                "revenue": [1.5],
+            }
+        ),
+    )
+
+    completed, self_times = _run_cli(
+        ["-c", str(config_path), "-i", "revenue", "-s", "2023-01-01", "-e", "2023-12-31", "000001"],
+        tmp_path,
+    )
+
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    assert "000001.SZ,平安银行" in completed.stdout
+    _assert_within_budget(self_times, CACHED_QUERY_IMPORT_BUDGET)
@@ -0,0 +1,43 @@
+"""Tests for keyword resolution over stock_basic."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+from mara.stock_selector import StockIndex, StockSelection
+
+
+def _index() -> StockIndex:
+    basic_df: pd.DataFrame = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ", "600000.SH", "600036.SH", "000002.SZ"],
+            "name": ["平安银行", "浦发银行", "招商银行", "万科A"],
+            "industry": ["银行", "银行", "银行", "全国地产"],
+        }
+    )
+    return StockIndex(basic_df)
+
+
+def test_select_matches_codes_names_and_industry() -> None:
+    index: StockIndex = _index()
+
+    assert index.select(["000001.sz"]).ts_codes == ["000001.SZ"]
+    assert index.select(["600000"]).ts_codes == ["600000.SH"]
+    assert index.select(["6000"]).ts_codes == ["600000.SH", "600036.SH"]
+    assert index.select(["招商"]).ts_codes == ["600036.SH"]
+    assert index.select(["万科a"]).ts_codes == ["000002.SZ"]
+    assert index.select(["全国地产", "浦发"]).ts_codes == ["000002.SZ", "600000.SH"]
+
+
+def test_select_treats_keywords_literally() -> None:
+    index: StockIndex = _index()
+
+    assert index.select(["0000.1"]).ts_codes == []
+    assert index.select(["银行("]).ts_codes == []
+
+
+def test_select_without_keywords_returns_everything() -> None:
+    selection: StockSelection = _index().select([" "])
+
+    assert selection.ts_codes == ["000001.SZ", "000002.SZ", "600000.SH", "600036.SH"]
+    assert len(selection.basic_info) == 4
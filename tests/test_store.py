@@ -0,0 +1,130 @@
+"""Tests for the local statement store and incremental sync."""
+
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from fakes import FakeClient
+from mara.constants import API_ORDER
+from mara.data_fetcher import DataFetcher, IndicatorResult
+from mara.date_utils import DateRange
+from mara.indicator_registry import IndicatorRegistry, load_registry
+from mara.store import StatementStore, SyncResult
+
+
+def _income_rows(rows: list[tuple[str, str, str, float]]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "ts_code": ts_code,
+                "ann_date": ann_date,
+                "f_ann_date": ann_date,
+                "end_date": end_date,
+                "report_type": "1",
+                "update_flag": "0",
+                "revenue": revenue,
+            }
+            for ts_code, end_date, ann_date, revenue in rows
+        ]
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fixed_today(monkeypatch: pytest.MonkeyPatch) -> None:
+    class FixedDate(date):
+        @classmethod
+        def today(cls) -> date:
+            return date(2024, 5, 1)
+
+    monkeypatch.setattr("mara.store.date", FixedDate)
+
+
+def test_sync_fetches_only_rows_past_high_water_mark(tmp_path: Path) -> None:
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    store: StatementStore = StatementStore(tmp_path)
+    initial: pd.DataFrame = _income_rows(
+        [
+            ("000001.SZ", "20230630", "20230820", 10.0),
+            ("000001.SZ", "20231231", "20240320", 40.0),
+            ("600000.SH", "20231231", "20240325", 50.0),
+        ]
+    )
+    client: FakeClient = FakeClient({"income_vip": initial})
+
+    first: SyncResult = store.sync(client, registry, "income", start=date(2023, 1, 1))  # type: ignore[arg-type]
+    assert first.rows == 3
+    assert first.high_water_mark == "20240325"
+    assert store.periods("income") == ["20230630", "20231231"]
+
+    update: pd.DataFrame = pd.concat(
+        [initial, _income_rows([("000001.SZ", "20240331", "20240426", 12.0)])],
+        ignore_index=True,
+    )
+    client = FakeClient({"income_vip": update})
+    second: SyncResult = store.sync(client, registry, "income", start=date(2023, 1, 1))  # type: ignore[arg-type]
+
+    assert [params.get("start_date") for _api, params in client.calls] == ["20240325"]
+    assert second.rows == 2
+    assert second.high_water_mark == "20240426"
+    assert store.periods("income") == ["20230630", "20231231", "20240331"]
+    assert len(pd.read_parquet(tmp_path / "income" / "period=20231231.parquet")) == 2
+
+
+def test_fetcher_reads_from_store_without_network(tmp_path: Path) -> None:
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    store: StatementStore = StatementStore(tmp_path)
+    rows: pd.DataFrame = _income_rows(
+        [
+            ("000001.SZ", "20221231", "20230320", 30.0),
+            ("000001.SZ", "20231231", "20240320", 40.0),
+            ("600000.SH", "20231231", "20240325", 50.0),
+        ]
+    )
+    store.sync(FakeClient({"income_vip": rows}), registry, "income", start=date(2022, 1, 1))  # type: ignore[arg-type]
+
+    offline: FakeClient = FakeClient({})
+    fetcher: DataFetcher = DataFetcher(offline, registry, store=store)  # type: ignore[arg-type]
+    results: list[IndicatorResult] = fetcher.fetch_indicators(
+        indicators=["revenue"],
+        ts_codes=["000001.SZ"],
+        date_range=DateRange(start=date(2023, 1, 1), end=date(2023, 12, 31)),
+        season=4,
+        single=False,
+        latest=False,
+        aggregate=None,
+    )
+
+    assert offline.calls == []
+    assert results[0].data[["ts_code", "end_date", "revenue"]].values.tolist() == [
+        ["000001.SZ", "20231231", 40.0]
+    ]
+
+
+def test_sync_rereads_open_periods_of_report_period_apis(tmp_path: Path) -> None:
+    registry: IndicatorRegistry = load_registry(API_ORDER)
+    store: StatementStore = StatementStore(tmp_path)
+    rows: list[tuple[str, str, str, float]] = [
+        ("000001.SZ", "20230930", "20231025", 1.0),
+        ("000001.SZ", "20231231", "20240320", 2.0),
+    ]
+    initial: pd.DataFrame = _income_rows(rows[:1]).rename(columns={"revenue": "roe"})
+    store.sync(FakeClient({"fina_indicator_vip": initial}), registry, "fina_indicator", start=date(2022, 1, 1))  # type: ignore[arg-type]
+    assert store.high_water_mark("fina_indicator") == "20231025"
+
+    # the 2023 annual report is filed after the mark, for a period before it
+    late: pd.DataFrame = _income_rows(rows).rename(columns={"revenue": "roe"})
+    client: FakeClient = FakeClient({"fina_indicator_vip": late})
+    result: SyncResult = store.sync(client, registry, "fina_indicator", start=date(2022, 1, 1))  # type: ignore[arg-type]
+
+    assert [params["period"] for _api, params in client.calls] == [
+        "20220630", "20220930", "20221231", "20230331",
+        "20230630", "20230930", "20231231", "20240331",
+    ]
+    assert result.rows == 2
+    assert result.high_water_mark == "20240320"
+    assert store.periods("fina_indicator") == ["20230930", "20231231"]
+    assert len(pd.read_parquet(tmp_path / "fina_indicator" / "period=20230930.parquet")) == 1
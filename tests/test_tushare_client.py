@@ -0,0 +1,78 @@
+"""Tests for TushareClient retry classification and rate limiting."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from mara.rate_limiter import TokenBucket
+from mara.tushare_client import RateLimitError, TushareClient
+
+
+class ScriptedPro:
+    def __init__(self, outcomes: list[Exception | pd.DataFrame]) -> None:
+        self._outcomes: list[Exception | pd.DataFrame] = outcomes
+        self.calls: int = 0
+
+    def query(self, api_name: str, **params: Any) -> pd.DataFrame:
+        outcome: Exception | pd.DataFrame = self._outcomes[self.calls]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _make_client(
+    monkeypatch: pytest.MonkeyPatch, outcomes: list[Exception | pd.DataFrame]
+) -> tuple[TushareClient, ScriptedPro, list[float]]:
+    pro: ScriptedPro = ScriptedPro(outcomes)
+    sleeps: list[float] = []
+    monkeypatch.setattr("tushare.pro_api", lambda _token: pro)
+    monkeypatch.setattr("mara.tushare_client.time.sleep", sleeps.append)
+    client: TushareClient = TushareClient(token="token", max_retries=2)
+    return client, pro, sleeps
+
+
+def test_query_retries_rate_limit_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    data: pd.DataFrame = pd.DataFrame({"ts_code": ["000001.SZ"]})
+    client, pro, sleeps = _make_client(
+        monkeypatch, [Exception("抱歉，您每分钟最多访问该接口200次"), data]
+    )
+
+    result: pd.DataFrame = client.query("income", ts_code="000001.SZ")
+
+    assert pro.calls == 2
+    assert len(sleeps) == 1 and 1.0 <= sleeps[0] <= 2.0
+    pd.testing.assert_frame_equal(result, data)
+
+
+def test_query_does_not_retry_hard_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    client, pro, sleeps = _make_client(monkeypatch, [Exception("抱歉，您没有接口访问权限")])
+
+    with pytest.raises(Exception, match="没有接口访问权限"):
+        client.query("income_vip", period="20231231")
+    assert pro.calls == 1
+    assert sleeps == []
+
+
+def test_query_gives_up_after_max_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    throttled: Exception = Exception("抱歉，您每分钟最多访问该接口200次")
+    client, pro, _sleeps = _make_client(monkeypatch, [throttled] * 3)
+
+    with pytest.raises(RateLimitError):
+        client.query("income", ts_code="000001.SZ")
+    assert pro.calls == 3
+
+
+def test_token_bucket_spaces_calls_after_burst(monkeypatch: pytest.MonkeyPatch) -> None:
+    sleeps: list[float] = []
+    monkeypatch.setattr("mara.rate_limiter.time.sleep", sleeps.append)
+    monkeypatch.setattr("mara.rate_limiter.time.monotonic", lambda: 100.0)
+    bucket: TokenBucket = TokenBucket(calls_per_minute=60.0)
+
+    waits: list[float] = [bucket.acquire() for _ in range(3)]
+
+    assert waits == pytest.approx([0.0, 1 / 0.95, 2 / 0.95])
+    assert sleeps == waits[1:]